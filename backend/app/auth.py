@@ -1,15 +1,20 @@
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Any, Callable, Dict, Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+import asyncio
 import os
 from dotenv import load_dotenv
 
+from .cache import LRUCache, RedisCache
 from .database import get_db
-from .models import User
+from .models import User, UserRole
 
 load_dotenv()
 
@@ -17,15 +22,145 @@ SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Raising BCRYPT_ROUNDS makes existing hashes below the new cost get rehashed on next login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "thread")
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "4"))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))
+
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS
+)
 security = HTTPBearer()
 
+# Principals are cached by token subject; entries never outlive a token
+PRINCIPAL_CACHE_TTL_SECONDS = min(int(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60")), ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+PRINCIPAL_CACHE_MAX_ENTRIES = int(os.getenv("PRINCIPAL_CACHE_MAX_ENTRIES", "10000"))
+PRINCIPAL_CACHE_REDIS = os.getenv("PRINCIPAL_CACHE_REDIS", "false").lower() == "true"
+REDIS_URL = os.getenv("REDIS_URL")
+
+@dataclass(frozen=True)
+class Principal:
+    id: int
+    email: str
+    first_name: str
+    last_name: str
+    role: UserRole
+    is_active: bool
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(
+            id=user.id,
+            email=user.email,
+            first_name=user.first_name,
+            last_name=user.last_name,
+            role=user.role,
+            is_active=user.is_active
+        )
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Principal":
+        return cls(**{**data, "role": UserRole(data["role"])})
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "email": self.email,
+            "first_name": self.first_name,
+            "last_name": self.last_name,
+            "role": self.role.value,
+            "is_active": self.is_active
+        }
+
+if PRINCIPAL_CACHE_REDIS and REDIS_URL:
+    shared_principal_cache = RedisCache(REDIS_URL, "principal", ttl=PRINCIPAL_CACHE_TTL_SECONDS)
+    # Keep the local tier short-lived so invalidations made by other workers are seen quickly
+    principal_cache = LRUCache(maxsize=PRINCIPAL_CACHE_MAX_ENTRIES, ttl=min(5, PRINCIPAL_CACHE_TTL_SECONDS))
+else:
+    shared_principal_cache = None
+    principal_cache = LRUCache(maxsize=PRINCIPAL_CACHE_MAX_ENTRIES, ttl=PRINCIPAL_CACHE_TTL_SECONDS)
+
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+def verify_and_update_password(plain_password, hashed_password) -> Tuple[bool, Optional[str]]:
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+class PasswordHasher:
+    # Runs bcrypt off the event loop; workers=0 hashes inline on the loop
+    def __init__(self, executor: str = "thread", workers: int = 4, max_pending: int = 64):
+        self.executor_kind = executor
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        # Hashes and checks that returned, that raised, and that were turned away with a 503
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self._executor: Optional[Executor] = None
+
+    def _get_executor(self) -> Executor:
+        # Created lazily so forked server workers do not inherit pool threads
+        if self._executor is None:
+            if self.executor_kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+        return self._executor
+
+    async def _run(self, fn: Callable, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Authentication is busy, please retry",
+                headers={"Retry-After": "1"},
+            )
+        self.pending += 1
+        try:
+            if self.workers <= 0:
+                result = fn(*args)
+            else:
+                result = await asyncio.get_running_loop().run_in_executor(self._get_executor(), fn, *args)
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.pending -= 1
+        self.completed += 1
+        return result
+
+    async def hash(self, password: str) -> str:
+        return await self._run(get_password_hash, password)
+
+    async def verify_and_update(self, plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        return await self._run(verify_and_update_password, plain_password, hashed_password)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "executor": self.executor_kind,
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
+
+password_hasher = PasswordHasher(PASSWORD_HASH_EXECUTOR, PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -36,33 +171,66 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
+def decode_token(token: str) -> Optional[Dict[str, Any]]:
+    # Claims of a valid, unexpired token that names a subject; None otherwise
     try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Could not validate credentials",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
     except JWTError:
+        return None
+    return payload if payload.get("sub") is not None else None
+
+async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security), db: AsyncSession = Depends(get_db)):
+    payload = decode_token(credentials.credentials)
+    if payload is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    user = db.query(User).filter(User.email == email).first()
-    if user is None:
+    principal = await get_principal(db, payload["sub"])
+    if principal is None or not principal.is_active:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    return user
+    return principal
+
+async def get_principal(db: AsyncSession, email: str) -> Optional[Principal]:
+    principal = principal_cache.get(email)
+    if principal is not None:
+        return principal
+    
+    if shared_principal_cache is not None:
+        data = await shared_principal_cache.get(email)
+        if data is not None:
+            principal = Principal.from_dict(data)
+            principal_cache.set(email, principal)
+            return principal
+    
+    user = (await db.execute(select(User).where(User.email == email))).scalars().first()
+    if user is None:
+        return None
+    
+    principal = Principal.from_user(user)
+    principal_cache.set(email, principal)
+    if shared_principal_cache is not None:
+        await shared_principal_cache.set(email, principal.to_dict())
+    return principal
+
+async def invalidate_principal(email: str):
+    principal_cache.delete(email)
+    if shared_principal_cache is not None:
+        await shared_principal_cache.delete(email)
+
+def principal_cache_stats() -> Dict[str, Any]:
+    stats = {"local": principal_cache.stats()}
+    if shared_principal_cache is not None:
+        stats["shared"] = shared_principal_cache.stats()
+    return stats
 
-def check_permission(user: User, required_permission: str) -> bool:
+def check_permission(user: Principal, required_permission: str) -> bool:
     role_permissions = {
         "admin": ["*"],
         "manager": ["dashboard", "rooms", "bookings", "guests", "staff", "reports"],
@@ -0,0 +1,61 @@
+from sqlalchemy import and_, exists, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Iterable, List, Optional
+from datetime import datetime
+
+from .models import Booking, BookingStatus, Room, RoomStatus, RoomType
+
+# Bookings in these states hold their room for the whole stay
+BLOCKING_STATUSES = (BookingStatus.CONFIRMED, BookingStatus.CHECKED_IN)
+
+def overlapping(check_in: datetime, check_out: datetime):
+    # Half-open intervals: a stay ending on the morning another begins does not conflict
+    return and_(
+        Booking.status.in_(BLOCKING_STATUSES),
+        Booking.check_in_date < check_out,
+        Booking.check_out_date > check_in,
+    )
+
+async def lock_rooms(db: AsyncSession, room_ids: Iterable[int]):
+    # Holds the rooms until the transaction ends, so bookings of one room are checked and written one at a time
+    # and each sees the stays committed before it. Rows are locked in id order so two batches cannot deadlock.
+    # SQLite ignores FOR UPDATE; a no-op write takes its database-wide write lock instead (updated_at is set to
+    # itself so the rooms do not look changed).
+    ids = sorted(set(room_ids))
+    if db.get_bind().dialect.name == "sqlite":
+        await db.execute(update(Room).where(Room.id.in_(ids)).values(updated_at=Room.updated_at))
+    else:
+        await db.execute(select(Room.id).where(Room.id.in_(ids)).order_by(Room.id).with_for_update())
+
+async def find_conflicts(
+    db: AsyncSession,
+    room_id: int,
+    check_in: datetime,
+    check_out: datetime,
+    exclude_booking_id: Optional[int] = None,
+    for_update: bool = False
+) -> List[Booking]:
+    # With for_update (after lock_rooms) MySQL reads the latest committed stays rather than the transaction's
+    # snapshot, which may predate the lock
+    stmt = select(Booking).where(Booking.room_id == room_id, overlapping(check_in, check_out))
+    if exclude_booking_id is not None:
+        stmt = stmt.where(Booking.id != exclude_booking_id)
+    if for_update:
+        stmt = stmt.with_for_update()
+    return (await db.execute(stmt)).scalars().all()
+
+def available_rooms_query(check_in: datetime, check_out: datetime, room_type: Optional[RoomType] = None):
+    # Correlated NOT EXISTS probes ix_bookings_room_stay once per room instead of scanning bookings
+    booked = exists().where(Booking.room_id == Room.id, overlapping(check_in, check_out))
+    stmt = select(Room).where(~booked, Room.status != RoomStatus.MAINTENANCE)
+    if room_type is not None:
+        stmt = stmt.where(Room.room_type == room_type)
+    return stmt.order_by(Room.floor, Room.room_number)
+
+async def available_rooms(
+    db: AsyncSession,
+    check_in: datetime,
+    check_out: datetime,
+    room_type: Optional[RoomType] = None
+) -> List[Room]:
+    return (await db.execute(available_rooms_query(check_in, check_out, room_type))).scalars().all()
@@ -0,0 +1,119 @@
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, Awaitable, Callable, BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple, Type
+from pydantic import BaseModel, ValidationError
+from dataclasses import dataclass
+import codecs
+import csv
+import itertools
+
+# Rows validated, checked and inserted per transaction
+BULK_BATCH_SIZE = 1000
+MAX_JSON_ROWS = 10000
+MAX_REPORTED_ERRORS = 1000
+
+Row = Tuple[int, Dict[str, Any]]
+
+class BulkRowError(BaseModel):
+    row: int
+    error: str
+
+class BulkResult(BaseModel):
+    received: int = 0
+    created: int = 0
+    failed: int = 0
+    errors: List[BulkRowError] = []
+    errors_truncated: bool = False
+
+    def reject(self, row: int, error: str):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(BulkRowError(row=row, error=error))
+        else:
+            self.errors_truncated = True
+
+@dataclass
+class BulkSpec:
+    model: Any
+    schema: Type[BaseModel]
+    # Maps a validated item to insert values; raise ValueError to reject the row
+    prepare: Callable[[BaseModel], Dict[str, Any]]
+    # Set-based checks for a whole batch; returns an error message per rejected row number
+    check_batch: Callable[[AsyncSession, List[Row]], Awaitable[Dict[int, str]]]
+    after_insert: Optional[Callable[[AsyncSession, List[Dict[str, Any]]], Awaitable[None]]] = None
+
+def duplicates_within(rows: List[Row], field: str) -> Dict[int, str]:
+    seen, errors = {}, {}
+    for row_number, values in rows:
+        key = values[field]
+        if key in seen:
+            errors[row_number] = f"Duplicate {field} '{key}' (also in row {seen[key]})"
+        else:
+            seen[key] = row_number
+    return errors
+
+def json_records(items: List[Dict[str, Any]]) -> Iterator[Row]:
+    if len(items) > MAX_JSON_ROWS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_JSON_ROWS} rows per request, use the CSV import for more")
+    return enumerate(items, start=1)
+
+def csv_records(upload: BinaryIO) -> Iterator[Row]:
+    # Reads the upload incrementally, with blocking file reads, so bulk_import consumes it from a thread;
+    # empty cells are treated as missing values
+    reader = csv.DictReader(codecs.iterdecode(upload, "utf-8-sig"))
+    for row_number, record in enumerate(reader, start=1):
+        yield row_number, {key: value for key, value in record.items() if key and value not in ("", None)}
+
+def _describe(exc: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in exc.errors())
+
+async def _import_batch(db: AsyncSession, spec: BulkSpec, batch: List[Row], result: BulkResult, defaults: Dict[str, Any]):
+    prepared: List[Row] = []
+    for row_number, record in batch:
+        result.received += 1
+        try:
+            prepared.append((row_number, {**defaults, **spec.prepare(spec.schema.model_validate(record))}))
+        except ValidationError as exc:
+            result.reject(row_number, _describe(exc))
+        except (ValueError, TypeError) as exc:
+            result.reject(row_number, str(exc))
+
+    rejected = await spec.check_batch(db, prepared) if prepared else {}
+    for row_number, error in sorted(rejected.items()):
+        result.reject(row_number, error)
+    rows = [values for row_number, values in prepared if row_number not in rejected]
+    if not rows:
+        # Ends the transaction of the batch checks, which may hold row locks (see lock_rooms)
+        await db.rollback()
+        return
+
+    try:
+        await db.execute(insert(spec.model), rows)
+        if spec.after_insert is not None:
+            await spec.after_insert(db, rows)
+        await db.commit()
+    except IntegrityError as exc:
+        # A concurrent writer won a race the batch checks could not see; fail the batch, keep going
+        await db.rollback()
+        for row_number, values in prepared:
+            if row_number not in rejected:
+                result.reject(row_number, f"Batch rejected by database: {exc.orig}")
+        return
+    result.created += len(rows)
+
+def _next_batch(records: Iterator[Row]) -> List[Row]:
+    return list(itertools.islice(records, BULK_BATCH_SIZE))
+
+async def bulk_import(db: AsyncSession, spec: BulkSpec, records: Iterable[Row], defaults: Optional[Dict[str, Any]] = None) -> BulkResult:
+    result = BulkResult()
+    defaults = defaults or {}
+    records = iter(records)
+    while True:
+        # Pulling a batch may read an uploaded file; that IO stays off the event loop
+        batch = await run_in_threadpool(_next_batch, records)
+        if not batch:
+            return result
+        await _import_batch(db, spec, batch, result, defaults)
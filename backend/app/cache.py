@@ -0,0 +1,134 @@
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+import json
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+class LRUCache:
+    # In-process cache with a per-entry TTL and least-recently-used eviction
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": "memory",
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+class RedisCache:
+    # Shared tier for values that must be consistent across workers; values are stored as JSON
+    def __init__(self, url: str, namespace: str, ttl: float = 60.0):
+        import redis.asyncio as redis
+        from redis.exceptions import RedisError
+
+        self._client = redis.from_url(url)
+        self._errors = (RedisError, OSError)
+        self.namespace = namespace
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def _key(self, key: Hashable) -> str:
+        return f"{self.namespace}:{key}"
+
+    async def get(self, key: Hashable) -> Any:
+        try:
+            raw = await self._client.get(self._key(key))
+        except self._errors as exc:
+            self.errors += 1
+            logger.warning("Redis cache get failed for %s: %s", self.namespace, exc)
+            return None
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(raw)
+
+    async def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        try:
+            await self._client.set(self._key(key), json.dumps(value, default=str), ex=max(1, int(self.ttl if ttl is None else ttl)))
+        except self._errors as exc:
+            self.errors += 1
+            logger.warning("Redis cache set failed for %s: %s", self.namespace, exc)
+
+    async def delete(self, key: Hashable) -> None:
+        try:
+            await self._client.delete(self._key(key))
+        except self._errors as exc:
+            self.errors += 1
+            logger.warning("Redis cache delete failed for %s: %s", self.namespace, exc)
+
+    async def counter(self, key: Hashable) -> Optional[int]:
+        # Current value of a counter (0 if never incremented), or None when Redis is unreachable
+        try:
+            raw = await self._client.get(self._key(key))
+        except self._errors as exc:
+            self.errors += 1
+            logger.warning("Redis counter read failed for %s: %s", self.namespace, exc)
+            return None
+        return int(raw or 0)
+
+    async def incr(self, key: Hashable) -> Optional[int]:
+        try:
+            return await self._client.incr(self._key(key))
+        except self._errors as exc:
+            self.errors += 1
+            logger.warning("Redis counter increment failed for %s: %s", self.namespace, exc)
+            return None
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": "redis",
+            "namespace": self.namespace,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,67 @@
+from celery import Celery
+from celery.schedules import crontab
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+REDIS_URL = os.getenv("REDIS_URL")
+CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", REDIS_URL)
+CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND", REDIS_URL)
+
+# Without a broker (tests, local development) jobs run inline and results are kept in memory
+CELERY_TASK_ALWAYS_EAGER = os.getenv("CELERY_TASK_ALWAYS_EAGER", "false" if CELERY_BROKER_URL else "true").lower() == "true"
+
+# Periodic jobs (run `celery -A app.celery beat` next to the workers), in UTC. The night audit closes the
+# previous day, so it should run once the last late arrivals have checked in.
+NIGHT_AUDIT_HOUR = int(os.getenv("NIGHT_AUDIT_HOUR", "3"))
+NIGHT_AUDIT_MINUTE = int(os.getenv("NIGHT_AUDIT_MINUTE", "0"))
+TOMBSTONE_PRUNE_HOUR = int(os.getenv("TOMBSTONE_PRUNE_HOUR", "4"))
+# Job results (and the record of who submitted each job) are kept this long
+JOB_RESULT_HOURS = int(os.getenv("JOB_RESULT_HOURS", "24"))
+
+app = Celery("hotel", include=["app.jobs"])
+
+if CELERY_TASK_ALWAYS_EAGER:
+    app.conf.update(
+        broker_url="memory://",
+        result_backend="cache+memory://",
+        task_always_eager=True,
+        task_eager_propagates=False,
+        task_store_eager_result=True,
+    )
+else:
+    app.conf.update(
+        broker_url=CELERY_BROKER_URL,
+        result_backend=CELERY_RESULT_BACKEND,
+    )
+
+app.conf.update(
+    task_serializer="json",
+    result_serializer="json",
+    accept_content=["json"],
+    task_track_started=True,
+    task_acks_late=True,
+    worker_prefetch_multiplier=1,
+    result_expires=JOB_RESULT_HOURS * 60 * 60,
+    timezone="UTC",
+)
+
+app.conf.beat_schedule = {
+    "night-audit": {
+        "task": "night_audit.run",
+        "schedule": crontab(hour=NIGHT_AUDIT_HOUR, minute=NIGHT_AUDIT_MINUTE),
+    },
+    "prune-tombstones": {
+        "task": "tombstones.prune",
+        "schedule": crontab(hour=TOMBSTONE_PRUNE_HOUR, minute=30),
+    },
+    "prune-idempotency-keys": {
+        "task": "idempotency_keys.prune",
+        "schedule": crontab(minute=45),
+    },
+    "prune-jobs": {
+        "task": "jobs.prune",
+        "schedule": crontab(minute=50),
+    },
+}
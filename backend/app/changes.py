@@ -0,0 +1,136 @@
+from fastapi import HTTPException, Request, Response
+from sqlalchemy import delete, event, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from typing import Any, Awaitable, Callable, Dict, Generic, List, Optional, Tuple, TypeVar, Union
+from pydantic import BaseModel
+from datetime import datetime, timedelta, timezone
+import hashlib
+import os
+import time
+from dotenv import load_dotenv
+
+from .database import replica_settings
+from .models import Booking, Guest, Room, Task, Tombstone
+from .pagination import PageParams, paginate
+from .response_cache import response_cache
+from .serialization import Projection, json_response
+
+load_dotenv()
+
+# Longest a write transaction may stay open between stamping updated_at and committing. Rows stamped inside
+# this window (plus the allowed replica lag) may still become visible, so neither ETags nor delta watermarks
+# treat them as settled.
+CHANGE_SETTLE_SECONDS = float(os.getenv("CHANGE_SETTLE_SECONDS", "10"))
+TOMBSTONE_RETENTION_DAYS = int(os.getenv("TOMBSTONE_RETENTION_DAYS", "30"))
+CACHE_CONTROL = "private, no-cache"
+
+# Resources whose deletes are recorded for updated_since clients, keyed by table name
+TRACKED_MODELS = {model.__tablename__: model for model in (Room, Guest, Booking, Task)}
+
+T = TypeVar("T")
+
+class Delta(BaseModel, Generic[T]):
+    # Rows created or changed since updated_since, and ids deleted since then (on the first page only).
+    # Once next_cursor is exhausted, pass next_updated_since on the following poll.
+    items: List[T]
+    deleted: List[int]
+    next_cursor: Optional[str] = None
+    next_updated_since: Optional[datetime] = None
+    limit: int
+
+def settle_window() -> timedelta:
+    lag = replica_settings.max_lag_seconds if replica_settings.urls.strip() else 0.0
+    return timedelta(seconds=CHANGE_SETTLE_SECONDS + lag)
+
+@event.listens_for(Session, "before_flush")
+def record_tombstones(session: Session, flush_context, instances):
+    for obj in session.deleted:
+        table = getattr(obj, "__tablename__", None)
+        if table in TRACKED_MODELS:
+            session.add(Tombstone(resource=table, row_id=obj.id))
+
+async def collection_etag(request: Request, db: AsyncSession, model) -> str:
+    # One aggregate over the whole table rather than the filtered rows, so rows leaving a filter still change it.
+    # The count catches deletes; max(updated_at) catches inserts and updates.
+    count, latest = (await db.execute(select(func.count(model.id), func.max(model.updated_at)))).one()
+    parts = [request.url.path, str(request.url.query), str(count), latest.isoformat() if latest else "-"]
+    if latest is not None and latest > datetime.utcnow() - settle_window():
+        # A transaction stamped before `latest` may still commit without moving it; rotate the tag every
+        # window until the table settles so such a commit is picked up
+        parts.append(str(int(time.time() // settle_window().total_seconds())))
+    return 'W/"' + hashlib.sha1("|".join(parts).encode()).hexdigest()[:32] + '"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    # If-None-Match uses the weak comparison
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or any(candidate.removeprefix("W/") == etag.removeprefix("W/") for candidate in candidates)
+
+async def conditional(
+    request: Request,
+    db: AsyncSession,
+    model,
+    build: Callable[[], Awaitable[Union[BaseModel, bytes]]],
+    cached: Optional[Tuple[str, str]] = None,
+) -> Response:
+    # Answers If-None-Match with 304 before the list is queried or serialized. With cached=(resource, scope)
+    # the body goes through the response cache, stored under the ETag sent with it, so a body cached before a
+    # change the version did not catch (a write in another process) is never served under the newer tag.
+    etag = await collection_etag(request, db, model)
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    if cached is not None:
+        resource, scope = cached
+        result = await response_cache.respond(request, resource, scope, db, build, state=etag)
+    else:
+        result = await build()
+    response = result if isinstance(result, Response) else json_response(result)
+    response.headers.update(headers)
+    return response
+
+def normalize_since(updated_since: datetime) -> datetime:
+    # updated_at is stored as naive UTC
+    if updated_since.tzinfo is not None:
+        updated_since = updated_since.astimezone(timezone.utc).replace(tzinfo=None)
+    if updated_since < datetime.utcnow() - timedelta(days=TOMBSTONE_RETENTION_DAYS):
+        raise HTTPException(
+            status_code=410,
+            detail=f"updated_since is older than the {TOMBSTONE_RETENTION_DAYS} day delete history; reload the full list"
+        )
+    return updated_since
+
+def reject_filters(filters: Dict[str, Any]):
+    # A row that stops matching a filter would never be reported, so deltas always cover the whole collection
+    used = sorted(name for name, value in filters.items() if value is not None)
+    if used:
+        raise HTTPException(status_code=400, detail=f"updated_since cannot be combined with: {', '.join(used)}")
+
+async def delta(db: AsyncSession, projection: Projection, updated_since: datetime, page: PageParams) -> bytes:
+    # Encoded Delta of the projection's model
+    model = projection.model
+    started = datetime.utcnow()
+    since = normalize_since(updated_since)
+    # Keyset over (updated_at, id); any sort requested alongside updated_since is ignored
+    page.sort = "updated_at"
+    rows, next_cursor = await paginate(db, model, projection.select().where(model.updated_at >= since), page, {"updated_at": model.updated_at})
+
+    deleted = []
+    if not page.cursor:
+        deleted = list((await db.execute(
+            select(Tombstone.row_id)
+            .where(Tombstone.resource == model.__tablename__, Tombstone.deleted_at >= since)
+            .order_by(Tombstone.deleted_at, Tombstone.id)
+        )).scalars())
+
+    # Overlaps the settle window, so a client may see a row twice but never misses one committed late
+    next_updated_since = None if next_cursor else max(since, started - settle_window())
+    return projection.page(rows, next_cursor, page.limit, deleted=deleted, next_updated_since=next_updated_since)
+
+def prune_tombstones(db: Session) -> int:
+    cutoff = datetime.utcnow() - timedelta(days=TOMBSTONE_RETENTION_DAYS)
+    result = db.execute(delete(Tombstone).where(Tombstone.deleted_at < cutoff))
+    db.commit()
+    return result.rowcount
@@ -0,0 +1,213 @@
+from sqlalchemy import bindparam, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, Iterable, List, Optional, Tuple
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+import heapq
+import os
+import time
+from dotenv import load_dotenv
+
+from .models import Booking, BookingStatus, Priority, Room, Task, TaskStatus, TaskType, User, UserRole
+
+load_dotenv()
+
+# Working minutes per attendant and shift; tasks that fit nobody stay unassigned
+DISPATCH_SHIFT_MINUTES = int(os.getenv("DISPATCH_SHIFT_MINUTES", "480"))
+# What a floor change costs an attendant (walking, lift, moving the cart), in minutes of work
+DISPATCH_FLOOR_CHANGE_MINUTES = int(os.getenv("DISPATCH_FLOOR_CHANGE_MINUTES", "10"))
+# Deadlines in the same window count as equally urgent, so the floor decides the order within it
+DISPATCH_WINDOW_MINUTES = int(os.getenv("DISPATCH_WINDOW_MINUTES", "60"))
+# Check-ins this far ahead make a room's cleaning due before the guest arrives
+DISPATCH_CHECK_IN_HORIZON_HOURS = int(os.getenv("DISPATCH_CHECK_IN_HORIZON_HOURS", "24"))
+
+# Housekeeping work; maintenance is left to manual assignment
+DISPATCH_TASK_TYPES = (TaskType.CLEANING, TaskType.INSPECTION)
+TASK_MINUTES = {TaskType.CLEANING: 30, TaskType.INSPECTION: 10, TaskType.MAINTENANCE: 45}
+PRIORITY_RANK = {Priority.URGENT: 0, Priority.HIGH: 1, Priority.MEDIUM: 2, Priority.LOW: 3}
+
+@dataclass
+class PlanTask:
+    id: int
+    room_id: int
+    floor: int
+    room_number: str
+    priority: Priority
+    task_type: TaskType
+    # Earlier of due_date and the room's next check-in
+    deadline: Optional[datetime] = None
+
+@dataclass
+class Attendant:
+    id: int
+    # Minutes of work already queued, i.e. when the next task could start
+    minutes: int = 0
+    floor: Optional[int] = None
+    tasks: List[int] = field(default_factory=list)
+    floors: List[int] = field(default_factory=list)
+
+@dataclass
+class Assignment:
+    task_id: int
+    assigned_to: int
+    sequence: int
+    starts_in_minutes: int
+    late: bool
+
+@dataclass
+class Plan:
+    assignments: List[Assignment]
+    staff: List[Attendant]
+    unassigned: List[int]
+    # Planned for someone but started, or taken by a concurrent dispatch, before the plan was saved
+    lost: List[int] = field(default_factory=list)
+
+def _order_key(task: PlanTask, now: datetime):
+    if task.deadline is None:
+        window = float("inf")
+    else:
+        window = max(0, int((task.deadline - now).total_seconds() // (DISPATCH_WINDOW_MINUTES * 60)))
+    return (PRIORITY_RANK.get(task.priority, len(PRIORITY_RANK)), window, task.floor, task.room_number, task.id)
+
+def plan(
+    tasks: Iterable[PlanTask],
+    staff: List[Attendant],
+    now: datetime,
+    capacity_minutes: int = DISPATCH_SHIFT_MINUTES,
+    floor_change_minutes: int = DISPATCH_FLOOR_CHANGE_MINUTES
+) -> Plan:
+    # Greedy list scheduling. Tasks are taken most urgent first (priority, then deadline window, then floor), and
+    # each goes to whoever would start it earliest, counting a floor change as extra work. Two heaps with lazy
+    # deletion find the candidates in O(log staff): the least loaded attendant overall, and the least loaded one
+    # already on the task's floor.
+    by_id = {attendant.id: attendant for attendant in staff}
+    overall = [(attendant.minutes, attendant.id) for attendant in staff]
+    heapq.heapify(overall)
+    on_floor: Dict[int, list] = {}
+    for attendant in staff:
+        if attendant.floor is not None:
+            on_floor.setdefault(attendant.floor, []).append((attendant.minutes, attendant.id))
+    for heap in on_floor.values():
+        heapq.heapify(heap)
+
+    def peek(heap, floor=None) -> Optional[Attendant]:
+        while heap:
+            minutes, attendant_id = heap[0]
+            attendant = by_id[attendant_id]
+            if attendant.minutes == minutes and (floor is None or attendant.floor == floor):
+                return attendant
+            heapq.heappop(heap)
+        return None
+
+    assignments, unassigned = [], []
+    for task in sorted(tasks, key=lambda task: _order_key(task, now)):
+        need = TASK_MINUTES[task.task_type]
+        candidates = []
+        local = peek(on_floor.get(task.floor, []), task.floor)
+        if local is not None:
+            candidates.append((local.minutes, local))
+        nearest = peek(overall)
+        if nearest is not None:
+            walk = 0 if nearest.floor in (None, task.floor) else floor_change_minutes
+            candidates.append((nearest.minutes + walk, nearest))
+        feasible = [(start, attendant) for start, attendant in candidates if start + need <= capacity_minutes]
+        if not feasible:
+            unassigned.append(task.id)
+            continue
+
+        start, attendant = min(feasible, key=lambda candidate: (candidate[0], candidate[1].id))
+        attendant.minutes = start + need
+        if attendant.floor != task.floor:
+            attendant.floor = task.floor
+            attendant.floors.append(task.floor)
+        attendant.tasks.append(task.id)
+        late = task.deadline is not None and now + timedelta(minutes=attendant.minutes) > task.deadline
+        assignments.append(Assignment(task.id, attendant.id, len(attendant.tasks), start, late))
+        heapq.heappush(overall, (attendant.minutes, attendant.id))
+        heapq.heappush(on_floor.setdefault(task.floor, []), (attendant.minutes, attendant.id))
+    return Plan(assignments, staff, unassigned)
+
+async def load_plan_inputs(db: AsyncSession, now: datetime, rebalance: bool = False) -> Tuple[List[PlanTask], List[Attendant]]:
+    # Open housekeeping tasks with their floor (ix_tasks_status_assigned_to), the next check-in per room
+    # (ix_bookings_status_check_in) and active attendants. Work that stays put counts as existing load:
+    # tasks in progress, and in incremental mode pending tasks that already have an attendant.
+    staff = {
+        user_id: Attendant(user_id)
+        for user_id in (await db.execute(
+            select(User.id).where(User.role == UserRole.HOUSEKEEPING, User.is_active == True).order_by(User.id)
+        )).scalars()
+    }
+    check_ins = dict((await db.execute(
+        select(Booking.room_id, func.min(Booking.check_in_date))
+        .where(
+            Booking.status == BookingStatus.CONFIRMED,
+            Booking.check_in_date >= now,
+            Booking.check_in_date < now + timedelta(hours=DISPATCH_CHECK_IN_HORIZON_HOURS),
+        )
+        .group_by(Booking.room_id)
+    )).all())
+    rows = await db.execute(
+        select(Task.id, Task.room_id, Task.task_type, Task.priority, Task.status, Task.assigned_to, Task.due_date, Room.floor, Room.room_number)
+        .join(Room, Room.id == Task.room_id)
+        .where(Task.status.in_((TaskStatus.PENDING, TaskStatus.IN_PROGRESS)), Task.task_type.in_(DISPATCH_TASK_TYPES))
+        .order_by(Task.id)
+    )
+
+    tasks = []
+    # In-progress work first, so queued pending work decides where each attendant ends up
+    for task_id, room_id, task_type, priority, status, assigned_to, due_date, floor, room_number in sorted(rows, key=lambda row: row.status != TaskStatus.IN_PROGRESS):
+        attendant = staff.get(assigned_to)
+        movable = status == TaskStatus.PENDING and (attendant is None or rebalance)
+        if not movable:
+            if attendant is not None:
+                walk = 0 if attendant.floor in (None, floor) else DISPATCH_FLOOR_CHANGE_MINUTES
+                attendant.minutes += walk + TASK_MINUTES[task_type]
+                attendant.floor = floor
+            continue
+        deadlines = [deadline for deadline in (due_date, check_ins.get(room_id)) if deadline is not None]
+        tasks.append(PlanTask(task_id, room_id, floor, room_number, priority or Priority.MEDIUM, task_type, min(deadlines) if deadlines else None))
+    return tasks, list(staff.values())
+
+async def has_unassigned(db: AsyncSession) -> bool:
+    # Probes ix_tasks_status_assigned_to; lets callers skip loading every open task when nothing waits
+    stmt = select(Task.id).where(
+        Task.status == TaskStatus.PENDING, Task.assigned_to.is_(None), Task.task_type.in_(DISPATCH_TASK_TYPES)
+    ).limit(1)
+    return (await db.execute(stmt)).first() is not None
+
+async def dispatch(db: AsyncSession, rebalance: bool = False, dry_run: bool = False, capacity_minutes: int = DISPATCH_SHIFT_MINUTES) -> Tuple[Plan, float]:
+    now = datetime.utcnow()
+    tasks, staff = await load_plan_inputs(db, now, rebalance)
+    started = time.perf_counter()
+    result = plan(tasks, staff, now, capacity_minutes)
+    planning_ms = (time.perf_counter() - started) * 1000
+
+    if not dry_run and result.assignments:
+        # One executemany; the guards skip tasks that were started, or taken by a concurrent dispatch, meanwhile
+        stmt = (
+            update(Task.__table__)
+            .where(Task.__table__.c.id == bindparam("b_id"), Task.__table__.c.status == TaskStatus.PENDING)
+            .values(assigned_to=bindparam("b_assigned_to"), updated_at=bindparam("b_updated_at"))
+        )
+        if not rebalance:
+            stmt = stmt.where(Task.__table__.c.assigned_to.is_(None))
+        saved = await db.execute(stmt, [
+            {"b_id": assignment.task_id, "b_assigned_to": assignment.assigned_to, "b_updated_at": now}
+            for assignment in result.assignments
+        ])
+        if not saved.supports_sane_multi_rowcount() or saved.rowcount != len(result.assignments):
+            await _drop_lost(db, result)
+        await db.commit()
+    return result, planning_ms
+
+async def _drop_lost(db: AsyncSession, result: Plan):
+    # Some guarded updates matched nothing; only assignments that now stand are reported. The attendants'
+    # minutes still include the lost tasks, the next dispatch plans from the stored state again.
+    planned = {assignment.task_id: assignment.assigned_to for assignment in result.assignments}
+    stored = dict((await db.execute(select(Task.id, Task.assigned_to).where(Task.id.in_(list(planned))))).all())
+    result.lost = sorted(task_id for task_id, attendant_id in planned.items() if stored.get(task_id) != attendant_id)
+    if result.lost:
+        lost = set(result.lost)
+        result.assignments = [assignment for assignment in result.assignments if assignment.task_id not in lost]
+        for attendant in result.staff:
+            attendant.tasks = [task_id for task_id in attendant.tasks if task_id not in lost]
@@ -0,0 +1,168 @@
+from pydantic import BaseModel
+from typing import Any, Dict, Optional, Set, Union
+from collections import Counter
+from datetime import datetime
+import asyncio
+import json
+import logging
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Per-connection backlog; a client that falls this far behind loses it and is told to resync
+EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "256"))
+# A single send blocked this long (full socket buffers) closes the connection
+EVENTS_SEND_TIMEOUT_SECONDS = float(os.getenv("EVENTS_SEND_TIMEOUT_SECONDS", "10"))
+# Idle connections get a ping this often, well inside proxy read timeouts
+EVENTS_HEARTBEAT_SECONDS = float(os.getenv("EVENTS_HEARTBEAT_SECONDS", "25"))
+# Needed with more than one worker (or celery publishers): events are fanned out through Redis pub/sub
+EVENTS_REDIS = os.getenv("EVENTS_REDIS", "false").lower() == "true"
+REDIS_URL = os.getenv("REDIS_URL")
+EVENTS_CHANNEL = os.getenv("EVENTS_CHANNEL", "hotel:events")
+
+# Permission a subscriber needs for each resource's events, the same one its list endpoint checks
+RESOURCE_PERMISSIONS = {"rooms": "rooms", "bookings": "bookings", "tasks": "tasks"}
+
+PING = json.dumps({"type": "ping"})
+RESYNC = json.dumps({"type": "resync"})
+
+def encode_event(resource: str, action: str, id: Optional[int] = None, data: Union[BaseModel, Dict[str, Any], None] = None) -> str:
+    if isinstance(data, BaseModel):
+        data = data.model_dump(mode="json")
+    event = {"type": "event", "resource": resource, "action": action, "id": id, "data": data, "at": datetime.utcnow().isoformat()}
+    return json.dumps(event, separators=(",", ":"))
+
+class Subscriber:
+    def __init__(self, resources: Set[str], queue_size: int):
+        self.resources = resources
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.overflows = 0
+
+    def offer(self, message: str) -> bool:
+        # Never blocks the publisher. A client that cannot keep up loses its backlog and gets a single resync
+        # message instead, after which it reloads with updated_since.
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            self.overflows += 1
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+            return False
+
+class EventBus:
+    # Delivers change events to the WebSocket subscribers of this worker. With Redis every publish goes
+    # through one channel that each worker listens on; without it the bus is an in-process stand-in that
+    # only reaches this worker's subscribers (single worker, tests, local development).
+    def __init__(self, redis_url: Optional[str] = None, channel: str = EVENTS_CHANNEL):
+        self.redis_url = redis_url
+        self.channel = channel
+        self.subscribers: Set[Subscriber] = set()
+        self._client = None
+        self._sync_client = None
+        self._listener: Optional[asyncio.Task] = None
+        self.published: Counter = Counter()
+        self.delivered = 0
+        self.overflows = 0
+        self.errors = 0
+
+    def subscribe(self, resources: Set[str]) -> Subscriber:
+        subscriber = Subscriber(resources, EVENTS_QUEUE_SIZE)
+        self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self.subscribers.discard(subscriber)
+
+    def dispatch(self, message: str, resource: Optional[str]):
+        # resource None reaches everyone (resync after a lost Redis connection)
+        for subscriber in list(self.subscribers):
+            if resource is None or resource in subscriber.resources:
+                if subscriber.offer(message):
+                    self.delivered += 1
+                else:
+                    self.overflows += 1
+
+    async def publish(self, resource: str, action: str, id: Optional[int] = None, data: Union[BaseModel, Dict[str, Any], None] = None):
+        # Call after the write has committed
+        self.published[resource] += 1
+        message = encode_event(resource, action, id, data)
+        if self.redis_url is None:
+            self.dispatch(message, resource)
+            return
+        try:
+            if self._client is None:
+                import redis.asyncio as redis
+
+                self._client = redis.from_url(self.redis_url)
+            await self._client.publish(self.channel, message)
+        except Exception as exc:
+            # Other workers miss this one; their clients catch up on the next resync or reload
+            self.errors += 1
+            logger.warning("Publishing %s.%s event failed: %s", resource, action, exc)
+            self.dispatch(message, resource)
+
+    def publish_sync(self, resource: str, action: str, id: Optional[int] = None, data: Union[BaseModel, Dict[str, Any], None] = None):
+        # For writers outside the event loop, e.g. celery tasks; without Redis there is no one to tell
+        self.published[resource] += 1
+        if self.redis_url is None:
+            return
+        try:
+            if self._sync_client is None:
+                import redis
+
+                self._sync_client = redis.Redis.from_url(self.redis_url)
+            self._sync_client.publish(self.channel, encode_event(resource, action, id, data))
+        except Exception as exc:
+            self.errors += 1
+            logger.warning("Publishing %s.%s event failed: %s", resource, action, exc)
+
+    async def _listen(self):
+        import redis.asyncio as redis
+
+        while True:
+            client = redis.from_url(self.redis_url)
+            try:
+                async with client.pubsub() as pubsub:
+                    await pubsub.subscribe(self.channel)
+                    async for message in pubsub.listen():
+                        if message["type"] != "message":
+                            continue
+                        payload = message["data"].decode()
+                        self.dispatch(payload, json.loads(payload).get("resource"))
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                # Events published while disconnected are gone; every client has to reload
+                self.errors += 1
+                logger.warning("Event channel connection lost: %s", exc)
+                self.dispatch(RESYNC, None)
+                await asyncio.sleep(1)
+            finally:
+                await client.aclose()
+
+    async def start(self):
+        # Per worker, after the fork
+        if self.redis_url is not None and self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            self._listener = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "redis" if self.redis_url else "memory",
+            "subscribers": len(self.subscribers),
+            "published": dict(self.published),
+            "delivered": self.delivered,
+            "overflows": self.overflows,
+            "errors": self.errors,
+        }
+
+event_bus = EventBus(REDIS_URL if EVENTS_REDIS and REDIS_URL else None)
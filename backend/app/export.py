@@ -0,0 +1,88 @@
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from typing import Any, AsyncIterator, BinaryIO, List, Sequence
+from datetime import date, datetime
+import csv
+import enum
+import io
+import json
+import zlib
+
+from .database import read_session
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+# Rows pulled from the server-side cursor per round-trip
+EXPORT_CHUNK_SIZE = 2000
+
+def _plain(value: Any) -> Any:
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+def _encode_csv(columns: List[str], rows: Sequence, header: bool) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(columns)
+    writer.writerows([["" if value is None else _plain(value) for value in row] for row in rows])
+    return buffer.getvalue().encode()
+
+def _encode_ndjson(columns: List[str], rows: Sequence, header: bool) -> bytes:
+    return "".join(
+        json.dumps(dict(zip(columns, [_plain(value) for value in row])), separators=(",", ":")) + "\n"
+        for row in rows
+    ).encode()
+
+async def _stream_rows(stmt, fmt: str) -> AsyncIterator[bytes]:
+    # The export owns its session so the cursor stays open for as long as the client keeps reading
+    encode = _encode_csv if fmt == "csv" else _encode_ndjson
+    columns = [column.key for column in stmt.selected_columns]
+    header = True
+    async with read_session() as db:
+        result = await db.stream(stmt.execution_options(yield_per=EXPORT_CHUNK_SIZE))
+        async for rows in result.partitions():
+            yield encode(columns, rows, header)
+            header = False
+    if header and fmt == "csv":
+        yield encode(columns, [], header)
+
+def write_export(db: Session, stmt, fmt: str, out: BinaryIO) -> int:
+    # Synchronous variant for export jobs: writes the same bytes as the streamed response and returns the row count
+    encode = _encode_csv if fmt == "csv" else _encode_ndjson
+    columns = [column.key for column in stmt.selected_columns]
+    header = fmt == "csv"
+    if header:
+        out.write(encode(columns, [], header))
+    count = 0
+    for rows in db.execute(stmt.execution_options(yield_per=EXPORT_CHUNK_SIZE)).partitions():
+        out.write(encode(columns, rows, False))
+        count += len(rows)
+    return count
+
+async def _gzip(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+def export_response(name: str, stmt, fmt: str, compress: bool = False) -> StreamingResponse:
+    if fmt not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format '{fmt}'. Use one of: {', '.join(EXPORT_FORMATS)}")
+    
+    body = _stream_rows(stmt, fmt)
+    filename = f"{name}.{fmt}"
+    media_type = EXPORT_FORMATS[fmt]
+    if compress:
+        body = _gzip(body)
+        filename += ".gz"
+        media_type = "application/gzip"
+    return StreamingResponse(body, media_type=media_type, headers={"Content-Disposition": f'attachment; filename="{filename}"'})
\ No newline at end of file
@@ -0,0 +1,55 @@
+from fastapi import HTTPException
+from pydantic import BaseModel
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from collections import Counter
+from datetime import datetime, timedelta
+import hashlib
+import os
+from dotenv import load_dotenv
+
+from .models import IdempotencyKey
+
+load_dotenv()
+
+# Keys are kept at least this long; a retry after that is treated as a new request
+IDEMPOTENCY_KEY_TTL_HOURS = int(os.getenv("IDEMPOTENCY_KEY_TTL_HOURS", "24"))
+
+idempotency_stats: Counter = Counter()
+
+def request_hash(body: BaseModel) -> str:
+    return hashlib.sha256(body.model_dump_json().encode()).hexdigest()
+
+async def claim(db: AsyncSession, user_id: int, key: str, endpoint: str, body: BaseModel) -> IdempotencyKey:
+    # Call first in the write transaction. Returns either a new key row, whose resource_id the caller sets before
+    # committing, or the row of an earlier request with this key, whose resource_id is the result to return.
+    # A retry of a finished request finds its row straight away. One sent while the first is still running waits
+    # on the key's primary key and then reads the committed row; if the first request failed, its row is gone
+    # and the retry runs for real.
+    digest = request_hash(body)
+    existing = await db.get(IdempotencyKey, (user_id, key))
+    if existing is None:
+        record = IdempotencyKey(user_id=user_id, key=key, endpoint=endpoint, request_hash=digest)
+        db.add(record)
+        try:
+            await db.flush()
+            return record
+        except IntegrityError:
+            await db.rollback()
+        existing = await db.get(IdempotencyKey, (user_id, key))
+    if existing is None:
+        # Pruned between the two statements
+        raise HTTPException(status_code=409, detail="Idempotency-Key is being reused, please retry")
+    if existing.endpoint != endpoint or existing.request_hash != digest:
+        idempotency_stats["mismatched"] += 1
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+    idempotency_stats["replayed"] += 1
+    return existing
+
+def prune_idempotency_keys(db: Session) -> int:
+    cutoff = datetime.utcnow() - timedelta(hours=IDEMPOTENCY_KEY_TTL_HOURS)
+    result = db.execute(delete(IdempotencyKey).where(IdempotencyKey.created_at < cutoff))
+    db.commit()
+    return result.rowcount
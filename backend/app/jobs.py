@@ -0,0 +1,147 @@
+from sqlalchemy import delete
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import NullPool
+from typing import Any, BinaryIO, Dict, Optional
+from datetime import date, datetime, timedelta
+import asyncio
+import gzip
+import importlib
+import json
+import os
+import tempfile
+from dotenv import load_dotenv
+
+from .celery import JOB_RESULT_HOURS, app
+from .bulk import BulkSpec, bulk_import, csv_records
+from .changes import prune_tombstones
+from .database import ASYNC_DATABASE_URL, SessionLocal
+from .events import event_bus
+from .export import write_export
+from .idempotency import prune_idempotency_keys
+from .models import Job, Report
+from .report_engine import build_report
+from . import night_audit
+from .response_cache import response_cache
+from . import rollups
+
+load_dotenv()
+
+# Uploads waiting to be imported and finished exports. Must be shared by the API and the celery workers.
+JOB_FILES_DIR = os.getenv("JOB_FILES_DIR", os.path.join(tempfile.gettempdir(), "hotel-jobs"))
+
+# Resources with a CSV import, and the name of their BulkSpec
+IMPORT_SPECS = {"rooms": "ROOM_BULK_SPEC", "guests": "GUEST_BULK_SPEC", "bookings": "BOOKING_BULK_SPEC"}
+# Resources with an export_query
+EXPORTS = ("bookings", "guests", "tasks")
+
+# Connection drops and lock timeouts are worth retrying; bad input is not
+RETRY_OPTIONS = {
+    "autoretry_for": (OperationalError,),
+    "retry_backoff": True,
+    "retry_backoff_max": 300,
+    "max_retries": 5,
+}
+
+@app.task(name="reports.generate", **RETRY_OPTIONS)
+def generate_report(title: str, report_type: str, period_start: str, period_end: str) -> dict:
+    with SessionLocal() as db:
+        data = build_report(db, report_type, datetime.fromisoformat(period_start), datetime.fromisoformat(period_end))
+        report = Report(
+            title=title,
+            report_type=report_type,
+            period_start=datetime.fromisoformat(period_start),
+            period_end=datetime.fromisoformat(period_end),
+            data=json.dumps(data)
+        )
+        db.add(report)
+        db.commit()
+        report_id = report.id
+    response_cache.invalidate_sync("reports")
+    return {"report_id": report_id}
+
+@app.task(name="rollups.rebuild", **RETRY_OPTIONS)
+def rebuild_rollups(start: str, end: str) -> dict:
+    with SessionLocal() as db:
+        days = rollups.rebuild(db, date.fromisoformat(start), date.fromisoformat(end))
+    rollups.stats_cache.clear()
+    return {"days": days}
+
+@app.task(name="tombstones.prune", **RETRY_OPTIONS)
+def prune_deleted_history() -> dict:
+    # Deletes older than TOMBSTONE_RETENTION_DAYS; clients further behind get 410 and reload in full
+    with SessionLocal() as db:
+        pruned = prune_tombstones(db)
+    return {"pruned": pruned}
+
+@app.task(name="night_audit.run", **RETRY_OPTIONS)
+def run_night_audit(business_date: Optional[str] = None, rerun: bool = False) -> dict:
+    # Scheduled nightly by celery beat; a retry resumes from the last committed chunk
+    with SessionLocal() as db:
+        return night_audit.run(db, date.fromisoformat(business_date) if business_date else None, rerun=rerun)
+
+@app.task(name="idempotency_keys.prune", **RETRY_OPTIONS)
+def prune_expired_idempotency_keys() -> dict:
+    # Keys older than IDEMPOTENCY_KEY_TTL_HOURS; a retry after that books again
+    with SessionLocal() as db:
+        pruned = prune_idempotency_keys(db)
+    return {"pruned": pruned}
+
+def job_file(job_id: str, suffix: str) -> str:
+    os.makedirs(JOB_FILES_DIR, exist_ok=True)
+    return os.path.join(JOB_FILES_DIR, f"{job_id}.{suffix}")
+
+def _router(resource: str):
+    # Import specs and export queries live with their routers, loaded on first use so the worker starts light
+    return importlib.import_module(f"app.routers.{resource}")
+
+async def _import_csv(spec: BulkSpec, upload: BinaryIO, defaults: Optional[Dict[str, Any]]):
+    # bulk_import and its batch checks are async. Each job gets its own event loop, so it gets its own
+    # unpooled engine too: pooled connections cannot move between loops.
+    engine = create_async_engine(ASYNC_DATABASE_URL, poolclass=NullPool)
+    try:
+        async with AsyncSession(engine, expire_on_commit=False) as db:
+            return await bulk_import(db, spec, csv_records(upload), defaults)
+    finally:
+        await engine.dispose()
+
+# Not retried: batches committed before a failure would be rejected as duplicates the second time
+@app.task(name="bulk.import")
+def import_file(resource: str, user_id: int) -> dict:
+    path = job_file(import_file.request.id, "csv")
+    spec = getattr(_router(resource), IMPORT_SPECS[resource])
+    try:
+        with open(path, "rb") as upload:
+            result = asyncio.run(_import_csv(spec, upload, {"created_by": user_id} if resource == "bookings" else None))
+    finally:
+        os.remove(path)
+    if resource == "rooms":
+        response_cache.invalidate_sync("rooms")
+    # Guests reach the search index with its next refresh
+    event_bus.publish_sync(resource, "imported", data={"created": result.created})
+    return result.model_dump()
+
+@app.task(name="bulk.export", **RETRY_OPTIONS)
+def export_file(resource: str, fmt: str, compress: bool = False, date_from: Optional[str] = None, date_to: Optional[str] = None) -> dict:
+    stmt = _router(resource).export_query(
+        datetime.fromisoformat(date_from) if date_from else None, datetime.fromisoformat(date_to) if date_to else None
+    )
+    suffix = fmt + (".gz" if compress else "")
+    with SessionLocal() as db, (gzip.open if compress else open)(job_file(export_file.request.id, suffix), "wb") as out:
+        rows = write_export(db, stmt, fmt, out)
+    return {"rows": rows, "filename": f"{resource}.{suffix}"}
+
+@app.task(name="jobs.prune", **RETRY_OPTIONS)
+def prune_jobs() -> dict:
+    # Records of submitted jobs expire together with the celery results they point to, and so do their files
+    cutoff = datetime.utcnow() - timedelta(hours=JOB_RESULT_HOURS)
+    with SessionLocal() as db:
+        pruned = db.execute(delete(Job).where(Job.created_at < cutoff)).rowcount
+        db.commit()
+    files = 0
+    if os.path.isdir(JOB_FILES_DIR):
+        for entry in os.scandir(JOB_FILES_DIR):
+            if entry.is_file() and datetime.utcfromtimestamp(entry.stat().st_mtime) < cutoff:
+                os.remove(entry.path)
+                files += 1
+    return {"pruned": pruned, "files": files}
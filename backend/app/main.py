@@ -1,25 +1,41 @@
-from fastapi import FastAPI, Depends, HTTPException, status
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi import FastAPI, HTTPException, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
-from typing import List, Optional
-import os
+from fastapi.responses import JSONResponse, PlainTextResponse
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 
-from .database import get_db, engine
-from .models import Base
-from .routers import auth, users, rooms, bookings, guests, tasks, reports
-from .auth import verify_token
+from .database import DATABASE_URL, dispose_engines, pool_status, start_replica_monitor
+from .routers import auth, users, rooms, bookings, guests, tasks, reports, dashboard, jobs, diagnostics, events
+from .auth import password_hasher, principal_cache_stats
+from .metrics import MetricsMiddleware, register_collector, render as render_metrics, scrape_allowed
+from .rollups import check_dialect, stats_cache
+from .response_cache import response_cache
+from .events import event_bus
+from .search import guest_index
+from .idempotency import idempotency_stats
 
 load_dotenv()
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    check_dialect(make_url(DATABASE_URL).get_backend_name())
+    replica_monitor = await start_replica_monitor()
+    await event_bus.start()
+    guest_index.start()
+    yield
+    if replica_monitor is not None:
+        replica_monitor.cancel()
+    await event_bus.stop()
+    password_hasher.shutdown()
+    await dispose_engines()
 
 app = FastAPI(
     title="Hotel Management System API",
     description="A comprehensive hotel management system with role-based access control",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS configuration
@@ -31,8 +47,69 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Security
-security = HTTPBearer()
+# Request latency and per-request query metrics
+app.add_middleware(MetricsMiddleware)
+
+def _cache_metrics():
+    principal = principal_cache_stats()["local"]
+    yield "principal_cache_hits", "Principal cache hits in this worker", principal["hits"]
+    yield "principal_cache_misses", "Principal cache misses in this worker", principal["misses"]
+    yield "dashboard_cache_hits", "Dashboard stats cache hits in this worker", stats_cache.hits
+    yield "dashboard_cache_misses", "Dashboard stats cache misses in this worker", stats_cache.misses
+    yield "password_hash_pending", "Password hashing operations in flight", password_hasher.pending
+    yield "password_hash_completed", "Password hashes and checks finished in this worker", password_hasher.completed
+    yield "password_hash_failed", "Password hashes and checks that raised an error", password_hasher.failed
+    yield "password_hash_rejected", "Password hashes and checks refused with a 503 while the queue was full", password_hasher.rejected
+    for resource, stats in response_cache.stats()["resources"].items():
+        yield f"response_cache_{resource}_hits", f"Cached {resource} list responses served in this worker", stats["hits"]
+        yield f"response_cache_{resource}_misses", f"Uncached {resource} list responses built in this worker", stats["misses"]
+        yield f"response_cache_{resource}_hit_rate", f"Share of {resource} list lookups served from cache", stats["hit_rate"]
+
+register_collector(_cache_metrics)
+
+def _pool_metrics():
+    for pool in pool_status():
+        name = pool["engine"]
+        if "checked_out" in pool:
+            yield f"db_pool_{name}_checked_out", f"Connections in use in the {name} pool", pool["checked_out"]
+            yield f"db_pool_{name}_utilization", f"Share of the {name} pool capacity in use", pool["utilization"]
+        yield f"db_pool_{name}_timeouts", f"Checkouts from the {name} pool that timed out", pool["timeouts"]
+        yield f"db_pool_{name}_invalidations", f"Dead connections dropped from the {name} pool", pool["invalidations"]
+
+register_collector(_pool_metrics)
+
+def _event_metrics():
+    stats = event_bus.stats()
+    yield "events_subscribers", "WebSocket event subscribers connected to this worker", stats["subscribers"]
+    yield "events_delivered", "Events queued for subscribers of this worker", stats["delivered"]
+    yield "events_overflows", "Subscriber backlogs dropped for a resync", stats["overflows"]
+    yield "events_errors", "Event channel publish and connection errors", stats["errors"]
+
+register_collector(_event_metrics)
+
+def _search_metrics():
+    stats = guest_index.stats()
+    yield "guest_search_entries", "Keys in this worker's guest search index", stats["entries"]
+    yield "guest_search_memory_bytes", "Memory held by this worker's guest search index", stats["memory_bytes"]
+    yield "guest_search_pending_changes", "Guests changed since the search index arrays were last merged", stats["pending_changes"]
+    yield "guest_search_fallbacks", "Guest searches answered with LIKE queries while the index was unavailable", stats["fallbacks"]
+
+register_collector(_search_metrics)
+
+def _idempotency_metrics():
+    yield "idempotency_replays", "Retried writes answered with the result of the first request", idempotency_stats["replayed"]
+    yield "idempotency_mismatches", "Idempotency-Keys reused for a different request", idempotency_stats["mismatched"]
+
+register_collector(_idempotency_metrics)
+
+@app.exception_handler(PoolTimeoutError)
+async def pool_exhausted(request, exc):
+    # Every connection stayed busy for pool_timeout; shed the request instead of queueing it further
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Database is busy, please retry"},
+        headers={"Retry-After": "1"},
+    )
 
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["authentication"])
@@ -42,6 +119,10 @@ app.include_router(bookings.router, prefix="/api/bookings", tags=["bookings"])
 app.include_router(guests.router, prefix="/api/guests", tags=["guests"])
 app.include_router(tasks.router, prefix="/api/tasks", tags=["tasks"])
 app.include_router(reports.router, prefix="/api/reports", tags=["reports"])
+app.include_router(dashboard.router, prefix="/api/dashboard", tags=["dashboard"])
+app.include_router(jobs.router, prefix="/api/jobs", tags=["jobs"])
+app.include_router(diagnostics.router, prefix="/api/diagnostics", tags=["diagnostics"])
+app.include_router(events.router, prefix="/api/events", tags=["events"])
 
 @app.get("/")
 async def root():
@@ -51,6 +132,14 @@ async def root():
 async def health_check():
     return {"status": "healthy", "version": "1.0.0"}
 
+@app.get("/api/metrics", response_class=PlainTextResponse)
+async def metrics(request: Request):
+    # Route, pool and cache internals: for the Prometheus scraper only, never through the public proxy
+    client = request.client.host if request.client else None
+    if not scrape_allowed(request.headers.get("authorization"), client, "x-forwarded-for" in request.headers):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Metrics need the scrape token", headers={"WWW-Authenticate": "Bearer"})
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -0,0 +1,200 @@
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from typing import Any, Callable, Counter, Dict, Iterable, List, Optional, Tuple
+from collections import Counter as StatementCounter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+import bisect
+import hmac
+import os
+import threading
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+SERVER_TIMING_HEADERS = os.getenv("SERVER_TIMING_HEADERS", "false").lower() == "true"
+# Scrapers of /api/metrics send "Authorization: Bearer <token>"; without one set, only direct local scrapes are answered
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+LOCAL_CLIENTS = ("127.0.0.1", "::1")
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+@dataclass
+class RequestStats:
+    queries: int = 0
+    db_time: float = 0.0
+    scope: Optional[Dict[str, Any]] = None
+    statements: Counter[str] = field(default_factory=StatementCounter)
+
+    @property
+    def route(self) -> str:
+        if self.scope is None:
+            return "unknown"
+        return getattr(self.scope.get("route"), "path", self.scope.get("path", "unknown"))
+
+# Set by MetricsMiddleware for the duration of each HTTP request
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...], labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.labels = labels
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str):
+        # Series layout: one count per bucket, then +Inf count, then sum
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help_text}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            snapshot = {key: list(series) for key, series in self._series.items()}
+        for label_values, series in sorted(snapshot.items()):
+            labels = ",".join(f'{name}="{value}"' for name, value in zip(self.labels, label_values))
+            prefix = labels + "," if labels else ""
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                yield f'{self.name}_bucket{{{prefix}le="{le}"}} {cumulative}'
+            suffix = "{" + labels + "}" if labels else ""
+            yield f"{self.name}_count{suffix} {cumulative}"
+            yield f"{self.name}_sum{suffix} {series[-1]}"
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", LATENCY_BUCKETS, ("method", "route", "status")
+)
+REQUEST_DB_TIME = Histogram(
+    "http_request_db_seconds", "Time spent executing SQL per request", LATENCY_BUCKETS, ("method", "route")
+)
+REQUEST_QUERIES = Histogram(
+    "http_request_queries", "SQL statements executed per request", QUERY_COUNT_BUCKETS, ("method", "route")
+)
+QUERY_LATENCY = Histogram("db_query_duration_seconds", "SQL statement execution time", LATENCY_BUCKETS)
+POOL_WAIT = Histogram("db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection", LATENCY_BUCKETS, ("engine",))
+
+# Extra gauge/counter providers, e.g. cache statistics; each returns (name, help, value) triples
+_collectors: List[Callable[[], Iterable[Tuple[str, str, float]]]] = []
+
+def register_collector(collector: Callable[[], Iterable[Tuple[str, str, float]]]):
+    _collectors.append(collector)
+
+def scrape_allowed(authorization: Optional[str], client: Optional[str], forwarded: bool) -> bool:
+    # Requests through nginx carry X-Forwarded-For, so a proxied request never counts as local
+    if METRICS_TOKEN:
+        return hmac.compare_digest((authorization or "").encode(), f"Bearer {METRICS_TOKEN}".encode())
+    return client in LOCAL_CLIENTS and not forwarded
+
+def render() -> str:
+    lines: List[str] = []
+    for histogram in (REQUEST_LATENCY, REQUEST_DB_TIME, REQUEST_QUERIES, QUERY_LATENCY, POOL_WAIT):
+        lines.extend(histogram.render())
+    for collector in _collectors:
+        for name, help_text, value in collector():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+    return "\n".join(lines) + "\n"
+
+# Per engine label: checkouts that gave up after pool_timeout, and connections dropped as dead (pre-ping or errors)
+POOL_TIMEOUTS: Counter[str] = StatementCounter()
+POOL_INVALIDATIONS: Counter[str] = StatementCounter()
+
+class _TimedCheckout:
+    # Pool mixin that records how long each checkout waited for a free connection
+    engine_label = "primary"
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            POOL_TIMEOUTS[self.engine_label] += 1
+            raise
+        finally:
+            POOL_WAIT.observe(time.perf_counter() - started, self.engine_label)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.engine_label = self.engine_label
+        return pool
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+class TimedAsyncAdaptedQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    pass
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    QUERY_LATENCY.observe(elapsed)
+    stats = current_request.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_time += elapsed
+
+def instrument_engine(engine: Engine, label: str = "primary"):
+    if isinstance(engine.pool, _TimedCheckout):
+        engine.pool.engine_label = label
+
+        def count_invalidation(dbapi_connection, connection_record, exception):
+            POOL_INVALIDATIONS[label] += 1
+
+        event.listen(engine, "invalidate", count_invalidation)
+    if METRICS_ENABLED and not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+class MetricsMiddleware:
+    # Plain ASGI middleware so streaming responses are measured until the last byte
+    def __init__(self, app, server_timing: bool = SERVER_TIMING_HEADERS):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope=scope)
+        token = current_request.set(stats)
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if self.server_timing:
+                    elapsed_ms = (time.perf_counter() - started) * 1000
+                    value = f'app;dur={elapsed_ms:.1f}, db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} queries"'
+                    message["headers"] = list(message.get("headers", [])) + [(b"server-timing", value.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_request.reset(token)
+            path = getattr(scope.get("route"), "path", "unmatched")
+            method = scope["method"]
+            REQUEST_LATENCY.observe(time.perf_counter() - started, method, path, str(status_code))
+            REQUEST_DB_TIME.observe(stats.db_time, method, path)
+            REQUEST_QUERIES.observe(stats.queries, method, path)
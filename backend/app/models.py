@@ -1,10 +1,14 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Text, ForeignKey, Enum
-from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, Boolean, Text, ForeignKey, Enum, Index
+from sqlalchemy.dialects import mysql
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
 
-Base = declarative_base()
+from .database import Base
+
+# Microsecond precision on MySQL (DATETIME defaults to whole seconds there), so ETags and updated_since deltas
+# can tell apart writes made within the same second
+PreciseDateTime = DateTime().with_variant(mysql.DATETIME(fsp=6), "mysql")
 
 class UserRole(enum.Enum):
     ADMIN = "admin"
@@ -57,7 +61,7 @@ class User(Base):
     role = Column(Enum(UserRole), nullable=False)
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = Column(PreciseDateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
     created_bookings = relationship("Booking", back_populates="created_by_user")
@@ -76,11 +80,17 @@ class Room(Base):
     last_cleaned = Column(DateTime)
     next_maintenance = Column(DateTime)
     created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = Column(PreciseDateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
     bookings = relationship("Booking", back_populates="room")
     tasks = relationship("Task", back_populates="room")
+    
+    __table_args__ = (
+        Index("ix_rooms_status", "status"),
+        Index("ix_rooms_floor", "floor"),
+        Index("ix_rooms_updated_at", "updated_at"),
+    )
 
 class Guest(Base):
     __tablename__ = "guests"
@@ -95,11 +105,16 @@ class Guest(Base):
     date_of_birth = Column(DateTime)
     nationality = Column(String(50))
     vip_status = Column(Boolean, default=False)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = Column(PreciseDateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
     bookings = relationship("Booking", back_populates="guest")
+    
+    __table_args__ = (
+        Index("ix_guests_created_at", "created_at"),
+        Index("ix_guests_updated_at", "updated_at"),
+    )
 
 class Booking(Base):
     __tablename__ = "bookings"
@@ -112,16 +127,28 @@ class Booking(Base):
     status = Column(Enum(BookingStatus), default=BookingStatus.CONFIRMED)
     total_amount = Column(Float, nullable=False)
     paid_amount = Column(Float, default=0.0)
+    # Room charges posted so far by the night audit; the balance due is charged_amount - paid_amount
+    charged_amount = Column(Float, default=0.0)
     number_of_guests = Column(Integer, default=1)
     special_requests = Column(Text)
     created_by = Column(Integer, ForeignKey("users.id"), nullable=False)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = Column(PreciseDateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
     guest = relationship("Guest", back_populates="bookings")
     room = relationship("Room", back_populates="bookings")
     created_by_user = relationship("User", back_populates="created_bookings")
+    
+    __table_args__ = (
+        Index("ix_bookings_room_stay", "room_id", "check_in_date", "check_out_date"),
+        Index("ix_bookings_guest_id", "guest_id"),
+        Index("ix_bookings_status_check_in", "status", "check_in_date"),
+        Index("ix_bookings_status_check_out", "status", "check_out_date"),
+        Index("ix_bookings_check_in_date", "check_in_date"),
+        Index("ix_bookings_created_at", "created_at"),
+        Index("ix_bookings_updated_at", "updated_at"),
+    )
 
 class Task(Base):
     __tablename__ = "tasks"
@@ -136,12 +163,20 @@ class Task(Base):
     assigned_to = Column(Integer, ForeignKey("users.id"))
     due_date = Column(DateTime)
     completed_at = Column(DateTime)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = Column(PreciseDateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
     room = relationship("Room", back_populates="tasks")
     assigned_user = relationship("User", back_populates="assigned_tasks")
+    
+    __table_args__ = (
+        Index("ix_tasks_status_assigned_to", "status", "assigned_to", "due_date"),
+        Index("ix_tasks_due_date", "due_date"),
+        Index("ix_tasks_room_id", "room_id"),
+        Index("ix_tasks_created_at", "created_at"),
+        Index("ix_tasks_updated_at", "updated_at"),
+    )
 
 class Report(Base):
     __tablename__ = "reports"
@@ -152,4 +187,77 @@ class Report(Base):
     period_start = Column(DateTime, nullable=False)
     period_end = Column(DateTime, nullable=False)
     data = Column(Text)  # JSON string of report data
-    created_at = Column(DateTime, default=datetime.utcnow)
\ No newline at end of file
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index("ix_reports_period_start", "period_start"),
+    )
+
+class DailyStat(Base):
+    __tablename__ = "daily_stats"
+    
+    # One row per calendar night, maintained incrementally as bookings change
+    stat_date = Column(Date, primary_key=True)
+    rooms_sold = Column(Integer, nullable=False, default=0)
+    room_revenue = Column(Float, nullable=False, default=0.0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class Tombstone(Base):
+    __tablename__ = "tombstones"
+    
+    # One row per deleted record so updated_since clients learn about deletes; pruned after the retention window
+    id = Column(Integer, primary_key=True)
+    resource = Column(String(32), nullable=False)
+    row_id = Column(Integer, nullable=False)
+    deleted_at = Column(PreciseDateTime, nullable=False, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index("ix_tombstones_resource_deleted_at", "resource", "deleted_at"),
+    )
+
+class NightAudit(Base):
+    __tablename__ = "night_audits"
+    
+    # One row per audited business date. Each chunk commits together with the stage and keyset cursor it
+    # reached, so an interrupted audit resumes where it stopped.
+    business_date = Column(Date, primary_key=True)
+    stage = Column(String(20), nullable=False)
+    cursor_at = Column(DateTime)
+    cursor_id = Column(Integer)
+    no_shows = Column(Integer, nullable=False, default=0)
+    departures = Column(Integer, nullable=False, default=0)
+    charges = Column(Integer, nullable=False, default=0)
+    tasks_created = Column(Integer, nullable=False, default=0)
+    started_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime)
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+    
+    # Idempotency-Key headers of write requests, per user. The row is written in the same transaction as the
+    # resource it created, so a retried request finds it and gets that resource back instead of a duplicate.
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    key = Column(String(255), primary_key=True)
+    endpoint = Column(String(50), nullable=False)
+    # Hash of the request body; reusing a key for a different request is an error
+    request_hash = Column(String(64), nullable=False)
+    resource_id = Column(Integer)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index("ix_idempotency_keys_created_at", "created_at"),
+    )
+
+class Job(Base):
+    __tablename__ = "jobs"
+    
+    # Background jobs submitted through /api/jobs; the id is the celery task id. Results are shown only to the
+    # submitter (and admins), and only while they still hold the permission the job needed.
+    id = Column(String(36), primary_key=True)
+    kind = Column(String(50), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index("ix_jobs_created_at", "created_at"),
+    )
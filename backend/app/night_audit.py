@@ -0,0 +1,204 @@
+from sqlalchemy import and_, insert, or_, select, true, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from typing import Dict, Optional, Tuple
+from datetime import date, datetime, timedelta
+import argparse
+import os
+from dotenv import load_dotenv
+
+from .events import event_bus
+from .models import Booking, BookingStatus, NightAudit, Priority, Room, RoomStatus, Task, TaskStatus, TaskType
+from .pricing import stay_nights
+from .response_cache import response_cache
+from . import rollups
+
+load_dotenv()
+
+# Bookings locked and committed per transaction; each chunk also records how far the audit got
+NIGHT_AUDIT_CHUNK_SIZE = int(os.getenv("NIGHT_AUDIT_CHUNK_SIZE", "1000"))
+# Cancelling no-shows relies on arrivals being recorded through POST /api/bookings/{id}/check-in. Until the front
+# desk does that for every guest, a confirmed booking may be a guest in the house, so the stage is off by default.
+NIGHT_AUDIT_NO_SHOWS = os.getenv("NIGHT_AUDIT_NO_SHOWS", "false").lower() == "true"
+
+# Stages run in this order. Departures go before charges so a stay that ended is settled in full, not by the night.
+STAGES = ("no_shows", "departures", "charges")
+DONE = "done"
+
+def _keyset(column, cursor_at: Optional[datetime], cursor_id: Optional[int]):
+    if cursor_at is None:
+        return true()
+    return or_(column > cursor_at, and_(column == cursor_at, Booking.id > cursor_id))
+
+def _chunk(db: Session, status: BookingStatus, column, close: datetime, audit: NightAudit, size: int):
+    # Rows are locked until the chunk commits, so a booking edited meanwhile is either seen whole or waits
+    stmt = (
+        select(Booking.id, Booking.room_id, Booking.check_in_date, Booking.check_out_date, Booking.total_amount, Booking.charged_amount)
+        .where(Booking.status == status, column < close, _keyset(column, audit.cursor_at, audit.cursor_id))
+        .order_by(column, Booking.id)
+        .limit(size)
+        .with_for_update()
+    )
+    return db.execute(stmt).all()
+
+def _no_shows(db: Session, rows, business_date: date, now: datetime) -> Tuple[int, int]:
+    # Confirmed guests who never arrived. The booking is cancelled and its room-nights stop counting as sold.
+    db.execute(
+        update(Booking)
+        .where(Booking.id.in_([row.id for row in rows]), Booking.status == BookingStatus.CONFIRMED)
+        .values(status=BookingStatus.CANCELLED, updated_at=now)
+    )
+    merged = rollups.merge_deltas(
+        delta for row in rows
+        for delta in rollups.stay_deltas(row.check_in_date, row.check_out_date, row.total_amount, -1)
+    )
+    if merged:
+        db.execute(rollups.upsert_deltas(db.get_bind().dialect.name, merged))
+    return len(rows), 0
+
+def _departures(db: Session, rows, business_date: date, now: datetime) -> Tuple[int, int]:
+    # Guests past their check-out: the whole stay is charged, the room needs cleaning, and housekeeping gets a
+    # task unless the room already has an open one
+    db.execute(
+        update(Booking),
+        [{"id": row.id, "status": BookingStatus.CHECKED_OUT, "charged_amount": row.total_amount, "updated_at": now} for row in rows]
+    )
+    room_ids = sorted({row.room_id for row in rows})
+    db.execute(
+        update(Room)
+        .where(Room.id.in_(room_ids), Room.status == RoomStatus.OCCUPIED)
+        .values(status=RoomStatus.CLEANING, updated_at=now)
+    )
+    has_task = set(db.execute(
+        select(Task.room_id).where(
+            Task.room_id.in_(room_ids),
+            Task.task_type == TaskType.CLEANING,
+            Task.status != TaskStatus.COMPLETED,
+        )
+    ).scalars())
+    rooms = db.execute(select(Room.id, Room.room_number).where(Room.id.in_(room_ids))).all()
+    tasks = [
+        {
+            "room_id": room.id,
+            "title": f"Departure cleaning, room {room.room_number}",
+            "description": f"Checked out by the night audit of {business_date.isoformat()}",
+            "task_type": TaskType.CLEANING,
+            "priority": Priority.HIGH,
+            "status": TaskStatus.PENDING,
+            "created_at": now,
+            "updated_at": now,
+        }
+        for room in rooms if room.id not in has_task
+    ]
+    if tasks:
+        db.execute(insert(Task), tasks)
+    return len(rows), len(tasks)
+
+def _charges(db: Session, rows, business_date: date, now: datetime) -> Tuple[int, int]:
+    # In-house guests are charged every night up to and including the audited one. The amount is absolute
+    # (nights so far as a share of the booking total) and only ever raised, so auditing the same date twice, or
+    # an earlier date after a later one, changes nothing.
+    changes = []
+    for row in rows:
+        nights = stay_nights(row.check_in_date, row.check_out_date)
+        posted = min(nights, (business_date - row.check_in_date.date()).days + 1)
+        charged = round(row.total_amount * posted / nights, 2)
+        if charged > (row.charged_amount or 0.0):
+            changes.append({"id": row.id, "charged_amount": charged, "updated_at": now})
+    if changes:
+        db.execute(update(Booking), changes)
+    return len(changes), 0
+
+STAGE_QUERIES = {
+    "no_shows": (BookingStatus.CONFIRMED, Booking.check_in_date, _no_shows),
+    "departures": (BookingStatus.CHECKED_IN, Booking.check_out_date, _departures),
+    "charges": (BookingStatus.CHECKED_IN, Booking.check_in_date, _charges),
+}
+
+def _start(db: Session, business_date: date, rerun: bool) -> NightAudit:
+    audit = db.get(NightAudit, business_date, with_for_update=True)
+    if audit is None:
+        db.add(NightAudit(business_date=business_date, stage=STAGES[0], no_shows=0, departures=0, charges=0, tasks_created=0))
+        try:
+            db.commit()
+        except IntegrityError:
+            # Another runner created it first; both go on from the stored cursor
+            db.rollback()
+        audit = db.get(NightAudit, business_date, with_for_update=True)
+    elif rerun and audit.stage == DONE:
+        audit.stage, audit.cursor_at, audit.cursor_id = STAGES[0], None, None
+        audit.no_shows = audit.departures = audit.charges = audit.tasks_created = 0
+        audit.started_at, audit.finished_at = datetime.utcnow(), None
+    db.commit()
+    return audit
+
+def summary(audit: NightAudit) -> Dict:
+    return {
+        "business_date": audit.business_date.isoformat(),
+        "stage": audit.stage,
+        "no_shows": audit.no_shows,
+        "departures": audit.departures,
+        "charges": audit.charges,
+        "tasks_created": audit.tasks_created,
+    }
+
+def run(db: Session, business_date: Optional[date] = None, chunk_size: int = NIGHT_AUDIT_CHUNK_SIZE, rerun: bool = False) -> Dict:
+    # Closes a business date: cancels its no-shows, checks out departures, posts room charges for in-house guests.
+    # Idempotent and resumable: every chunk commits with the cursor it reached, so a crashed or retried audit
+    # carries on from there, and a finished one is skipped unless rerun (which finds nothing left to change).
+    business_date = business_date or datetime.utcnow().date() - timedelta(days=1)
+    if business_date > datetime.utcnow().date():
+        raise ValueError("Business dates in the future cannot be audited")
+    close = datetime.combine(business_date + timedelta(days=1), datetime.min.time())
+
+    audit = _start(db, business_date, rerun)
+    if audit.stage == DONE:
+        return summary(audit)
+    while True:
+        # The audit row is locked first, so concurrent runners take turns chunk by chunk instead of repeating work
+        audit = db.get(NightAudit, business_date, with_for_update=True, populate_existing=True)
+        if audit.stage == DONE:
+            db.commit()
+            break
+        status, column, apply = STAGE_QUERIES[audit.stage]
+        if audit.stage == "no_shows" and not NIGHT_AUDIT_NO_SHOWS:
+            rows = []
+        else:
+            rows = _chunk(db, status, column, close, audit, chunk_size)
+        now = datetime.utcnow()
+        if rows:
+            count, tasks = apply(db, rows, business_date, now)
+            # Each stage has a counter of the same name
+            setattr(audit, audit.stage, getattr(audit, audit.stage) + count)
+            audit.tasks_created += tasks
+            audit.cursor_at, audit.cursor_id = getattr(rows[-1], column.key), rows[-1].id
+        if len(rows) < chunk_size:
+            following = STAGES.index(audit.stage) + 1
+            audit.stage = STAGES[following] if following < len(STAGES) else DONE
+            audit.cursor_at, audit.cursor_id = None, None
+            if audit.stage == DONE:
+                audit.finished_at = now
+        db.commit()
+
+    result = summary(audit)
+    if result["no_shows"] or result["departures"] or result["charges"]:
+        # Rooms changed status and bookings their state and balance; tell caches and subscribers once, at the end
+        # (counting chunks committed by an earlier, interrupted attempt too)
+        rollups.stats_cache.clear()
+        response_cache.invalidate_sync("rooms")
+        event_bus.publish_sync("bookings", "audited", data=result)
+        event_bus.publish_sync("rooms", "audited", data=result)
+        if result["tasks_created"]:
+            event_bus.publish_sync("tasks", "imported", data={"created": result["tasks_created"]})
+    return result
+
+if __name__ == "__main__":
+    from .database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Run the night audit for a business date")
+    parser.add_argument("--date", type=date.fromisoformat, default=None, help="business date to close (default: yesterday, UTC)")
+    parser.add_argument("--chunk-size", type=int, default=NIGHT_AUDIT_CHUNK_SIZE)
+    parser.add_argument("--rerun", action="store_true", help="audit the date again even if it finished")
+    args = parser.parse_args()
+    with SessionLocal() as session:
+        print(run(session, args.date, args.chunk_size, args.rerun))
@@ -0,0 +1,116 @@
+from fastapi import HTTPException, Query
+from sqlalchemy import and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, Dict, Generic, List, Optional, Tuple, Type, TypeVar
+from pydantic import BaseModel
+from datetime import datetime
+import base64
+import binascii
+import enum
+import json
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+T = TypeVar("T")
+E = TypeVar("E", bound=enum.Enum)
+
+class Page(BaseModel, Generic[T]):
+    items: List[T]
+    next_cursor: Optional[str] = None
+    limit: int
+
+class PageParams:
+    def __init__(
+        self,
+        cursor: Optional[str] = Query(None, description="Opaque cursor returned as next_cursor by the previous page"),
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        sort: str = Query("id", description="Sort field, prefix with '-' for descending order"),
+    ):
+        self.cursor = cursor
+        self.limit = limit
+        self.sort = sort
+
+def parse_enum(enum_cls: Type[E], value: Optional[str], field: str) -> Optional[E]:
+    if value is None:
+        return None
+    try:
+        return enum_cls(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid {field}: {value}")
+
+def apply_filters(stmt, filters: Dict[Any, Any]):
+    # Filters with a value of None are treated as "not requested"
+    for column, value in filters.items():
+        if value is not None:
+            stmt = stmt.where(column == value)
+    return stmt
+
+def apply_date_range(stmt, column, date_from: Optional[datetime], date_to: Optional[datetime]):
+    if date_from is not None:
+        stmt = stmt.where(column >= date_from)
+    if date_to is not None:
+        stmt = stmt.where(column < date_to)
+    return stmt
+
+def _encode_cursor(sort: str, value: Any, last_id: int) -> str:
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    payload = json.dumps({"s": sort, "v": value, "id": last_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def _decode_cursor(cursor: str, sort: str, column) -> Tuple[Any, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        value, last_id = payload["v"], int(payload["id"])
+        if payload["s"] != sort:
+            raise ValueError("cursor was issued for a different sort order")
+        if value is not None and column.type.python_type is datetime:
+            value = datetime.fromisoformat(value)
+    except (ValueError, KeyError, TypeError, binascii.Error) as exc:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor: {exc}")
+    return value, last_id
+
+async def paginate(db: AsyncSession, model, stmt, params: PageParams, sort_fields: Dict[str, Any]) -> Tuple[List[Any], Optional[str]]:
+    # Keyset pagination over (sort column, id); sort columns must be indexed and non-null. stmt selects either
+    # the model (entities are returned) or a projection including its id (rows are returned).
+    descending = params.sort.startswith("-")
+    sort_key = params.sort.lstrip("-")
+    column = sort_fields.get(sort_key)
+    if column is None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Cannot sort by '{sort_key}'. Allowed: {', '.join(sorted(sort_fields))}"
+        )
+
+    projected = not (len(stmt.column_descriptions) == 1 and stmt.column_descriptions[0]["expr"] is model)
+    if projected and column.key not in stmt.selected_columns.keys():
+        # The next cursor is read from the last row
+        stmt = stmt.add_columns(column)
+
+    if params.cursor:
+        value, last_id = _decode_cursor(params.cursor, params.sort, column)
+        if column is model.id:
+            stmt = stmt.where(model.id < last_id if descending else model.id > last_id)
+        elif descending:
+            stmt = stmt.where(or_(column < value, and_(column == value, model.id < last_id)))
+        else:
+            stmt = stmt.where(or_(column > value, and_(column == value, model.id > last_id)))
+
+    if column is model.id:
+        order_by = [model.id.desc() if descending else model.id.asc()]
+    elif descending:
+        order_by = [column.desc(), model.id.desc()]
+    else:
+        order_by = [column.asc(), model.id.asc()]
+
+    result = await db.execute(stmt.order_by(*order_by).limit(params.limit + 1))
+    rows = result.all() if projected else result.scalars().all()
+
+    next_cursor = None
+    if len(rows) > params.limit:
+        rows = rows[:params.limit]
+        last = rows[-1]
+        next_cursor = _encode_cursor(params.sort, getattr(last, column.key), last.id)
+    return rows, next_cursor
@@ -0,0 +1,147 @@
+from pydantic import BaseModel, Field
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from typing import Dict, List, Optional, Sequence
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+import threading
+import numpy as np
+
+from .models import RoomType
+
+ROOM_TYPES = list(RoomType)
+TYPE_INDEX = {room_type: index for index, room_type in enumerate(ROOM_TYPES)}
+
+class Season(BaseModel):
+    name: str
+    # Inclusive month-day bounds; a season whose end comes before its start runs over new year
+    start: str = Field(pattern=r"^\d{2}-\d{2}$")
+    end: str = Field(pattern=r"^\d{2}-\d{2}$")
+    multiplier: float = Field(gt=0)
+    # Room types the season applies to; all of them when empty
+    room_types: List[RoomType] = []
+
+class StayDiscount(BaseModel):
+    min_nights: int = Field(gt=0)
+    # Share taken off the whole stay
+    discount: float = Field(ge=0, lt=1)
+
+class PricingSettings(BaseSettings):
+    # Each room's price_per_night is its base rate; these rules scale it per night, per stay and per guest.
+    # Lists and maps are read as JSON, e.g. PRICING_SEASONS='[{"name": "summer", "start": "06-15", ...}]'
+    model_config = SettingsConfigDict(env_prefix="PRICING_")
+
+    seasons: List[Season] = [
+        Season(name="low", start="01-06", end="03-15", multiplier=0.85),
+        Season(name="summer", start="06-15", end="08-31", multiplier=1.25),
+        Season(name="holidays", start="12-20", end="01-05", multiplier=1.3),
+        Season(name="new year's eve", start="12-31", end="12-31", multiplier=1.5, room_types=[RoomType.SUITE, RoomType.PRESIDENTIAL]),
+    ]
+    # Nights starting on these days (Monday is 0) are weekend nights
+    weekend_days: List[int] = [4, 5]
+    weekend_multiplier: Dict[RoomType, float] = {
+        RoomType.STANDARD: 1.15, RoomType.DELUXE: 1.15, RoomType.SUITE: 1.1, RoomType.PRESIDENTIAL: 1.0,
+    }
+    # The longest stay tier reached applies
+    stay_discounts: List[StayDiscount] = [StayDiscount(min_nights=7, discount=0.1), StayDiscount(min_nights=28, discount=0.2)]
+    # Guests covered by the rate, and the most a room sleeps; each guest above the included ones adds a share
+    # of the nightly rate
+    included_guests: Dict[RoomType, int] = {RoomType.STANDARD: 2, RoomType.DELUXE: 2, RoomType.SUITE: 4, RoomType.PRESIDENTIAL: 6}
+    max_guests: Dict[RoomType, int] = {RoomType.STANDARD: 3, RoomType.DELUXE: 4, RoomType.SUITE: 6, RoomType.PRESIDENTIAL: 8}
+    extra_guest_rate: float = Field(0.2, ge=0)
+    # Years of nights precomputed before and after the current one; stays outside are priced from a calendar
+    # built for them alone
+    calendar_years: int = Field(2, gt=0)
+
+pricing_settings = PricingSettings()
+
+def _month_day(dates: np.ndarray) -> np.ndarray:
+    months = dates.astype("datetime64[M]")
+    return (months.astype(int) % 12 + 1) * 100 + (dates - months).astype(int) + 1
+
+def _bound(month_day: str) -> int:
+    month, day = month_day.split("-")
+    return int(month) * 100 + int(day)
+
+class RateCalendar:
+    # Nightly multipliers per room type for every date in [origin, origin + days), stored as running sums:
+    # the multipliers of the nights from check-in up to check-out add up to cumulative[type, out] - cumulative[type, in]
+    def __init__(self, settings: PricingSettings, origin: date, days: int):
+        self.origin = origin
+        self.days = days
+        dates = np.datetime64(origin, "D") + np.arange(days)
+        # 1970-01-01 was a Thursday
+        weekend = np.isin((dates.astype(int) + 3) % 7, settings.weekend_days)
+        month_day = _month_day(dates)
+        self.cumulative = np.zeros((len(ROOM_TYPES), days + 1))
+        for room_type, index in TYPE_INDEX.items():
+            nightly = np.where(weekend, settings.weekend_multiplier.get(room_type, 1.0), 1.0)
+            for season in settings.seasons:
+                if season.room_types and room_type not in season.room_types:
+                    continue
+                start, end = _bound(season.start), _bound(season.end)
+                inside = (month_day >= start) & (month_day <= end) if start <= end else (month_day >= start) | (month_day <= end)
+                # Overlapping seasons compound
+                nightly = np.where(inside, nightly * season.multiplier, nightly)
+            self.cumulative[index, 1:] = np.cumsum(nightly)
+
+    def covers(self, check_in: date, check_out: date) -> bool:
+        return self.origin <= check_in and (check_out - self.origin).days <= self.days
+
+    def rate_units(self, type_indexes: np.ndarray, check_in: date, check_out: date) -> np.ndarray:
+        # Sum of the nightly multipliers of each room type's stay: two gathers and a subtraction
+        start, end = (check_in - self.origin).days, (check_out - self.origin).days
+        return self.cumulative[type_indexes, end] - self.cumulative[type_indexes, start]
+
+_calendar: Optional[RateCalendar] = None
+_calendar_lock = threading.Lock()
+
+def rate_calendar(check_in: date, check_out: date) -> RateCalendar:
+    global _calendar
+    calendar = _calendar
+    if calendar is None or calendar.origin.year != date.today().year - pricing_settings.calendar_years:
+        with _calendar_lock:
+            if _calendar is None or _calendar.origin.year != date.today().year - pricing_settings.calendar_years:
+                origin = date(date.today().year - pricing_settings.calendar_years, 1, 1)
+                _calendar = RateCalendar(pricing_settings, origin, (date(date.today().year + pricing_settings.calendar_years + 1, 1, 1) - origin).days)
+            calendar = _calendar
+    if calendar.covers(check_in, check_out):
+        return calendar
+    return RateCalendar(pricing_settings, check_in, (check_out - check_in).days)
+
+def stay_nights(check_in: datetime, check_out: datetime) -> int:
+    # Nights are counted by date; a same-day stay is charged one night
+    return max(1, (check_out.date() - check_in.date()).days)
+
+def stay_discount(nights: int) -> float:
+    reached = [tier.discount for tier in pricing_settings.stay_discounts if nights >= tier.min_nights]
+    return max(reached, default=0.0)
+
+@dataclass
+class Quotes:
+    nights: int
+    discount: float
+    totals: np.ndarray
+    # Rooms too small for the party; their totals are not meaningful
+    fits: np.ndarray
+    extra_guests: np.ndarray
+
+def quote(room_types: Sequence[RoomType], prices: Sequence[float], check_in: datetime, check_out: datetime, guests: int) -> Quotes:
+    # Prices any number of rooms for one stay at once, without a loop over rooms or nights
+    nights = stay_nights(check_in, check_out)
+    first_night = check_in.date()
+    last_morning = first_night + timedelta(days=nights)
+    types = np.fromiter((TYPE_INDEX[room_type] for room_type in room_types), dtype=np.intp, count=len(room_types))
+    included = np.array([pricing_settings.included_guests.get(room_type, 1) for room_type in ROOM_TYPES])[types]
+    capacity = np.array([pricing_settings.max_guests.get(room_type, 1) for room_type in ROOM_TYPES])[types]
+    extra = np.maximum(0, guests - included)
+
+    units = rate_calendar(first_night, last_morning).rate_units(types, first_night, last_morning)
+    discount = stay_discount(nights)
+    totals = np.asarray(prices, dtype=float) * units * (1 + extra * pricing_settings.extra_guest_rate) * (1 - discount)
+    return Quotes(nights, discount, np.round(totals, 2), guests <= capacity, extra)
+
+def quote_stay(room_type: RoomType, price_per_night: float, check_in: datetime, check_out: datetime, guests: int) -> float:
+    quotes = quote([room_type], [price_per_night], check_in, check_out, guests)
+    if not quotes.fits[0]:
+        raise ValueError(f"A {room_type.value} room sleeps at most {pricing_settings.max_guests.get(room_type, 1)} guests")
+    return float(quotes.totals[0])
@@ -0,0 +1,97 @@
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from typing import Any, Deque, Dict, Iterator, List, Optional
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+import logging
+import os
+import time
+from dotenv import load_dotenv
+
+from .metrics import current_request
+
+load_dotenv()
+
+QUERY_DIAGNOSTICS = os.getenv("QUERY_DIAGNOSTICS", "false").lower() == "true"
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "10"))
+MAX_PARAMS_LENGTH = 500
+
+logger = logging.getLogger("app.queries")
+
+# Most recent findings, served by the diagnostics router
+recent_findings: Deque[Dict[str, Any]] = deque(maxlen=200)
+counters = {"slow_queries": 0, "n_plus_one": 0}
+
+def statement_shape(statement: str) -> str:
+    # Bound parameters are sent separately, so the SQL text already identifies the statement shape
+    return " ".join(statement.split())
+
+def _params(parameters: Any) -> str:
+    text = repr(parameters)
+    return text if len(text) <= MAX_PARAMS_LENGTH else text[:MAX_PARAMS_LENGTH] + "..."
+
+def _record(kind: str, route: str, statement: str, **details):
+    counters[kind] += 1
+    recent_findings.append({"kind": kind, "route": route, "statement": statement, "at": datetime.utcnow().isoformat(), **details})
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("diagnostics_started", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed_ms = (time.perf_counter() - conn.info["diagnostics_started"].pop()) * 1000
+    stats = current_request.get()
+    route = stats.route if stats is not None else "background"
+    shape = statement_shape(statement)
+
+    if elapsed_ms >= SLOW_QUERY_MS:
+        logger.warning("Slow query (%.1f ms) on %s: %s | params=%s", elapsed_ms, route, shape, _params(parameters))
+        _record("slow_queries", route, shape, elapsed_ms=round(elapsed_ms, 1), params=_params(parameters))
+
+    if stats is not None and not executemany:
+        stats.statements[shape] += 1
+        # Report once per request and statement, when the repeat count first reaches the threshold
+        if stats.statements[shape] == N_PLUS_ONE_THRESHOLD:
+            logger.warning("Probable N+1 on %s: statement executed %d times: %s", route, N_PLUS_ONE_THRESHOLD, shape)
+            _record("n_plus_one", route, shape, executions=N_PLUS_ONE_THRESHOLD)
+
+def enable_query_diagnostics(engine: Engine):
+    if QUERY_DIAGNOSTICS and not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+def diagnostics_summary() -> Dict[str, Any]:
+    return {
+        "enabled": QUERY_DIAGNOSTICS,
+        "slow_query_ms": SLOW_QUERY_MS,
+        "n_plus_one_threshold": N_PLUS_ONE_THRESHOLD,
+        "counters": dict(counters),
+        "recent": list(recent_findings),
+    }
+
+@contextmanager
+def assert_max_queries(max_queries: int, engines: Optional[List[Engine]] = None) -> Iterator[List[str]]:
+    # Test helper: fails when the block runs more statements than allowed, e.g.
+    #     with assert_max_queries(3):
+    #         client.get("/api/rooms/", headers=headers)
+    if engines is None:
+        from .database import get_engine, get_sync_engine
+        engines = [get_engine().sync_engine, get_sync_engine()]
+
+    statements: List[str] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement_shape(statement))
+
+    for target in engines:
+        event.listen(target, "after_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        for target in engines:
+            event.remove(target, "after_cursor_execute", record)
+
+    if len(statements) > max_queries:
+        listing = "\n".join(f"  {index}. {statement}" for index, statement in enumerate(statements, start=1))
+        raise AssertionError(f"Expected at most {max_queries} queries, {len(statements)} were executed:\n{listing}")
\ No newline at end of file
@@ -0,0 +1,176 @@
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import Session
+from typing import Any, Callable, Dict, Iterator, List, Sequence
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+import numpy as np
+
+from .models import Booking, Room, RoomType, Task, TaskStatus, TaskType, Priority
+from .rollups import SOLD_STATUSES
+
+# Rows fetched per round-trip; memory stays bounded by this regardless of the period length
+CHUNK_SIZE = 10000
+
+# Completion-time histogram: 15 minute buckets up to 14 days, overflow goes in the last bucket
+BUCKETS_PER_HOUR = 4
+HISTOGRAM_BUCKETS = 14 * 24 * BUCKETS_PER_HOUR
+
+@dataclass(frozen=True)
+class ReportDefinition:
+    name: str
+    description: str
+    build: Callable[[Session, datetime, datetime], Dict[str, Any]]
+
+REPORT_TYPES: Dict[str, ReportDefinition] = {}
+
+def report_type(name: str, description: str):
+    def register(build):
+        REPORT_TYPES[name] = ReportDefinition(name, description, build)
+        return build
+    return register
+
+def build_report(db: Session, name: str, period_start: datetime, period_end: datetime) -> Dict[str, Any]:
+    definition = REPORT_TYPES.get(name)
+    if definition is None:
+        raise ValueError(f"Unknown report type '{name}'. Available: {', '.join(sorted(REPORT_TYPES))}")
+    if period_end <= period_start:
+        raise ValueError("period_end must be after period_start")
+    return {
+        "report_type": name,
+        "period_start": period_start.isoformat(),
+        "period_end": period_end.isoformat(),
+        "generated_at": datetime.utcnow().isoformat(),
+        "results": definition.build(db, period_start, period_end),
+    }
+
+def stream_columns(db: Session, stmt) -> Iterator[List[Sequence]]:
+    # Yields each chunk transposed into one sequence per selected column
+    for rows in db.execute(stmt.execution_options(yield_per=CHUNK_SIZE)).partitions():
+        yield list(zip(*rows))
+
+def enum_codes(column, members: Sequence, default=None):
+    # Each value's position in members, computed by the database so chunks arrive as plain integers instead of
+    # enum objects mapped one row at a time
+    return case(*((column == member, index) for index, member in enumerate(members)), else_=default)
+
+def day_offsets(values: Sequence[datetime], origin: datetime) -> np.ndarray:
+    return (np.array(values, dtype="datetime64[D]") - np.datetime64(origin.date(), "D")).astype(np.int64)
+
+def period_days(period_start: datetime, period_end: datetime) -> int:
+    return max(1, (period_end.date() - period_start.date()).days)
+
+def stays(db: Session, period_start: datetime, period_end: datetime, *room_columns):
+    # Booked stays overlapping the period, as (extra columns..., first night, night after last, nightly rate) arrays
+    stmt = (
+        select(*room_columns, Booking.check_in_date, Booking.check_out_date, Booking.total_amount)
+        .where(
+            Booking.status.in_(SOLD_STATUSES),
+            Booking.check_in_date < period_end,
+            Booking.check_out_date > period_start,
+        )
+    )
+    if room_columns:
+        stmt = stmt.join(Room, Room.id == Booking.room_id)
+    for chunk in stream_columns(db, stmt):
+        *extra, check_ins, check_outs, totals = chunk
+        first = day_offsets(check_ins, period_start)
+        length = np.maximum(day_offsets(check_outs, period_start) - first, 1)
+        yield (*extra, first, first + length, np.asarray(totals, dtype=np.float64) / length)
+
+@report_type("occupancy_by_room_type", "Room-nights sold, occupancy and revenue per room type")
+def occupancy_by_room_type(db: Session, period_start: datetime, period_end: datetime) -> Dict[str, Any]:
+    days = period_days(period_start, period_end)
+    types = list(RoomType)
+    inventory = dict(db.execute(select(Room.room_type, func.count(Room.id)).group_by(Room.room_type)).all())
+
+    sold = np.zeros(len(types))
+    revenue = np.zeros(len(types))
+    for codes, first, last, rate in stays(db, period_start, period_end, enum_codes(Room.room_type, types)):
+        kind = np.asarray(codes, dtype=np.int64)
+        nights = np.clip(last, 0, days) - np.clip(first, 0, days)
+        sold += np.bincount(kind, weights=nights, minlength=len(types))
+        revenue += np.bincount(kind, weights=nights * rate, minlength=len(types))
+
+    results = []
+    for index, room_type in enumerate(types):
+        available = inventory.get(room_type, 0) * days
+        results.append({
+            "room_type": room_type.value,
+            "rooms": inventory.get(room_type, 0),
+            "room_nights_available": available,
+            "room_nights_sold": int(sold[index]),
+            "occupancy_rate": round(100 * sold[index] / available, 2) if available else 0.0,
+            "revenue": round(float(revenue[index]), 2),
+        })
+    return {"days": days, "by_room_type": results}
+
+@report_type("revenue_by_day", "Room revenue and rooms sold for every night in the period")
+def revenue_by_day(db: Session, period_start: datetime, period_end: datetime) -> Dict[str, Any]:
+    days = period_days(period_start, period_end)
+    # Difference arrays: each stay adds at its first night and subtracts after its last, then a cumulative sum
+    revenue = np.zeros(days + 1)
+    sold = np.zeros(days + 1, dtype=np.int64)
+    for first, last, rate in stays(db, period_start, period_end):
+        start, end = np.clip(first, 0, days), np.clip(last, 0, days)
+        np.add.at(revenue, start, rate)
+        np.add.at(revenue, end, -rate)
+        np.add.at(sold, start, 1)
+        np.add.at(sold, end, -1)
+
+    revenue = np.cumsum(revenue)[:days]
+    sold = np.cumsum(sold)[:days]
+    origin = period_start.date()
+    return {
+        "total_revenue": round(float(revenue.sum()), 2),
+        "by_day": [
+            {"date": (origin + timedelta(days=offset)).isoformat(), "rooms_sold": int(sold[offset]), "revenue": round(float(revenue[offset]), 2)}
+            for offset in range(days)
+        ],
+    }
+
+@report_type("task_completion", "Housekeeping completion time by task type and priority")
+def task_completion(db: Session, period_start: datetime, period_end: datetime) -> Dict[str, Any]:
+    task_types, priorities = list(TaskType), list(Priority)
+    groups = len(task_types) * len(priorities)
+
+    counts = np.zeros(groups, dtype=np.int64)
+    total_hours = np.zeros(groups)
+    max_hours = np.zeros(groups)
+    histogram = np.zeros((groups, HISTOGRAM_BUCKETS), dtype=np.int64)
+
+    # Tasks without a priority count as medium, as in dispatch
+    key = enum_codes(Task.task_type, task_types) * len(priorities) + enum_codes(Task.priority, priorities, priorities.index(Priority.MEDIUM))
+    stmt = select(key, Task.created_at, Task.completed_at).where(
+        Task.status == TaskStatus.COMPLETED,
+        Task.created_at.isnot(None),
+        Task.completed_at >= period_start,
+        Task.completed_at < period_end,
+    )
+    for keys, created, completed in stream_columns(db, stmt):
+        key = np.asarray(keys, dtype=np.int64)
+        hours = np.maximum(
+            (np.array(completed, dtype="datetime64[s]") - np.array(created, dtype="datetime64[s]")).astype(np.float64) / 3600,
+            0,
+        )
+        counts += np.bincount(key, minlength=groups)
+        total_hours += np.bincount(key, weights=hours, minlength=groups)
+        np.maximum.at(max_hours, key, hours)
+        buckets = np.minimum((hours * BUCKETS_PER_HOUR).astype(np.int64), HISTOGRAM_BUCKETS - 1)
+        np.add.at(histogram, (key, buckets), 1)
+
+    def percentile(group: int, fraction: float) -> float:
+        bucket = int(np.searchsorted(np.cumsum(histogram[group]), fraction * counts[group]))
+        return round((bucket + 1) / BUCKETS_PER_HOUR, 2)
+
+    results = []
+    for group in np.flatnonzero(counts):
+        results.append({
+            "task_type": task_types[group // len(priorities)].value,
+            "priority": priorities[group % len(priorities)].value,
+            "completed": int(counts[group]),
+            "avg_hours": round(float(total_hours[group] / counts[group]), 2),
+            "p50_hours": percentile(group, 0.5),
+            "p90_hours": percentile(group, 0.9),
+            "max_hours": round(float(max_hours[group]), 2),
+        })
+    return {"total_completed": int(counts.sum()), "by_type_and_priority": results}
@@ -0,0 +1,137 @@
+from fastapi import Request, Response
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, Awaitable, Callable, Dict, Optional, Union
+from collections import Counter
+import logging
+import os
+from dotenv import load_dotenv
+
+from .cache import LRUCache, RedisCache
+from .database import read_from_primary, replica_settings
+from .serialization import encode
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+RESPONSE_CACHE_TTL_SECONDS = int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "60"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "2048"))
+# Versions live in Redis, so a write in any worker or celery task retires every worker's entries
+RESPONSE_CACHE_REDIS = os.getenv("RESPONSE_CACHE_REDIS", "false").lower() == "true"
+REDIS_URL = os.getenv("REDIS_URL")
+# Worker processes serving the app; gunicorn.conf.py sets it to the number of workers it forks
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+
+class ResponseCache:
+    # Encoded list responses keyed by (resource, version, state, permission scope, query string). A write bumps the
+    # resource's version, so every older entry becomes unreachable at once and simply ages out of the LRU.
+    # With a shared store the versions live there, so a write in any process retires every worker's entries.
+    # Without one they are counted in this process (local_versions), which only sees every write when it is
+    # the only worker; otherwise every request bypasses the cache.
+    def __init__(self, local: LRUCache, shared: Optional[RedisCache] = None, redis_url: Optional[str] = None, local_versions: bool = False):
+        self.local = local
+        self.shared = shared
+        self.redis_url = redis_url
+        self.local_versions = local_versions
+        self._versions: Counter = Counter()
+        self._sync_client = None
+        self.hits: Counter = Counter()
+        self.misses: Counter = Counter()
+        self.bypasses: Counter = Counter()
+        self.invalidations: Counter = Counter()
+
+    @property
+    def enabled(self) -> bool:
+        return RESPONSE_CACHE_ENABLED and (self.shared is not None or self.local_versions)
+
+    async def version(self, resource: str) -> Optional[int]:
+        if self.shared is not None:
+            return await self.shared.counter(f"version:{resource}")
+        return self._versions[resource] if self.local_versions else None
+
+    async def respond(self, request: Request, resource: str, scope: str, db: AsyncSession, build: Callable[[], Awaitable[Union[BaseModel, bytes]]], state: str = "") -> Response:
+        # state, e.g. the collection's ETag, is part of the key: a body is only served for the state it was built at
+        version = await self.version(resource) if self.enabled else None
+        if version is None:
+            # Disabled, or no versions that see every write (shared store unreachable, or several workers without one)
+            self.bypasses[resource] += 1
+            return self._response(encode(await build()), "BYPASS")
+
+        query = "&".join(f"{name}={value}" for name, value in sorted(request.query_params.multi_items()))
+        key = f"{resource}:{version}:{state}:{scope}:{query}"
+        body = self.local.get(key)
+        if body is None and self.shared is not None:
+            shared = await self.shared.get(key)
+            if shared is not None:
+                body = shared.encode()
+                self.local.set(key, body)
+        if body is not None:
+            self.hits[resource] += 1
+            return self._response(body, "HIT")
+
+        self.misses[resource] += 1
+        # Whatever is stored is served to everyone until the next write, so it is never read from a lagging replica
+        read_from_primary(db)
+        body = encode(await build())
+        self.local.set(key, body)
+        if self.shared is not None:
+            await self.shared.set(key, body.decode())
+        return self._response(body, "MISS")
+
+    @staticmethod
+    def _response(body: bytes, outcome: str) -> Response:
+        return Response(content=body, media_type="application/json", headers={"X-Cache": outcome})
+
+    async def invalidate(self, resource: str):
+        # Call after the write has committed
+        self.invalidations[resource] += 1
+        self._versions[resource] += 1
+        if self.shared is not None:
+            await self.shared.incr(f"version:{resource}")
+
+    def invalidate_sync(self, resource: str):
+        # For writers outside the event loop, e.g. celery tasks
+        self.invalidations[resource] += 1
+        self._versions[resource] += 1
+        if self.shared is None:
+            return
+        try:
+            if self._sync_client is None:
+                import redis
+
+                self._sync_client = redis.Redis.from_url(self.redis_url)
+            self._sync_client.incr(f"{self.shared.namespace}:version:{resource}")
+        except Exception as exc:
+            logger.warning("Response cache invalidation of %s failed: %s", resource, exc)
+
+    def stats(self) -> Dict[str, Any]:
+        resources = sorted(set(self.hits) | set(self.misses) | set(self.bypasses) | set(self.invalidations))
+        by_resource = {}
+        for resource in resources:
+            lookups = self.hits[resource] + self.misses[resource]
+            by_resource[resource] = {
+                "hits": self.hits[resource],
+                "misses": self.misses[resource],
+                "bypasses": self.bypasses[resource],
+                "invalidations": self.invalidations[resource],
+                "hit_rate": round(self.hits[resource] / lookups, 4) if lookups else 0.0,
+            }
+        stats = {"enabled": self.enabled, "resources": by_resource, "local": self.local.stats()}
+        if self.shared is not None:
+            stats["shared"] = self.shared.stats()
+        return stats
+
+if RESPONSE_CACHE_REDIS and REDIS_URL:
+    response_cache = ResponseCache(
+        LRUCache(maxsize=RESPONSE_CACHE_MAX_ENTRIES, ttl=RESPONSE_CACHE_TTL_SECONDS),
+        RedisCache(REDIS_URL, "responses", ttl=RESPONSE_CACHE_TTL_SECONDS),
+        REDIS_URL,
+    )
+else:
+    # A single worker without replicas sees every write itself, so it can count the versions on its own
+    single_process = WEB_CONCURRENCY <= 1 and not replica_settings.urls.strip()
+    if RESPONSE_CACHE_ENABLED and not single_process:
+        logger.warning("Response cache is off: with more than one worker or with read replicas it needs RESPONSE_CACHE_REDIS=true and REDIS_URL")
+    response_cache = ResponseCache(LRUCache(maxsize=RESPONSE_CACHE_MAX_ENTRIES, ttl=RESPONSE_CACHE_TTL_SECONDS), local_versions=single_process)
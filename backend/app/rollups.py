@@ -0,0 +1,131 @@
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from typing import Dict, Iterable, List
+from datetime import date, datetime, timedelta
+import argparse
+
+from .cache import LRUCache
+from .models import Booking, BookingStatus, DailyStat
+
+# Bookings in these states count as sold room-nights
+SOLD_STATUSES = (BookingStatus.CONFIRMED, BookingStatus.CHECKED_IN, BookingStatus.CHECKED_OUT)
+
+# Dashboard responses are recomputed at most this often unless a write invalidates them
+stats_cache = LRUCache(maxsize=256, ttl=30)
+
+def stay_nights(check_in: datetime, check_out: datetime) -> List[date]:
+    first, last = check_in.date(), check_out.date()
+    return [first + timedelta(days=offset) for offset in range(max(1, (last - first).days))]
+
+def stay_deltas(check_in: datetime, check_out: datetime, total_amount: float, sign: int = 1) -> List[Dict]:
+    nights = stay_nights(check_in, check_out)
+    nightly_rate = total_amount / len(nights)
+    return [
+        {"stat_date": night, "rooms_sold": sign, "room_revenue": sign * nightly_rate, "updated_at": datetime.utcnow()}
+        for night in nights
+    ]
+
+def booking_deltas(booking: Booking, sign: int = 1) -> List[Dict]:
+    return stay_deltas(booking.check_in_date, booking.check_out_date, booking.total_amount, sign)
+
+# Databases with an upsert for the counters below
+UPSERT_DIALECTS = ("mysql", "sqlite", "postgresql")
+
+def check_dialect(dialect: str):
+    # Run at startup, so an unsupported database is a configuration error rather than a failure of the first booking
+    if dialect not in UPSERT_DIALECTS:
+        raise RuntimeError(f"Daily rollups need one of {', '.join(UPSERT_DIALECTS)}; DATABASE_URL points at {dialect}")
+
+def upsert_deltas(dialect: str, rows: List[Dict]):
+    # Atomic "add to counter" so concurrent bookings on the same nights never lose updates
+    if dialect == "mysql":
+        stmt = mysql_insert(DailyStat).values(rows)
+        return stmt.on_duplicate_key_update(
+            rooms_sold=DailyStat.rooms_sold + stmt.inserted.rooms_sold,
+            room_revenue=DailyStat.room_revenue + stmt.inserted.room_revenue,
+            updated_at=stmt.inserted.updated_at,
+        )
+    check_dialect(dialect)
+    stmt = (sqlite_insert if dialect == "sqlite" else postgresql_insert)(DailyStat).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=[DailyStat.stat_date],
+        set_={
+            "rooms_sold": DailyStat.rooms_sold + stmt.excluded.rooms_sold,
+            "room_revenue": DailyStat.room_revenue + stmt.excluded.room_revenue,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+
+async def record_booking(db: AsyncSession, booking: Booking, sign: int = 1):
+    # Call inside the transaction that writes the booking; use sign=-1 when it stops counting
+    await db.execute(upsert_deltas(db.get_bind().dialect.name, booking_deltas(booking, sign)))
+    stats_cache.clear()
+
+def merge_deltas(deltas: Iterable[Dict]) -> List[Dict]:
+    # Collapses per-stay deltas into one row per night so a batch costs a single upsert
+    totals: Dict[date, List[float]] = {}
+    for delta in deltas:
+        total = totals.setdefault(delta["stat_date"], [0, 0.0])
+        total[0] += delta["rooms_sold"]
+        total[1] += delta["room_revenue"]
+    return [
+        {"stat_date": night, "rooms_sold": sold, "room_revenue": revenue, "updated_at": datetime.utcnow()}
+        for night, (sold, revenue) in sorted(totals.items())
+    ]
+
+async def record_booking_rows(db: AsyncSession, rows: List[Dict]):
+    # Bulk variant of record_booking for rows inserted without ORM objects
+    merged = merge_deltas(
+        delta for row in rows
+        for delta in stay_deltas(row["check_in_date"], row["check_out_date"], row["total_amount"])
+    )
+    if merged:
+        await db.execute(upsert_deltas(db.get_bind().dialect.name, merged))
+    stats_cache.clear()
+
+def rebuild(db: Session, start: date, end: date):
+    # Recompute [start, end) from bookings; used for backfills and to repair drift
+    db.execute(delete(DailyStat).where(DailyStat.stat_date >= start, DailyStat.stat_date < end))
+    stmt = (
+        select(Booking)
+        .where(
+            Booking.status.in_(SOLD_STATUSES),
+            Booking.check_in_date < datetime.combine(end, datetime.min.time()),
+            Booking.check_out_date > datetime.combine(start, datetime.min.time()),
+        )
+        .order_by(Booking.id)
+        .execution_options(yield_per=1000)
+    )
+    merged = merge_deltas(
+        delta for booking in db.execute(stmt).scalars()
+        for delta in booking_deltas(booking)
+        if start <= delta["stat_date"] < end
+    )
+    if merged:
+        db.execute(upsert_deltas(db.get_bind().dialect.name, merged))
+    db.commit()
+    return len(merged)
+
+async def summarize(db: AsyncSession, start: date, end: date) -> Dict:
+    result = await db.execute(
+        select(
+            func.coalesce(func.sum(DailyStat.rooms_sold), 0),
+            func.coalesce(func.sum(DailyStat.room_revenue), 0.0),
+        ).where(DailyStat.stat_date >= start, DailyStat.stat_date < end)
+    )
+    rooms_sold, revenue = result.one()
+    return {"rooms_sold": int(rooms_sold), "room_revenue": float(revenue)}
+
+if __name__ == "__main__":
+    from .database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Rebuild daily dashboard rollups from bookings")
+    parser.add_argument("--start", type=date.fromisoformat, required=True)
+    parser.add_argument("--end", type=date.fromisoformat, required=True)
+    args = parser.parse_args()
+    with SessionLocal() as session:
+        print(f"Rebuilt {rebuild(session, args.start, args.end)} daily rows")
@@ -1,12 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from fastapi import APIRouter, Depends, File, Header, HTTPException, Query, Request, Response, UploadFile, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, Dict, List, Optional, Union
 from pydantic import BaseModel
 from datetime import datetime
 
 from ..database import get_db
-from ..models import Booking, BookingStatus
+from ..models import Booking, BookingStatus, Guest, Room, RoomStatus
 from ..auth import verify_token, check_permission
+from ..changes import Delta, conditional, delta, reject_filters
+from ..events import event_bus
+from ..availability import find_conflicts, lock_rooms, overlapping
+from ..bulk import BulkResult, BulkSpec, Row, bulk_import, csv_records, json_records
+from ..rollups import record_booking, record_booking_rows, stats_cache
+from ..export import export_response
+from ..idempotency import claim
+from ..pagination import Page, PageParams, paginate, apply_filters, apply_date_range, parse_enum
+from ..pricing import quote_stay
+from ..response_cache import response_cache
+from ..serialization import Projection
+from .rooms import _room_response
 
 router = APIRouter()
 
@@ -15,7 +28,9 @@ class BookingCreate(BaseModel):
     room_id: int
     check_in_date: datetime
     check_out_date: datetime
-    total_amount: float
+    # Ignored by create_booking, which prices the stay from the rate calendar. Imports keep a given total
+    # (bookings made elsewhere) and price the rows without one.
+    total_amount: Optional[float] = None
     number_of_guests: int = 1
     special_requests: Optional[str] = None
 
@@ -28,18 +43,23 @@ class BookingResponse(BaseModel):
     status: str
     total_amount: float
     paid_amount: float
+    # Room charges posted by the night audit so far
+    charged_amount: float = 0.0
     number_of_guests: int
     special_requests: Optional[str] = None
     created_by: int
     created_at: datetime
 
-@router.get("/", response_model=List[BookingResponse])
-async def get_bookings(db: Session = Depends(get_db), current_user = Depends(verify_token)):
-    if not check_permission(current_user, "bookings"):
-        raise HTTPException(status_code=403, detail="Not enough permissions")
-    
-    bookings = db.query(Booking).all()
-    return [BookingResponse(
+SORT_FIELDS = {
+    "id": Booking.id,
+    "created_at": Booking.created_at,
+    "check_in_date": Booking.check_in_date,
+}
+
+BOOKING_PROJECTION = Projection(Booking, BookingResponse)
+
+def _booking_response(booking: Booking) -> BookingResponse:
+    return BookingResponse(
         id=booking.id,
         guest_id=booking.guest_id,
         room_id=booking.room_id,
@@ -48,43 +68,226 @@ async def get_bookings(db: Session = Depends(get_db), current_user = Depends(ver
         status=booking.status.value,
         total_amount=booking.total_amount,
         paid_amount=booking.paid_amount,
+        charged_amount=booking.charged_amount,
         number_of_guests=booking.number_of_guests,
         special_requests=booking.special_requests,
         created_by=booking.created_by,
         created_at=booking.created_at
-    ) for booking in bookings]
+    )
+
+@router.get("/", response_model=Union[Page[BookingResponse], Delta[BookingResponse]])
+async def get_bookings(
+    request: Request,
+    page: PageParams = Depends(),
+    status: Optional[str] = None,
+    room_id: Optional[int] = None,
+    guest_id: Optional[int] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    updated_since: Optional[datetime] = Query(None, description="Return only rows changed since then, plus deleted ids"),
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(verify_token)
+):
+    if not check_permission(current_user, "bookings"):
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    if updated_since is not None:
+        reject_filters({"status": status, "room_id": room_id, "guest_id": guest_id, "date_from": date_from, "date_to": date_to})
+    
+    stmt = apply_filters(BOOKING_PROJECTION.select(), {
+        Booking.status: parse_enum(BookingStatus, status, "status"),
+        Booking.room_id: room_id,
+        Booking.guest_id: guest_id,
+    })
+    stmt = apply_date_range(stmt, Booking.check_in_date, date_from, date_to)
+    
+    async def build():
+        if updated_since is not None:
+            return await delta(db, BOOKING_PROJECTION, updated_since, page)
+        rows, next_cursor = await paginate(db, Booking, stmt, page, SORT_FIELDS)
+        return BOOKING_PROJECTION.page(rows, next_cursor, page.limit)
+    
+    return await conditional(request, db, Booking, build)
+
+EXPORT_COLUMNS = [
+    Booking.id, Booking.guest_id, Booking.room_id, Booking.check_in_date, Booking.check_out_date,
+    Booking.status, Booking.total_amount, Booking.paid_amount, Booking.number_of_guests,
+    Booking.special_requests, Booking.created_by, Booking.created_at
+]
+
+def export_query(date_from: Optional[datetime] = None, date_to: Optional[datetime] = None):
+    # Shared with the export job
+    return apply_date_range(select(*EXPORT_COLUMNS), Booking.check_in_date, date_from, date_to).order_by(Booking.id)
+
+@router.get("/export")
+async def export_bookings(
+    format: str = "csv",
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    gzip: bool = False,
+    current_user = Depends(verify_token)
+):
+    if not check_permission(current_user, "bookings"):
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    return export_response("bookings", export_query(date_from, date_to), format, gzip)
 
 @router.post("/", response_model=BookingResponse)
-async def create_booking(booking: BookingCreate, db: Session = Depends(get_db), current_user = Depends(verify_token)):
+async def create_booking(
+    booking: BookingCreate,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, max_length=255, description="Retries with the same key return the first booking"),
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(verify_token)
+):
     if not check_permission(current_user, "bookings"):
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
+    if booking.check_out_date <= booking.check_in_date:
+        raise HTTPException(status_code=400, detail="check_out_date must be after check_in_date")
+    
+    key = None
+    if idempotency_key is not None:
+        key = await claim(db, current_user.id, idempotency_key, "bookings.create", booking)
+        if key.resource_id is not None:
+            existing = await db.get(Booking, key.resource_id)
+            if existing is None:
+                raise HTTPException(status_code=404, detail="The booking created with this Idempotency-Key no longer exists")
+            response.headers["Idempotent-Replayed"] = "true"
+            return _booking_response(existing)
+    
+    # The availability check and the insert happen under the room's lock, so of two concurrent requests for
+    # the same stay the second waits, then sees the first booking and gets 409
+    await lock_rooms(db, [booking.room_id])
+    room = await db.get(Room, booking.room_id)
+    if room is None:
+        raise HTTPException(status_code=404, detail="Room not found")
+    if await db.get(Guest, booking.guest_id) is None:
+        raise HTTPException(status_code=404, detail="Guest not found")
+    
+    try:
+        total_amount = quote_stay(room.room_type, room.price_per_night, booking.check_in_date, booking.check_out_date, booking.number_of_guests)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    
+    if await find_conflicts(db, booking.room_id, booking.check_in_date, booking.check_out_date, for_update=True):
+        raise HTTPException(status_code=409, detail="Room is not available for the selected dates")
+    
     # Create new booking
     db_booking = Booking(
         guest_id=booking.guest_id,
         room_id=booking.room_id,
         check_in_date=booking.check_in_date,
         check_out_date=booking.check_out_date,
-        total_amount=booking.total_amount,
+        total_amount=total_amount,
         number_of_guests=booking.number_of_guests,
         special_requests=booking.special_requests,
         created_by=current_user.id
     )
     db.add(db_booking)
-    db.commit()
-    db.refresh(db_booking)
+    await db.flush()
+    if key is not None:
+        key.resource_id = db_booking.id
+    await record_booking(db, db_booking)
+    await db.commit()
+    await db.refresh(db_booking)
+    response = _booking_response(db_booking)
+    await event_bus.publish("bookings", "created", response.id, response)
     
-    return BookingResponse(
-        id=db_booking.id,
-        guest_id=db_booking.guest_id,
-        room_id=db_booking.room_id,
-        check_in_date=db_booking.check_in_date,
-        check_out_date=db_booking.check_out_date,
-        status=db_booking.status.value,
-        total_amount=db_booking.total_amount,
-        paid_amount=db_booking.paid_amount,
-        number_of_guests=db_booking.number_of_guests,
-        special_requests=db_booking.special_requests,
-        created_by=db_booking.created_by,
-        created_at=db_booking.created_at
-    )
\ No newline at end of file
+    return response
+
+@router.post("/{booking_id}/check-in", response_model=BookingResponse)
+async def check_in_booking(booking_id: int, db: AsyncSession = Depends(get_db), current_user = Depends(verify_token)):
+    if not check_permission(current_user, "bookings"):
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    # Locked so a check-in and the night audit's no-show pass cannot both act on the booking
+    db_booking = await db.get(Booking, booking_id, with_for_update=True)
+    if db_booking is None:
+        raise HTTPException(status_code=404, detail="Booking not found")
+    if db_booking.status != BookingStatus.CONFIRMED:
+        raise HTTPException(status_code=409, detail=f"A {db_booking.status.value} booking cannot be checked in")
+    now = datetime.utcnow()
+    if db_booking.check_in_date.date() > now.date() or db_booking.check_out_date <= now:
+        raise HTTPException(status_code=400, detail="Guests can only check in on or after the arrival date, before check-out")
+    
+    db_booking.status = BookingStatus.CHECKED_IN
+    room = await db.get(Room, db_booking.room_id)
+    room.status = RoomStatus.OCCUPIED
+    await db.commit()
+    await db.refresh(db_booking)
+    await db.refresh(room)
+    stats_cache.clear()
+    await response_cache.invalidate("rooms")
+    response = _booking_response(db_booking)
+    await event_bus.publish("bookings", "updated", response.id, response)
+    await event_bus.publish("rooms", "updated", room.id, _room_response(room))
+    
+    return response
+
+def _prepare_booking(booking: BookingCreate) -> Dict[str, Any]:
+    if booking.check_out_date <= booking.check_in_date:
+        raise ValueError("check_out_date must be after check_in_date")
+    return booking.model_dump()
+
+async def _check_booking_batch(db: AsyncSession, rows: List[Row]) -> Dict[int, str]:
+    errors = {}
+    room_ids = {values["room_id"] for _, values in rows}
+    guest_ids = {values["guest_id"] for _, values in rows}
+    # Locked like a single booking's room, for the batch's transaction
+    await lock_rooms(db, room_ids)
+    known_rooms = {
+        room_id: (room_type, price)
+        for room_id, room_type, price in await db.execute(select(Room.id, Room.room_type, Room.price_per_night).where(Room.id.in_(room_ids)))
+    }
+    known_guests = set((await db.execute(select(Guest.id).where(Guest.id.in_(guest_ids)))).scalars())
+    
+    # One range query loads every stay that could collide with this batch, grouped per room
+    window_start = min(values["check_in_date"] for _, values in rows)
+    window_end = max(values["check_out_date"] for _, values in rows)
+    held: Dict[int, List] = {}
+    existing = await db.execute(
+        select(Booking.room_id, Booking.check_in_date, Booking.check_out_date)
+        .where(Booking.room_id.in_(list(known_rooms)), overlapping(window_start, window_end))
+        .with_for_update()
+    )
+    for room_id, check_in, check_out in existing:
+        held.setdefault(room_id, []).append((check_in, check_out))
+    
+    for row_number, values in rows:
+        if values["room_id"] not in known_rooms:
+            errors[row_number] = "Room not found"
+        elif values["guest_id"] not in known_guests:
+            errors[row_number] = "Guest not found"
+        elif any(check_in < values["check_out_date"] and check_out > values["check_in_date"] for check_in, check_out in held.get(values["room_id"], [])):
+            errors[row_number] = "Room is not available for the selected dates"
+        else:
+            if values["total_amount"] is None:
+                try:
+                    values["total_amount"] = quote_stay(*known_rooms[values["room_id"]], values["check_in_date"], values["check_out_date"], values["number_of_guests"])
+                except ValueError as exc:
+                    errors[row_number] = str(exc)
+                    continue
+            # Accepted rows hold their room for the rest of the batch
+            held.setdefault(values["room_id"], []).append((values["check_in_date"], values["check_out_date"]))
+    return errors
+
+BOOKING_BULK_SPEC = BulkSpec(model=Booking, schema=BookingCreate, prepare=_prepare_booking, check_batch=_check_booking_batch, after_insert=record_booking_rows)
+
+@router.post("/bulk", response_model=BulkResult)
+async def bulk_create_bookings(bookings: List[Dict[str, Any]], db: AsyncSession = Depends(get_db), current_user = Depends(verify_token)):
+    if not check_permission(current_user, "bookings"):
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    result = await bulk_import(db, BOOKING_BULK_SPEC, json_records(bookings), defaults={"created_by": current_user.id})
+    await event_bus.publish("bookings", "imported", data={"created": result.created})
+    return result
+
+@router.post("/import", response_model=BulkResult)
+async def import_bookings(file: UploadFile = File(...), db: AsyncSession = Depends(get_db), current_user = Depends(verify_token)):
+    if not check_permission(current_user, "bookings"):
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    result = await bulk_import(db, BOOKING_BULK_SPEC, csv_records(file.file), defaults={"created_by": current_user.id})
+    await event_bus.publish("bookings", "imported", data={"created": result.created})
+    return result
\ No newline at end of file
@@ -0,0 +1,73 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, Optional
+from pydantic import BaseModel
+from datetime import date, datetime, timedelta
+
+from ..database import get_db
+from ..models import Room, RoomStatus
+from ..auth import verify_token, check_permission
+from ..rollups import stats_cache, summarize
+
+router = APIRouter()
+
+class DashboardStatsResponse(BaseModel):
+    date_from: date
+    date_to: date
+    total_rooms: int
+    rooms_available: int
+    rooms_sold: int
+    active_bookings: int
+    revenue: float
+    occupancy_rate: float
+    adr: float
+    revpar: float
+    rooms_by_status: Dict[str, int]
+
+@router.get("/stats", response_model=DashboardStatsResponse)
+async def get_dashboard_stats(
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(verify_token)
+):
+    if not check_permission(current_user, "dashboard"):
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    today = datetime.utcnow().date()
+    date_from = date_from or today
+    date_to = date_to or date_from + timedelta(days=1)
+    if date_to <= date_from:
+        raise HTTPException(status_code=400, detail="date_to must be after date_from")
+    
+    cache_key = (date_from, date_to, today)
+    cached = stats_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
+    rows = (await db.execute(select(Room.status, func.count(Room.id)).group_by(Room.status))).all()
+    rooms_by_status = {room_status.value: 0 for room_status in RoomStatus}
+    rooms_by_status.update({room_status.value: count for room_status, count in rows})
+    total_rooms = sum(rooms_by_status.values())
+    rooms_available = total_rooms - rooms_by_status[RoomStatus.MAINTENANCE.value]
+    
+    period = await summarize(db, date_from, date_to)
+    tonight = await summarize(db, today, today + timedelta(days=1))
+    room_nights = rooms_available * (date_to - date_from).days
+    
+    stats = DashboardStatsResponse(
+        date_from=date_from,
+        date_to=date_to,
+        total_rooms=total_rooms,
+        rooms_available=rooms_available,
+        rooms_sold=period["rooms_sold"],
+        active_bookings=tonight["rooms_sold"],
+        revenue=round(period["room_revenue"], 2),
+        occupancy_rate=round(100 * period["rooms_sold"] / room_nights, 2) if room_nights else 0.0,
+        adr=round(period["room_revenue"] / period["rooms_sold"], 2) if period["rooms_sold"] else 0.0,
+        revpar=round(period["room_revenue"] / room_nights, 2) if room_nights else 0.0,
+        rooms_by_status=rooms_by_status
+    )
+    stats_cache.set(cache_key, stats)
+    return stats
\ No newline at end of file
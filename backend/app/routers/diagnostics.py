@@ -0,0 +1,60 @@
+from fastapi import APIRouter, Depends, HTTPException
+
+from ..auth import Principal, verify_token, check_permission, password_hasher, principal_cache_stats
+from ..database import pool_settings, pool_status, replica_status
+from ..events import event_bus
+from ..query_diagnostics import diagnostics_summary
+from ..response_cache import response_cache
+from ..search import guest_index
+from ..rollups import stats_cache
+
+router = APIRouter()
+
+@router.get("/cache")
+async def get_cache_stats(current_user: Principal = Depends(verify_token)):
+    if not check_permission(current_user, "diagnostics"):
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    return {"principal": principal_cache_stats(), "dashboard": stats_cache.stats(), "responses": response_cache.stats()}
+
+@router.get("/password-hasher")
+async def get_password_hasher_stats(current_user: Principal = Depends(verify_token)):
+    if not check_permission(current_user, "diagnostics"):
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    return password_hasher.stats()
+
+@router.get("/queries")
+async def get_query_diagnostics(current_user: Principal = Depends(verify_token)):
+    if not check_permission(current_user, "diagnostics"):
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    return diagnostics_summary()
+
+@router.get("/pool")
+async def get_pool_stats(current_user: Principal = Depends(verify_token)):
+    if not check_permission(current_user, "diagnostics"):
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    return {"settings": pool_settings.model_dump(), "engines": pool_status()}
+
+@router.get("/replicas")
+async def get_replica_stats(current_user: Principal = Depends(verify_token)):
+    if not check_permission(current_user, "diagnostics"):
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    return replica_status()
+
+@router.get("/events")
+async def get_event_stats(current_user: Principal = Depends(verify_token)):
+    if not check_permission(current_user, "diagnostics"):
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    return event_bus.stats()
+
+@router.get("/search")
+async def get_search_stats(current_user: Principal = Depends(verify_token)):
+    if not check_permission(current_user, "diagnostics"):
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    return guest_index.stats()
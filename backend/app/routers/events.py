@@ -0,0 +1,77 @@
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from typing import Any, List, Optional, Tuple
+import asyncio
+import contextlib
+import json
+import time
+
+from ..database import read_session
+from ..auth import decode_token, get_principal, check_permission
+from ..events import EVENTS_HEARTBEAT_SECONDS, EVENTS_SEND_TIMEOUT_SECONDS, PING, RESOURCE_PERMISSIONS, event_bus
+
+router = APIRouter()
+
+# Seconds a new connection has to send its token
+AUTH_TIMEOUT_SECONDS = 10
+
+async def _authenticate(websocket: WebSocket) -> Optional[Tuple[Any, Optional[int], List[str]]]:
+    # Browsers cannot set headers on a WebSocket, so the token arrives as the first message rather than in the
+    # URL, where it would end up in proxy logs: {"token": "...", "resources": ["rooms", "tasks"]}
+    try:
+        hello = json.loads(await asyncio.wait_for(websocket.receive_text(), AUTH_TIMEOUT_SECONDS))
+        token, requested = hello["token"], hello.get("resources") or list(RESOURCE_PERMISSIONS)
+    except (asyncio.TimeoutError, ValueError, KeyError, TypeError):
+        return None
+    payload = decode_token(token) if isinstance(token, str) else None
+    if payload is None:
+        return None
+    async with read_session() as db:
+        principal = await get_principal(db, payload["sub"])
+    if principal is None or not principal.is_active:
+        return None
+    return principal, payload.get("exp"), requested
+
+async def _drain(websocket: WebSocket):
+    # Nothing is expected from the client after the handshake; reading notices the close frame promptly
+    while True:
+        await websocket.receive_text()
+
+@router.websocket("/ws")
+async def events_socket(websocket: WebSocket):
+    await websocket.accept()
+    authenticated = await _authenticate(websocket)
+    if authenticated is None:
+        await websocket.close(code=4401, reason="Could not validate credentials")
+        return
+    principal, expires_at, requested = authenticated
+
+    resources = {resource for resource in requested if resource in RESOURCE_PERMISSIONS and check_permission(principal, RESOURCE_PERMISSIONS[resource])}
+    if not resources:
+        await websocket.close(code=4403, reason="Not enough permissions")
+        return
+
+    subscriber = event_bus.subscribe(resources)
+    reader = asyncio.create_task(_drain(websocket))
+    try:
+        await websocket.send_text(json.dumps({"type": "subscribed", "resources": sorted(resources)}))
+        while True:
+            if expires_at is not None and time.time() >= expires_at:
+                await websocket.close(code=4401, reason="Token expired")
+                break
+            getter = asyncio.ensure_future(subscriber.queue.get())
+            done, _ = await asyncio.wait({getter, reader}, timeout=EVENTS_HEARTBEAT_SECONDS, return_when=asyncio.FIRST_COMPLETED)
+            if getter not in done:
+                getter.cancel()
+            if reader in done:
+                break
+            message = getter.result() if getter in done else PING
+            # A client whose socket buffers stay full is dropped rather than left holding the worker's memory
+            await asyncio.wait_for(websocket.send_text(message), EVENTS_SEND_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        with contextlib.suppress(Exception):
+            await asyncio.wait_for(websocket.close(code=1013, reason="Too slow"), 1)
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        event_bus.unsubscribe(subscriber)
+        reader.cancel()
@@ -1,12 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, UploadFile, status
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, Dict, List, Optional, Union
 from pydantic import BaseModel, EmailStr
 from datetime import datetime
 
 from ..database import get_db
 from ..models import Guest
 from ..auth import verify_token, check_permission
+from ..changes import Delta, conditional, delta, reject_filters
+from ..bulk import BulkResult, BulkSpec, Row, bulk_import, csv_records, duplicates_within, json_records
+from ..export import export_response
+from ..pagination import Page, PageParams, paginate, apply_filters, apply_date_range
+from ..search import fallback_query, guest_index
+from ..serialization import Projection, json_response
 
 router = APIRouter()
 
@@ -33,13 +40,16 @@ class GuestResponse(BaseModel):
     vip_status: bool
     created_at: datetime
 
-@router.get("/", response_model=List[GuestResponse])
-async def get_guests(db: Session = Depends(get_db), current_user = Depends(verify_token)):
-    if not check_permission(current_user, "guests"):
-        raise HTTPException(status_code=403, detail="Not enough permissions")
-    
-    guests = db.query(Guest).all()
-    return [GuestResponse(
+SORT_FIELDS = {
+    "id": Guest.id,
+    "created_at": Guest.created_at,
+    "email": Guest.email,
+}
+
+GUEST_PROJECTION = Projection(Guest, GuestResponse)
+
+def _guest_response(guest: Guest) -> GuestResponse:
+    return GuestResponse(
         id=guest.id,
         first_name=guest.first_name,
         last_name=guest.last_name,
@@ -51,15 +61,87 @@ async def get_guests(db: Session = Depends(get_db), current_user = Depends(verif
         nationality=guest.nationality,
         vip_status=guest.vip_status,
         created_at=guest.created_at
-    ) for guest in guests]
+    )
+
+@router.get("/", response_model=Union[Page[GuestResponse], Delta[GuestResponse]])
+async def get_guests(
+    request: Request,
+    page: PageParams = Depends(),
+    vip_status: Optional[bool] = None,
+    nationality: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    updated_since: Optional[datetime] = Query(None, description="Return only rows changed since then, plus deleted ids"),
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(verify_token)
+):
+    if not check_permission(current_user, "guests"):
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    if updated_since is not None:
+        reject_filters({"vip_status": vip_status, "nationality": nationality, "date_from": date_from, "date_to": date_to})
+    
+    stmt = apply_filters(GUEST_PROJECTION.select(), {
+        Guest.vip_status: vip_status,
+        Guest.nationality: nationality,
+    })
+    stmt = apply_date_range(stmt, Guest.created_at, date_from, date_to)
+    
+    async def build():
+        if updated_since is not None:
+            return await delta(db, GUEST_PROJECTION, updated_since, page)
+        rows, next_cursor = await paginate(db, Guest, stmt, page, SORT_FIELDS)
+        return GUEST_PROJECTION.page(rows, next_cursor, page.limit)
+    
+    return await conditional(request, db, Guest, build)
+
+@router.get("/search", response_model=List[GuestResponse])
+async def search_guests(
+    q: str = Query(..., min_length=1, max_length=100, description="Name, email, phone or id number, or the start of them"),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(verify_token)
+):
+    if not check_permission(current_user, "guests"):
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    # Ranked ids from the in-memory index, then one primary-key lookup for the top matches
+    ids = await guest_index.search(db, q, limit)
+    if ids is None:
+        ids = (await db.execute(fallback_query(q, limit))).scalars().all()
+    rows = (await db.execute(GUEST_PROJECTION.select().where(Guest.id.in_(ids)))).all() if ids else []
+    by_id = {row.id: row for row in rows}
+    return json_response(GUEST_PROJECTION.array([by_id[guest_id] for guest_id in ids if guest_id in by_id]))
+
+EXPORT_COLUMNS = [
+    Guest.id, Guest.first_name, Guest.last_name, Guest.email, Guest.phone, Guest.address,
+    Guest.id_number, Guest.date_of_birth, Guest.nationality, Guest.vip_status, Guest.created_at
+]
+
+def export_query(date_from: Optional[datetime] = None, date_to: Optional[datetime] = None):
+    # Shared with the export job
+    return apply_date_range(select(*EXPORT_COLUMNS), Guest.created_at, date_from, date_to).order_by(Guest.id)
+
+@router.get("/export")
+async def export_guests(
+    format: str = "csv",
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    gzip: bool = False,
+    current_user = Depends(verify_token)
+):
+    if not check_permission(current_user, "guests"):
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    return export_response("guests", export_query(date_from, date_to), format, gzip)
 
 @router.post("/", response_model=GuestResponse)
-async def create_guest(guest: GuestCreate, db: Session = Depends(get_db), current_user = Depends(verify_token)):
+async def create_guest(guest: GuestCreate, db: AsyncSession = Depends(get_db), current_user = Depends(verify_token)):
     if not check_permission(current_user, "guests"):
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
     # Check if guest already exists
-    db_guest = db.query(Guest).filter(Guest.email == guest.email).first()
+    db_guest = (await db.execute(select(Guest).where(Guest.email == guest.email))).scalars().first()
     if db_guest:
         raise HTTPException(status_code=400, detail="Guest with this email already exists")
     
@@ -75,19 +157,47 @@ async def create_guest(guest: GuestCreate, db: Session = Depends(get_db), curren
         nationality=guest.nationality
     )
     db.add(db_guest)
-    db.commit()
-    db.refresh(db_guest)
+    await db.commit()
+    await db.refresh(db_guest)
+    guest_index.upsert(db_guest.id, db_guest.first_name, db_guest.last_name, db_guest.email, db_guest.phone, db_guest.id_number)
     
-    return GuestResponse(
-        id=db_guest.id,
-        first_name=db_guest.first_name,
-        last_name=db_guest.last_name,
-        email=db_guest.email,
-        phone=db_guest.phone,
-        address=db_guest.address,
-        id_number=db_guest.id_number,
-        date_of_birth=db_guest.date_of_birth,
-        nationality=db_guest.nationality,
-        vip_status=db_guest.vip_status,
-        created_at=db_guest.created_at
-    )
\ No newline at end of file
+    return _guest_response(db_guest)
+
+def _prepare_guest(guest: GuestCreate) -> Dict[str, Any]:
+    return guest.model_dump()
+
+async def _check_guest_batch(db: AsyncSession, rows: List[Row]) -> Dict[int, str]:
+    errors = {**duplicates_within(rows, "id_number"), **duplicates_within(rows, "email")}
+    emails = [values["email"] for _, values in rows]
+    id_numbers = [values["id_number"] for _, values in rows]
+    existing = (await db.execute(
+        select(Guest.email, Guest.id_number).where(or_(Guest.email.in_(emails), Guest.id_number.in_(id_numbers)))
+    )).all()
+    existing_emails = {email for email, _ in existing}
+    existing_id_numbers = {id_number for _, id_number in existing}
+    for row_number, values in rows:
+        if values["email"] in existing_emails:
+            errors.setdefault(row_number, "Guest with this email already exists")
+        elif values["id_number"] in existing_id_numbers:
+            errors.setdefault(row_number, "Guest with this id_number already exists")
+    return errors
+
+GUEST_BULK_SPEC = BulkSpec(model=Guest, schema=GuestCreate, prepare=_prepare_guest, check_batch=_check_guest_batch)
+
+@router.post("/bulk", response_model=BulkResult)
+async def bulk_create_guests(guests: List[Dict[str, Any]], db: AsyncSession = Depends(get_db), current_user = Depends(verify_token)):
+    if not check_permission(current_user, "guests"):
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    result = await bulk_import(db, GUEST_BULK_SPEC, json_records(guests))
+    guest_index.expire()
+    return result
+
+@router.post("/import", response_model=BulkResult)
+async def import_guests(file: UploadFile = File(...), db: AsyncSession = Depends(get_db), current_user = Depends(verify_token)):
+    if not check_permission(current_user, "guests"):
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    result = await bulk_import(db, GUEST_BULK_SPEC, csv_records(file.file))
+    guest_index.expire()
+    return result
\ No newline at end of file
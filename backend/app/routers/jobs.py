@@ -0,0 +1,169 @@
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
+from fastapi.responses import FileResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from typing import Any, Optional
+from pydantic import BaseModel
+from datetime import date, datetime
+from celery.result import AsyncResult
+import os
+import shutil
+import uuid
+
+from ..auth import verify_token, check_permission
+from ..celery import app as celery_app
+from ..database import get_db, read_from_primary
+from ..export import EXPORT_FORMATS
+from ..jobs import EXPORTS, IMPORT_SPECS, export_file, generate_report, import_file, job_file, rebuild_rollups, run_night_audit
+from ..models import Job, UserRole
+from ..report_engine import REPORT_TYPES
+
+router = APIRouter()
+
+class ReportJobCreate(BaseModel):
+    title: str
+    report_type: str
+    period_start: datetime
+    period_end: datetime
+
+class RollupJobCreate(BaseModel):
+    start: date
+    end: date
+
+class NightAuditJobCreate(BaseModel):
+    # Yesterday (UTC) when omitted, as in the nightly schedule
+    business_date: Optional[date] = None
+    rerun: bool = False
+
+class ExportJobCreate(BaseModel):
+    format: str = "csv"
+    gzip: bool = False
+    date_from: Optional[datetime] = None
+    date_to: Optional[datetime] = None
+
+class JobResponse(BaseModel):
+    job_id: str
+    status: str
+    result: Optional[Any] = None
+    error: Optional[str] = None
+
+# Permission needed to submit, and later to read, each kind of job
+JOB_PERMISSIONS = {
+    "reports.generate": "reports",
+    "rollups.rebuild": "reports",
+    "night_audit.run": "bookings",
+    **{f"{resource}.import": resource for resource in IMPORT_SPECS},
+    **{f"{resource}.export": resource for resource in EXPORTS},
+}
+
+def _job_response(result: AsyncResult) -> JobResponse:
+    status = result.status
+    return JobResponse(
+        job_id=result.id,
+        status=status,
+        result=result.result if status == "SUCCESS" else None,
+        error=str(result.result) if status in ("FAILURE", "RETRY") else None
+    )
+
+async def _submit(db: AsyncSession, current_user, task, *args, kind: Optional[str] = None, job_id: Optional[str] = None) -> JobResponse:
+    # The job is recorded with its submitter before it is queued, so it can be looked up as soon as it exists
+    job_id = job_id or str(uuid.uuid4())
+    db.add(Job(id=job_id, kind=kind or task.name, user_id=current_user.id))
+    await db.commit()
+    result = await run_in_threadpool(task.apply_async, args, task_id=job_id)
+    return _job_response(result)
+
+async def _owned_job(db: AsyncSession, job_id: str, current_user) -> Job:
+    # Other users' jobs, and jobs not submitted here, are reported as missing rather than forbidden. Read from
+    # the primary: a job polled right after it was submitted may not have reached a replica yet.
+    read_from_primary(db)
+    job = await db.get(Job, job_id)
+    if (
+        job is None
+        or not check_permission(current_user, JOB_PERMISSIONS.get(job.kind, "*"))
+        or (job.user_id != current_user.id and current_user.role != UserRole.ADMIN)
+    ):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.post("/reports", response_model=JobResponse, status_code=202)
+async def submit_report_job(job: ReportJobCreate, db: AsyncSession = Depends(get_db), current_user = Depends(verify_token)):
+    if not check_permission(current_user, "reports"):
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    if job.report_type not in REPORT_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unknown report type '{job.report_type}'")
+    if job.period_end <= job.period_start:
+        raise HTTPException(status_code=400, detail="period_end must be after period_start")
+    
+    return await _submit(db, current_user, generate_report, job.title, job.report_type, job.period_start.isoformat(), job.period_end.isoformat())
+
+@router.post("/rollups", response_model=JobResponse, status_code=202)
+async def submit_rollup_job(job: RollupJobCreate, db: AsyncSession = Depends(get_db), current_user = Depends(verify_token)):
+    if not check_permission(current_user, "reports"):
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    if job.end <= job.start:
+        raise HTTPException(status_code=400, detail="end must be after start")
+    
+    return await _submit(db, current_user, rebuild_rollups, job.start.isoformat(), job.end.isoformat())
+
+@router.post("/night-audit", response_model=JobResponse, status_code=202)
+async def submit_night_audit_job(job: NightAuditJobCreate, db: AsyncSession = Depends(get_db), current_user = Depends(verify_token)):
+    if not check_permission(current_user, "bookings"):
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    if job.business_date and job.business_date > datetime.utcnow().date():
+        raise HTTPException(status_code=400, detail="business_date cannot be in the future")
+    
+    return await _submit(db, current_user, run_night_audit, job.business_date.isoformat() if job.business_date else None, job.rerun)
+
+@router.post("/imports/{resource}", response_model=JobResponse, status_code=202)
+async def submit_import_job(resource: str, file: UploadFile = File(...), db: AsyncSession = Depends(get_db), current_user = Depends(verify_token)):
+    if resource not in IMPORT_SPECS:
+        raise HTTPException(status_code=404, detail=f"No import for '{resource}'")
+    if not check_permission(current_user, resource):
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    # The upload is spooled to the shared job directory; the worker imports it and deletes it
+    job_id = str(uuid.uuid4())
+    def spool():
+        with open(job_file(job_id, "csv"), "wb") as out:
+            shutil.copyfileobj(file.file, out)
+    await run_in_threadpool(spool)
+    return await _submit(db, current_user, import_file, resource, current_user.id, kind=f"{resource}.import", job_id=job_id)
+
+@router.post("/exports/{resource}", response_model=JobResponse, status_code=202)
+async def submit_export_job(resource: str, job: ExportJobCreate, db: AsyncSession = Depends(get_db), current_user = Depends(verify_token)):
+    if resource not in EXPORTS:
+        raise HTTPException(status_code=404, detail=f"No export for '{resource}'")
+    if not check_permission(current_user, resource):
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    if job.format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format '{job.format}'. Use one of: {', '.join(EXPORT_FORMATS)}")
+    return await _submit(
+        db, current_user, export_file, resource, job.format, job.gzip,
+        job.date_from.isoformat() if job.date_from else None, job.date_to.isoformat() if job.date_to else None,
+        kind=f"{resource}.export"
+    )
+
+@router.get("/{job_id}/file")
+async def download_job_file(job_id: str, db: AsyncSession = Depends(get_db), current_user = Depends(verify_token)):
+    job = await _owned_job(db, job_id, current_user)
+    if not job.kind.endswith(".export"):
+        raise HTTPException(status_code=404, detail="This job has no file")
+    result = await run_in_threadpool(_job_response, AsyncResult(job_id, app=celery_app))
+    if result.status != "SUCCESS":
+        raise HTTPException(status_code=409, detail=f"The export is not ready ({result.status})")
+    filename = result.result["filename"]
+    path = job_file(job_id, filename.split(".", 1)[1])
+    if not os.path.exists(path):
+        raise HTTPException(status_code=410, detail="The export file has expired")
+    media_type = "application/gzip" if filename.endswith(".gz") else EXPORT_FORMATS[filename.split(".")[1]]
+    return FileResponse(path, media_type=media_type, filename=filename)
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str, db: AsyncSession = Depends(get_db), current_user = Depends(verify_token)):
+    await _owned_job(db, job_id, current_user)
+    return await run_in_threadpool(_job_response, AsyncResult(job_id, app=celery_app))
\ No newline at end of file
@@ -1,12 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, UploadFile, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, Dict, List, Optional, Union
 from pydantic import BaseModel
 from datetime import datetime
 
 from ..database import get_db
 from ..models import Room, RoomType, RoomStatus
 from ..auth import verify_token, check_permission
+from ..availability import available_rooms, available_rooms_query
+from ..changes import Delta, conditional, delta, reject_filters
+from ..events import event_bus
+from ..bulk import BulkResult, BulkSpec, Row, bulk_import, csv_records, duplicates_within, json_records
+from ..rollups import stats_cache
+from ..pagination import Page, PageParams, paginate, apply_filters, parse_enum
+from ..pricing import quote
+from ..response_cache import response_cache
+from ..serialization import Projection
 
 router = APIRouter()
 
@@ -35,13 +45,34 @@ class RoomResponse(BaseModel):
     last_cleaned: Optional[datetime] = None
     next_maintenance: Optional[datetime] = None
 
-@router.get("/", response_model=List[RoomResponse])
-async def get_rooms(db: Session = Depends(get_db), current_user = Depends(verify_token)):
-    if not check_permission(current_user, "rooms"):
-        raise HTTPException(status_code=403, detail="Not enough permissions")
-    
-    rooms = db.query(Room).all()
-    return [RoomResponse(
+class RoomQuote(BaseModel):
+    room_id: int
+    room_number: str
+    room_type: str
+    floor: int
+    price_per_night: float
+    extra_guests: int
+    total: float
+    average_nightly: float
+
+class QuoteResult(BaseModel):
+    check_in: datetime
+    check_out: datetime
+    nights: int
+    guests: int
+    stay_discount: float
+    rooms: List[RoomQuote]
+
+SORT_FIELDS = {
+    "id": Room.id,
+    "room_number": Room.room_number,
+    "floor": Room.floor,
+}
+
+ROOM_PROJECTION = Projection(Room, RoomResponse)
+
+def _room_response(room: Room) -> RoomResponse:
+    return RoomResponse(
         id=room.id,
         room_number=room.room_number,
         room_type=room.room_type.value,
@@ -51,15 +82,107 @@ async def get_rooms(db: Session = Depends(get_db), current_user = Depends(verify
         amenities=room.amenities,
         last_cleaned=room.last_cleaned,
         next_maintenance=room.next_maintenance
-    ) for room in rooms]
+    )
+
+@router.get("/", response_model=Union[Page[RoomResponse], Delta[RoomResponse]])
+async def get_rooms(
+    request: Request,
+    page: PageParams = Depends(),
+    status: Optional[str] = None,
+    room_type: Optional[str] = None,
+    floor: Optional[int] = None,
+    updated_since: Optional[datetime] = Query(None, description="Return only rows changed since then, plus deleted ids"),
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(verify_token)
+):
+    if not check_permission(current_user, "rooms"):
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    if updated_since is not None:
+        reject_filters({"status": status, "room_type": room_type, "floor": floor})
+    
+    stmt = apply_filters(ROOM_PROJECTION.select(), {
+        Room.status: parse_enum(RoomStatus, status, "status"),
+        Room.room_type: parse_enum(RoomType, room_type, "room_type"),
+        Room.floor: floor,
+    })
+    
+    async def build():
+        if updated_since is not None:
+            return await delta(db, ROOM_PROJECTION, updated_since, page)
+        rows, next_cursor = await paginate(db, Room, stmt, page, SORT_FIELDS)
+        return ROOM_PROJECTION.page(rows, next_cursor, page.limit)
+    
+    # Polled by every status board and front-desk terminal: unchanged lists cost one aggregate query and a 304,
+    # changed ones are served from the response cache that the writes below invalidate
+    return await conditional(request, db, Room, build, cached=("rooms", current_user.role.value))
+
+@router.get("/availability", response_model=List[RoomResponse])
+async def get_room_availability(
+    check_in: datetime,
+    check_out: datetime,
+    room_type: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(verify_token)
+):
+    if not check_permission(current_user, "rooms"):
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    if check_out <= check_in:
+        raise HTTPException(status_code=400, detail="check_out must be after check_in")
+    
+    rooms = await available_rooms(db, check_in, check_out, parse_enum(RoomType, room_type, "room_type"))
+    return [_room_response(room) for room in rooms]
+
+@router.get("/quote", response_model=QuoteResult)
+async def get_room_quotes(
+    check_in: datetime,
+    check_out: datetime,
+    guests: int = Query(1, ge=1),
+    room_type: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(verify_token)
+):
+    if not check_permission(current_user, "rooms"):
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    if check_out <= check_in:
+        raise HTTPException(status_code=400, detail="check_out must be after check_in")
+    
+    # Every available room priced in one vectorized pass; rooms too small for the party are left out
+    stmt = available_rooms_query(check_in, check_out, parse_enum(RoomType, room_type, "room_type")).with_only_columns(
+        Room.id, Room.room_number, Room.room_type, Room.floor, Room.price_per_night
+    )
+    rooms = (await db.execute(stmt)).all()
+    quotes = quote([room.room_type for room in rooms], [room.price_per_night for room in rooms], check_in, check_out, guests)
+    return QuoteResult(
+        check_in=check_in,
+        check_out=check_out,
+        nights=quotes.nights,
+        guests=guests,
+        stay_discount=quotes.discount,
+        rooms=[
+            RoomQuote(
+                room_id=room.id,
+                room_number=room.room_number,
+                room_type=room.room_type.value,
+                floor=room.floor,
+                price_per_night=room.price_per_night,
+                extra_guests=int(extra),
+                total=float(total),
+                average_nightly=round(float(total) / quotes.nights, 2)
+            )
+            for room, total, fits, extra in zip(rooms, quotes.totals, quotes.fits, quotes.extra_guests) if fits
+        ]
+    )
 
 @router.post("/", response_model=RoomResponse)
-async def create_room(room: RoomCreate, db: Session = Depends(get_db), current_user = Depends(verify_token)):
+async def create_room(room: RoomCreate, db: AsyncSession = Depends(get_db), current_user = Depends(verify_token)):
     if not check_permission(current_user, "rooms"):
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
     # Check if room number already exists
-    db_room = db.query(Room).filter(Room.room_number == room.room_number).first()
+    db_room = (await db.execute(select(Room).where(Room.room_number == room.room_number))).scalars().first()
     if db_room:
         raise HTTPException(status_code=400, detail="Room number already exists")
     
@@ -72,17 +195,82 @@ async def create_room(room: RoomCreate, db: Session = Depends(get_db), current_u
         amenities=room.amenities
     )
     db.add(db_room)
-    db.commit()
-    db.refresh(db_room)
+    await db.commit()
+    await db.refresh(db_room)
+    stats_cache.clear()
+    await response_cache.invalidate("rooms")
+    response = _room_response(db_room)
+    await event_bus.publish("rooms", "created", response.id, response)
     
-    return RoomResponse(
-        id=db_room.id,
-        room_number=db_room.room_number,
-        room_type=db_room.room_type.value,
-        status=db_room.status.value,
-        price_per_night=db_room.price_per_night,
-        floor=db_room.floor,
-        amenities=db_room.amenities,
-        last_cleaned=db_room.last_cleaned,
-        next_maintenance=db_room.next_maintenance
-    )
\ No newline at end of file
+    return response
+
+@router.put("/{room_id}", response_model=RoomResponse)
+async def update_room(room_id: int, room: RoomUpdate, db: AsyncSession = Depends(get_db), current_user = Depends(verify_token)):
+    if not check_permission(current_user, "rooms"):
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    db_room = await db.get(Room, room_id)
+    if db_room is None:
+        raise HTTPException(status_code=404, detail="Room not found")
+    
+    if room.room_type is not None:
+        db_room.room_type = parse_enum(RoomType, room.room_type, "room_type")
+    if room.status is not None:
+        db_room.status = parse_enum(RoomStatus, room.status, "status")
+    if room.price_per_night is not None:
+        db_room.price_per_night = room.price_per_night
+    if room.floor is not None:
+        db_room.floor = room.floor
+    if room.amenities is not None:
+        db_room.amenities = room.amenities
+    await db.commit()
+    await db.refresh(db_room)
+    stats_cache.clear()
+    await response_cache.invalidate("rooms")
+    response = _room_response(db_room)
+    await event_bus.publish("rooms", "updated", response.id, response)
+    
+    return response
+
+def _prepare_room(room: RoomCreate) -> Dict[str, Any]:
+    return {
+        "room_number": room.room_number,
+        "room_type": RoomType(room.room_type),
+        "price_per_night": room.price_per_night,
+        "floor": room.floor,
+        "amenities": room.amenities,
+    }
+
+async def _check_room_batch(db: AsyncSession, rows: List[Row]) -> Dict[int, str]:
+    errors = duplicates_within(rows, "room_number")
+    numbers = [values["room_number"] for _, values in rows]
+    existing = set((await db.execute(select(Room.room_number).where(Room.room_number.in_(numbers)))).scalars())
+    for row_number, values in rows:
+        if values["room_number"] in existing:
+            errors.setdefault(row_number, f"Room number {values['room_number']} already exists")
+    return errors
+
+async def _rooms_inserted(db: AsyncSession, rows: List[Dict[str, Any]]):
+    stats_cache.clear()
+
+ROOM_BULK_SPEC = BulkSpec(model=Room, schema=RoomCreate, prepare=_prepare_room, check_batch=_check_room_batch, after_insert=_rooms_inserted)
+
+@router.post("/bulk", response_model=BulkResult)
+async def bulk_create_rooms(rooms: List[Dict[str, Any]], db: AsyncSession = Depends(get_db), current_user = Depends(verify_token)):
+    if not check_permission(current_user, "rooms"):
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    result = await bulk_import(db, ROOM_BULK_SPEC, json_records(rooms))
+    await response_cache.invalidate("rooms")
+    await event_bus.publish("rooms", "imported", data={"created": result.created})
+    return result
+
+@router.post("/import", response_model=BulkResult)
+async def import_rooms(file: UploadFile = File(...), db: AsyncSession = Depends(get_db), current_user = Depends(verify_token)):
+    if not check_permission(current_user, "rooms"):
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    result = await bulk_import(db, ROOM_BULK_SPEC, csv_records(file.file))
+    await response_cache.invalidate("rooms")
+    await event_bus.publish("rooms", "imported", data={"created": result.created})
+    return result
\ No newline at end of file
@@ -1,12 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List, Optional
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional, Union
+from pydantic import BaseModel, Field
 from datetime import datetime
 
 from ..database import get_db
 from ..models import Task, TaskType, TaskStatus, Priority
 from ..auth import verify_token, check_permission
+from ..changes import Delta, conditional, delta, reject_filters
+from ..dispatch import DISPATCH_SHIFT_MINUTES, dispatch, has_unassigned
+from ..events import event_bus
+from ..export import export_response
+from ..pagination import Page, PageParams, paginate, apply_filters, apply_date_range, parse_enum
+from ..serialization import Projection
 
 router = APIRouter()
 
@@ -31,13 +38,43 @@ class TaskResponse(BaseModel):
     completed_at: Optional[datetime] = None
     created_at: datetime
 
-@router.get("/", response_model=List[TaskResponse])
-async def get_tasks(db: Session = Depends(get_db), current_user = Depends(verify_token)):
-    if not check_permission(current_user, "tasks"):
-        raise HTTPException(status_code=403, detail="Not enough permissions")
-    
-    tasks = db.query(Task).all()
-    return [TaskResponse(
+class DispatchRequest(BaseModel):
+    # Also move pending tasks that already have an attendant; otherwise only unassigned tasks are planned
+    rebalance: bool = False
+    dry_run: bool = False
+    capacity_minutes: int = Field(DISPATCH_SHIFT_MINUTES, gt=0)
+
+class DispatchAssignment(BaseModel):
+    task_id: int
+    assigned_to: int
+    sequence: int
+    starts_in_minutes: int
+    late: bool
+
+class DispatchStaff(BaseModel):
+    user_id: int
+    tasks: List[int]
+    minutes: int
+    floors: List[int]
+
+class DispatchResult(BaseModel):
+    assignments: List[DispatchAssignment]
+    staff: List[DispatchStaff]
+    unassigned: List[int]
+    # Planned, but started or assigned elsewhere before the plan was saved; left as they are
+    lost: List[int] = []
+    late: int
+    planning_ms: float
+
+SORT_FIELDS = {
+    "id": Task.id,
+    "created_at": Task.created_at,
+}
+
+TASK_PROJECTION = Projection(Task, TaskResponse)
+
+def _task_response(task: Task) -> TaskResponse:
+    return TaskResponse(
         id=task.id,
         room_id=task.room_id,
         title=task.title,
@@ -49,10 +86,71 @@ async def get_tasks(db: Session = Depends(get_db), current_user = Depends(verify
         due_date=task.due_date,
         completed_at=task.completed_at,
         created_at=task.created_at
-    ) for task in tasks]
+    )
+
+@router.get("/", response_model=Union[Page[TaskResponse], Delta[TaskResponse]])
+async def get_tasks(
+    request: Request,
+    page: PageParams = Depends(),
+    status: Optional[str] = None,
+    priority: Optional[str] = None,
+    task_type: Optional[str] = None,
+    room_id: Optional[int] = None,
+    assigned_to: Optional[int] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    updated_since: Optional[datetime] = Query(None, description="Return only rows changed since then, plus deleted ids"),
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(verify_token)
+):
+    if not check_permission(current_user, "tasks"):
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    if updated_since is not None:
+        reject_filters({"status": status, "priority": priority, "task_type": task_type, "room_id": room_id,
+                        "assigned_to": assigned_to, "date_from": date_from, "date_to": date_to})
+    
+    stmt = apply_filters(TASK_PROJECTION.select(), {
+        Task.status: parse_enum(TaskStatus, status, "status"),
+        Task.priority: parse_enum(Priority, priority, "priority"),
+        Task.task_type: parse_enum(TaskType, task_type, "task_type"),
+        Task.room_id: room_id,
+        Task.assigned_to: assigned_to,
+    })
+    stmt = apply_date_range(stmt, Task.due_date, date_from, date_to)
+    
+    async def build():
+        if updated_since is not None:
+            return await delta(db, TASK_PROJECTION, updated_since, page)
+        rows, next_cursor = await paginate(db, Task, stmt, page, SORT_FIELDS)
+        return TASK_PROJECTION.page(rows, next_cursor, page.limit)
+    
+    return await conditional(request, db, Task, build)
+
+EXPORT_COLUMNS = [
+    Task.id, Task.room_id, Task.title, Task.description, Task.task_type, Task.priority, Task.status,
+    Task.assigned_to, Task.due_date, Task.completed_at, Task.created_at
+]
+
+def export_query(date_from: Optional[datetime] = None, date_to: Optional[datetime] = None):
+    # Shared with the export job
+    return apply_date_range(select(*EXPORT_COLUMNS), Task.due_date, date_from, date_to).order_by(Task.id)
+
+@router.get("/export")
+async def export_tasks(
+    format: str = "csv",
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    gzip: bool = False,
+    current_user = Depends(verify_token)
+):
+    if not check_permission(current_user, "tasks"):
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    return export_response("tasks", export_query(date_from, date_to), format, gzip)
 
 @router.post("/", response_model=TaskResponse)
-async def create_task(task: TaskCreate, db: Session = Depends(get_db), current_user = Depends(verify_token)):
+async def create_task(task: TaskCreate, db: AsyncSession = Depends(get_db), current_user = Depends(verify_token)):
     if not check_permission(current_user, "tasks"):
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
@@ -66,19 +164,70 @@ async def create_task(task: TaskCreate, db: Session = Depends(get_db), current_u
         due_date=task.due_date
     )
     db.add(db_task)
-    db.commit()
-    db.refresh(db_task)
+    await db.commit()
+    await db.refresh(db_task)
+    response = _task_response(db_task)
+    await event_bus.publish("tasks", "created", response.id, response)
     
-    return TaskResponse(
-        id=db_task.id,
-        room_id=db_task.room_id,
-        title=db_task.title,
-        description=db_task.description,
-        task_type=db_task.task_type.value,
-        priority=db_task.priority.value,
-        status=db_task.status.value,
-        assigned_to=db_task.assigned_to,
-        due_date=db_task.due_date,
-        completed_at=db_task.completed_at,
-        created_at=db_task.created_at
-    )
\ No newline at end of file
+    return response
+
+@router.delete("/{task_id}", status_code=204)
+async def delete_task(task_id: int, db: AsyncSession = Depends(get_db), current_user = Depends(verify_token)):
+    if not check_permission(current_user, "tasks"):
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    db_task = await db.get(Task, task_id)
+    if db_task is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    
+    # The flush records a tombstone so updated_since clients drop the task too
+    await db.delete(db_task)
+    await db.commit()
+    await event_bus.publish("tasks", "deleted", task_id)
+    return Response(status_code=204)
+
+async def _dispatch(db: AsyncSession, rebalance: bool = False, dry_run: bool = False, capacity_minutes: int = DISPATCH_SHIFT_MINUTES) -> DispatchResult:
+    plan, planning_ms = await dispatch(db, rebalance, dry_run, capacity_minutes)
+    if plan.assignments and not dry_run:
+        await event_bus.publish("tasks", "dispatched", data={"assigned": len(plan.assignments)})
+    return DispatchResult(
+        assignments=[DispatchAssignment(**vars(assignment)) for assignment in plan.assignments],
+        staff=[
+            DispatchStaff(user_id=attendant.id, tasks=attendant.tasks, minutes=attendant.minutes, floors=attendant.floors)
+            for attendant in plan.staff
+        ],
+        unassigned=plan.unassigned,
+        lost=plan.lost,
+        late=sum(1 for assignment in plan.assignments if assignment.late),
+        planning_ms=round(planning_ms, 2)
+    )
+
+@router.post("/dispatch", response_model=DispatchResult)
+async def dispatch_tasks(request: DispatchRequest, db: AsyncSession = Depends(get_db), current_user = Depends(verify_token)):
+    if not check_permission(current_user, "tasks"):
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    # Assigns open cleaning and inspection tasks to active housekeeping staff: most urgent first, kept on one
+    # floor where possible, balanced by queued minutes
+    return await _dispatch(db, request.rebalance, request.dry_run, request.capacity_minutes)
+
+@router.post("/{task_id}/complete", response_model=TaskResponse)
+async def complete_task(task_id: int, redispatch: bool = True, db: AsyncSession = Depends(get_db), current_user = Depends(verify_token)):
+    if not check_permission(current_user, "tasks"):
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    db_task = await db.get(Task, task_id)
+    if db_task is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    
+    db_task.status = TaskStatus.COMPLETED
+    db_task.completed_at = datetime.utcnow()
+    await db.commit()
+    await db.refresh(db_task)
+    response = _task_response(db_task)
+    await event_bus.publish("tasks", "updated", response.id, response)
+    
+    # The freed time goes to tasks nobody could take before; existing assignments stay as they are
+    if redispatch and await has_unassigned(db):
+        await _dispatch(db)
+    return response
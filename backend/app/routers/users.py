@@ -1,11 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
 from pydantic import BaseModel, EmailStr
 
 from ..database import get_db
 from ..models import User, UserRole
-from ..auth import verify_token, check_permission, get_password_hash
+from ..auth import Principal, verify_token, check_permission, password_hasher, invalidate_principal
+from ..pagination import Page, PageParams, paginate, apply_filters, parse_enum
+from ..response_cache import response_cache
 
 router = APIRouter()
 
@@ -16,6 +19,12 @@ class UserCreate(BaseModel):
     last_name: str
     role: str
 
+class UserUpdate(BaseModel):
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    role: Optional[str] = None
+    is_active: Optional[bool] = None
+
 class UserResponse(BaseModel):
     id: int
     email: str
@@ -24,33 +33,60 @@ class UserResponse(BaseModel):
     role: str
     is_active: bool
 
-@router.get("/", response_model=List[UserResponse])
-async def get_users(db: Session = Depends(get_db), current_user: User = Depends(verify_token)):
-    if not check_permission(current_user, "staff"):
-        raise HTTPException(status_code=403, detail="Not enough permissions")
-    
-    users = db.query(User).all()
-    return [UserResponse(
+SORT_FIELDS = {
+    "id": User.id,
+    "email": User.email,
+}
+
+def _user_response(user: User) -> UserResponse:
+    return UserResponse(
         id=user.id,
         email=user.email,
         first_name=user.first_name,
         last_name=user.last_name,
         role=user.role.value,
         is_active=user.is_active
-    ) for user in users]
+    )
+
+@router.get("/", response_model=Page[UserResponse])
+async def get_users(
+    request: Request,
+    page: PageParams = Depends(),
+    role: Optional[str] = None,
+    is_active: Optional[bool] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(verify_token)
+):
+    if not check_permission(current_user, "staff"):
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    stmt = apply_filters(select(User), {
+        User.role: parse_enum(UserRole, role, "role"),
+        User.is_active: is_active,
+    })
+    
+    async def build():
+        users, next_cursor = await paginate(db, User, stmt, page, SORT_FIELDS)
+        return Page[UserResponse](
+            items=[_user_response(user) for user in users],
+            next_cursor=next_cursor,
+            limit=page.limit
+        )
+    
+    return await response_cache.respond(request, "users", current_user.role.value, db, build)
 
 @router.post("/", response_model=UserResponse)
-async def create_user(user: UserCreate, db: Session = Depends(get_db), current_user: User = Depends(verify_token)):
+async def create_user(user: UserCreate, db: AsyncSession = Depends(get_db), current_user: Principal = Depends(verify_token)):
     if not check_permission(current_user, "staff"):
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
     # Check if user already exists
-    db_user = db.query(User).filter(User.email == user.email).first()
+    db_user = (await db.execute(select(User).where(User.email == user.email))).scalars().first()
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
     # Create new user
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await password_hasher.hash(user.password)
     db_user = User(
         email=user.email,
         hashed_password=hashed_password,
@@ -59,14 +95,34 @@ async def create_user(user: UserCreate, db: Session = Depends(get_db), current_u
         role=UserRole(user.role)
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
+    await response_cache.invalidate("users")
     
-    return UserResponse(
-        id=db_user.id,
-        email=db_user.email,
-        first_name=db_user.first_name,
-        last_name=db_user.last_name,
-        role=db_user.role.value,
-        is_active=db_user.is_active
-    )
\ No newline at end of file
+    return _user_response(db_user)
+
+@router.put("/{user_id}", response_model=UserResponse)
+async def update_user(user_id: int, user: UserUpdate, db: AsyncSession = Depends(get_db), current_user: Principal = Depends(verify_token)):
+    if not check_permission(current_user, "staff"):
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    db_user = await db.get(User, user_id)
+    if db_user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    if user.first_name is not None:
+        db_user.first_name = user.first_name
+    if user.last_name is not None:
+        db_user.last_name = user.last_name
+    if user.role is not None:
+        db_user.role = parse_enum(UserRole, user.role, "role")
+    if user.is_active is not None:
+        db_user.is_active = user.is_active
+    await db.commit()
+    await db.refresh(db_user)
+    
+    # Role and activation changes must take effect on the user's next request
+    await invalidate_principal(db_user.email)
+    await response_cache.invalidate("users")
+    
+    return _user_response(db_user)
\ No newline at end of file
@@ -0,0 +1,86 @@
+from alembic import command
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.pool import NullPool
+from typing import Optional, Tuple
+import argparse
+import logging
+import os
+import sys
+import time
+
+from .database import DATABASE_URL
+
+logger = logging.getLogger(__name__)
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic.ini")
+
+class SchemaOutOfDate(RuntimeError):
+    pass
+
+def alembic_config() -> Config:
+    return Config(ALEMBIC_INI)
+
+def head_revision() -> Optional[str]:
+    return ScriptDirectory.from_config(alembic_config()).get_current_head()
+
+def wait_for_database(timeout: float = 0.0):
+    # One short-lived connection, retried with backoff while the database is still starting up
+    engine = create_engine(DATABASE_URL, poolclass=NullPool)
+    deadline = time.monotonic() + timeout
+    delay = 0.5
+    try:
+        while True:
+            try:
+                connection = engine.connect()
+            except OperationalError as exc:
+                if time.monotonic() + delay > deadline:
+                    raise
+                logger.warning("Database not reachable yet (%s), retrying in %.1fs", exc.orig, delay)
+                time.sleep(delay)
+                delay = min(delay * 2, 5.0)
+                continue
+            return engine, connection
+    except BaseException:
+        engine.dispose()
+        raise
+
+def schema_revisions(timeout: float = 0.0) -> Tuple[Optional[str], Optional[str]]:
+    engine, connection = wait_for_database(timeout)
+    try:
+        current = MigrationContext.configure(connection).get_current_revision()
+    finally:
+        connection.close()
+        engine.dispose()
+    return current, head_revision()
+
+def check_schema(timeout: float = 0.0):
+    # Run once per deployment (or once in the gunicorn master), never per worker
+    current, head = schema_revisions(timeout)
+    if current != head:
+        raise SchemaOutOfDate(f"Database schema is at {current or 'no revision'}, expected {head}; run 'python -m app.schema upgrade'")
+    return current
+
+def upgrade_schema(timeout: float = 0.0):
+    engine, connection = wait_for_database(timeout)
+    connection.close()
+    engine.dispose()
+    command.upgrade(alembic_config(), "head")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Check or upgrade the database schema before starting the API")
+    parser.add_argument("action", choices=("check", "upgrade"))
+    parser.add_argument("--wait", type=float, default=0.0, help="seconds to keep retrying while the database is unreachable")
+    args = parser.parse_args()
+    try:
+        if args.action == "check":
+            print(f"Database schema is up to date ({check_schema(args.wait)})")
+        else:
+            upgrade_schema(args.wait)
+    except (SchemaOutOfDate, OperationalError) as exc:
+        print(exc, file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,318 @@
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from dataclasses import dataclass
+from datetime import datetime
+from itertools import chain
+import asyncio
+import logging
+import os
+import re
+import time
+import unicodedata
+import numpy as np
+from dotenv import load_dotenv
+
+from .changes import settle_window
+from .database import SessionLocal
+from .models import Guest, Tombstone
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Keep a prefix index of guests in memory in every worker (about 150 MB per million guests); when off,
+# search falls back to LIKE queries
+GUEST_SEARCH_INDEX = os.getenv("GUEST_SEARCH_INDEX", "true").lower() == "true"
+# Keys are cut to this many bytes; a longer query matches on its first bytes
+GUEST_SEARCH_KEY_BYTES = int(os.getenv("GUEST_SEARCH_KEY_BYTES", "16"))
+# How often a worker picks up guests written by other workers and by imports
+GUEST_SEARCH_REFRESH_SECONDS = float(os.getenv("GUEST_SEARCH_REFRESH_SECONDS", "1"))
+# Recent changes are kept beside the sorted arrays and merged into them once this many guests changed
+GUEST_SEARCH_MERGE_ROWS = int(os.getenv("GUEST_SEARCH_MERGE_ROWS", "1000"))
+# Entries read per query term: a very common short prefix is only ranked within its first entries, which
+# hold its exact matches
+GUEST_SEARCH_SCAN_LIMIT = int(os.getenv("GUEST_SEARCH_SCAN_LIMIT", "20000"))
+
+FIRST_NAME, LAST_NAME, EMAIL, PHONE, ID_NUMBER = range(5)
+# A whole identifier outranks a whole name, but a partial one ranks below a partial name: "smi" is someone
+# typing a name far more often than the start of an id number
+EXACT_WEIGHTS = np.array([6, 8, 10, 10, 12], dtype=np.int64)
+PREFIX_WEIGHTS = np.array([3, 4, 2, 2, 2], dtype=np.int64)
+SEARCH_COLUMNS = (Guest.id, Guest.first_name, Guest.last_name, Guest.email, Guest.phone, Guest.id_number)
+
+PUNCTUATION = re.compile(r"[\W_]+")
+ASCII_PUNCTUATION = bytes(code for code in range(128) if not chr(code).isalnum())
+NAME_PARTS = re.compile(r"[\s\-]+")
+PHONE_QUERY = re.compile(r"[\d\s()+\-.]+")
+COUNTRY_CODE = re.compile(r"\+\d{1,3}[\s\-.(]+")
+
+Key = Tuple[bytes, int]
+
+def search_key(text: Optional[str]) -> bytes:
+    # Case, accents and punctuation are ignored: "O'Brien" -> obrien, "José" -> jose, "+1 (555) 010" -> 1555010
+    text = (text or "").lower()
+    if text.isascii():
+        return text.encode().translate(None, ASCII_PUNCTUATION)[:GUEST_SEARCH_KEY_BYTES]
+    text = "".join(char for char in unicodedata.normalize("NFKD", text) if not unicodedata.combining(char))
+    return PUNCTUATION.sub("", text).encode()[:GUEST_SEARCH_KEY_BYTES]
+
+def guest_keys(first_name: str, last_name: str, email: str, phone: str, id_number: str) -> List[Key]:
+    # Runs once per guest when a worker builds its index, so it stays free of generators and per-key sets
+    values = [(FIRST_NAME, first_name), (LAST_NAME, last_name), (EMAIL, email), (PHONE, phone), (ID_NUMBER, id_number)]
+    for field, name in ((FIRST_NAME, first_name), (LAST_NAME, last_name)):
+        # Each part of "Mary-Jane van Dyke" too; the whole name covers queries typed without spaces
+        parts = NAME_PARTS.split(name) if name else ()
+        if len(parts) > 1:
+            values.extend((field, part) for part in parts)
+    # "+1 555 0100" is also found as "555 0100"
+    national = COUNTRY_CODE.match(phone) if phone and phone[0] == "+" else None
+    if national:
+        values.append((PHONE, phone[national.end():]))
+    keys = []
+    for field, value in values:
+        key = search_key(value)
+        if key:
+            keys.append((key, field))
+    return list(dict.fromkeys(keys)) if len(keys) > 5 else keys
+
+def query_terms(q: str) -> List[bytes]:
+    # Whitespace separates terms that must all match, except in phone numbers typed with spaces
+    if PHONE_QUERY.fullmatch(q) and any(char.isdigit() for char in q):
+        words = [q]
+    else:
+        words = q.split()
+    return list(dict.fromkeys(key for key in map(search_key, words) if key))
+
+def _best_per_guest(ids: np.ndarray, scores: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # A term can hit several keys of one guest; the guest keeps its best score
+    if len(ids) == 0:
+        return ids, scores
+    order = np.argsort(ids, kind="stable")
+    ids, scores = ids[order], scores[order]
+    starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+    return ids[starts], np.maximum.reduceat(scores, starts)
+
+@dataclass
+class Snapshot:
+    # One entry per (key, guest, field), sorted by key: a prefix is a contiguous range found by binary search,
+    # and the keys equal to it come first in that range
+    keys: np.ndarray
+    ids: np.ndarray
+    fields: np.ndarray
+
+    @classmethod
+    def build(cls, rows: Iterable[Tuple[int, str, str, str, str, str]]) -> "Snapshot":
+        keys, ids, fields = [], [], []
+        for guest_id, *values in rows:
+            for key, field in guest_keys(*values):
+                keys.append(key)
+                ids.append(guest_id)
+                fields.append(field)
+        snapshot = cls(
+            np.array(keys, dtype=f"S{GUEST_SEARCH_KEY_BYTES}"),
+            np.array(ids, dtype=np.int32),
+            np.array(fields, dtype=np.int8),
+        )
+        order = np.argsort(snapshot.keys, kind="stable")
+        return cls(snapshot.keys[order], snapshot.ids[order], snapshot.fields[order])
+
+    def merged(self, changed: Dict[int, List[Key]], removed: Set[int]) -> "Snapshot":
+        # Drops the entries of changed and removed guests and inserts the changed guests' current keys in
+        # place, in linear time instead of sorting everything again
+        keep = ~np.isin(self.ids, np.fromiter(chain(changed, removed), dtype=np.int64))
+        added = sorted((key, guest_id, field) for guest_id, keys in changed.items() for key, field in keys)
+        keys = self.keys[keep]
+        new_keys = np.array([key for key, _, _ in added], dtype=keys.dtype)
+        positions = np.searchsorted(keys, new_keys)
+        return Snapshot(
+            np.insert(keys, positions, new_keys),
+            np.insert(self.ids[keep], positions, np.array([guest_id for _, guest_id, _ in added], dtype=np.int32)),
+            np.insert(self.fields[keep], positions, np.array([field for _, _, field in added], dtype=np.int8)),
+        )
+
+    def match(self, term: bytes) -> Tuple[np.ndarray, np.ndarray]:
+        low = int(np.searchsorted(self.keys, term, "left"))
+        exact = int(np.searchsorted(self.keys, term, "right"))
+        high = min(int(np.searchsorted(self.keys, term + b"\xff", "left")), low + GUEST_SEARCH_SCAN_LIMIT)
+        fields = self.fields[low:high]
+        scores = PREFIX_WEIGHTS[fields]
+        scores[:exact - low] = EXACT_WEIGHTS[fields[:exact - low]]
+        return self.ids[low:high], scores
+
+    @property
+    def nbytes(self) -> int:
+        return self.keys.nbytes + self.ids.nbytes + self.fields.nbytes
+
+class GuestIndex:
+    # Sorted numpy arrays of normalized name, email, phone and id_number keys, plus the keys of guests changed
+    # since the arrays were built. Writes in this worker apply at once; writes elsewhere are picked up through
+    # updated_at and the tombstones at most GUEST_SEARCH_REFRESH_SECONDS later.
+    def __init__(self):
+        self.snapshot: Optional[Snapshot] = None
+        self.changed: Dict[int, List[Key]] = {}
+        self.removed: Set[int] = set()
+        self.since: Optional[datetime] = None
+        self._stale: Optional[np.ndarray] = None
+        self._next_refresh = 0.0
+        self._build_task: Optional[asyncio.Task] = None
+        self._merge_task: Optional[asyncio.Task] = None
+        self.searches = 0
+        self.fallbacks = 0
+        self.merges = 0
+        self.build_seconds: Optional[float] = None
+
+    def start(self):
+        # Builds in a thread so the worker serves requests meanwhile; searches use LIKE queries until it is ready
+        if GUEST_SEARCH_INDEX and self.snapshot is None and self._build_task is None:
+            self._build_task = asyncio.create_task(self._build())
+
+    async def _build(self):
+        started = time.perf_counter()
+        try:
+            self.snapshot, self.since = await asyncio.to_thread(self._load)
+            self.build_seconds = round(time.perf_counter() - started, 3)
+            self._next_refresh = 0.0
+        except Exception as exc:
+            logger.warning("Building the guest search index failed, next search retries: %s", exc)
+        finally:
+            self._build_task = None
+
+    @staticmethod
+    def _load() -> Tuple[Snapshot, datetime]:
+        # Rows stamped within the settle window may still be committing; the first refresh reads them again
+        since = datetime.utcnow() - settle_window()
+        with SessionLocal() as db:
+            rows = db.execute(select(*SEARCH_COLUMNS).execution_options(yield_per=10000))
+            return Snapshot.build(rows), since
+
+    def upsert(self, guest_id: int, first_name: str, last_name: str, email: str, phone: str, id_number: str):
+        self.changed[guest_id] = guest_keys(first_name, last_name, email, phone, id_number)
+        self.removed.discard(guest_id)
+        self._changes_made()
+
+    def remove(self, guest_id: int):
+        self.changed.pop(guest_id, None)
+        self.removed.add(guest_id)
+        self._changes_made()
+
+    def expire(self):
+        # After writes that bypass upsert (imports), refresh on the next search instead of within the interval
+        self._next_refresh = 0.0
+
+    def _changes_made(self):
+        self._stale = None
+        pending = len(self.changed) + len(self.removed)
+        if self.snapshot is not None and self._merge_task is None and pending >= GUEST_SEARCH_MERGE_ROWS:
+            self._merge_task = asyncio.create_task(self._merge())
+
+    async def _merge(self):
+        changed, removed = dict(self.changed), set(self.removed)
+        try:
+            snapshot = await asyncio.to_thread(self.snapshot.merged, changed, removed)
+        except Exception as exc:
+            logger.warning("Merging guest search changes failed: %s", exc)
+            self._merge_task = None
+            return
+        # No await from here on: searches see either the old arrays with every change or the new ones with
+        # the changes made during the merge
+        self.snapshot = snapshot
+        for guest_id, keys in changed.items():
+            if self.changed.get(guest_id) is keys:
+                del self.changed[guest_id]
+        self.removed -= removed
+        self._stale = None
+        self.merges += 1
+        self._merge_task = None
+
+    async def refresh(self, db: AsyncSession):
+        if self.since is None or time.monotonic() < self._next_refresh:
+            return
+        self._next_refresh = time.monotonic() + GUEST_SEARCH_REFRESH_SECONDS
+        started = datetime.utcnow()
+        since = self.since
+        # Both probe an index (ix_guests_updated_at, ix_tombstones_resource_deleted_at) and usually find a few rows
+        rows = (await db.execute(select(*SEARCH_COLUMNS).where(Guest.updated_at >= since))).all()
+        deleted = (await db.execute(
+            select(Tombstone.row_id).where(Tombstone.resource == Guest.__tablename__, Tombstone.deleted_at >= since)
+        )).scalars().all()
+        for row in rows:
+            self.upsert(*row)
+        for guest_id in deleted:
+            self.remove(guest_id)
+        self.since = max(since, started - settle_window())
+
+    async def search(self, db: AsyncSession, q: str, limit: int) -> Optional[List[int]]:
+        # Guest ids, best match first; None when the index is off or not built yet
+        terms = query_terms(q)
+        if not terms:
+            return []
+        if self.snapshot is None:
+            self.start()
+            self.fallbacks += 1
+            return None
+        await self.refresh(db)
+        self.searches += 1
+        return self.rank(terms, limit)
+
+    def rank(self, terms: List[bytes], limit: int) -> List[int]:
+        # Every term must match some key of the guest; the score adds each term's best match
+        found: Optional[Tuple[np.ndarray, np.ndarray]] = None
+        for term in terms:
+            ids, scores = _best_per_guest(*self._match(term))
+            if found is None:
+                found = ids, scores
+            else:
+                common, left, right = np.intersect1d(found[0], ids, assume_unique=True, return_indices=True)
+                found = common, found[1][left] + scores[right]
+            if len(found[0]) == 0:
+                return []
+
+        ids, scores = found
+        # Higher score first, then the older guest record
+        rank = scores * (1 << 32) - ids
+        if len(rank) > limit:
+            top = np.argpartition(-rank, limit - 1)[:limit]
+            ids, rank = ids[top], rank[top]
+        return ids[np.argsort(-rank)].tolist()
+
+    def _match(self, term: bytes) -> Tuple[np.ndarray, np.ndarray]:
+        ids, scores = self.snapshot.match(term)
+        if self.changed or self.removed:
+            if self._stale is None:
+                self._stale = np.fromiter(chain(self.changed, self.removed), dtype=np.int64)
+            current = ~np.isin(ids, self._stale)
+            ids, scores = ids[current], scores[current]
+            hits = [
+                (guest_id, (EXACT_WEIGHTS if key == term else PREFIX_WEIGHTS)[field])
+                for guest_id, keys in self.changed.items() for key, field in keys if key.startswith(term)
+            ]
+            if hits:
+                ids = np.concatenate((ids, np.array([guest_id for guest_id, _ in hits], dtype=ids.dtype)))
+                scores = np.concatenate((scores, np.array([score for _, score in hits], dtype=scores.dtype)))
+        return ids, scores
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot = self.snapshot
+        return {
+            "enabled": GUEST_SEARCH_INDEX,
+            "ready": snapshot is not None,
+            "building": self._build_task is not None,
+            "entries": len(snapshot.keys) if snapshot is not None else 0,
+            "memory_bytes": snapshot.nbytes if snapshot is not None else 0,
+            "pending_changes": len(self.changed) + len(self.removed),
+            "build_seconds": self.build_seconds,
+            "searches": self.searches,
+            "fallbacks": self.fallbacks,
+            "merges": self.merges,
+        }
+
+def fallback_query(q: str, limit: int):
+    # Unranked prefix matches straight from the table, for when the index is off or still building
+    stmt = select(Guest.id)
+    for word in q.split():
+        pattern = word.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        stmt = stmt.where(or_(*(column.like(pattern, escape="\\") for column in SEARCH_COLUMNS[1:])))
+    return stmt.order_by(Guest.id).limit(limit)
+
+guest_index = GuestIndex()
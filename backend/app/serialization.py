@@ -0,0 +1,35 @@
+from fastapi import Response
+from pydantic import BaseModel
+from sqlalchemy import select
+from typing import Any, Dict, Optional, Sequence, Type, Union
+import orjson
+
+class Projection:
+    # Selects exactly the fields of a response model as plain columns and encodes the rows straight to JSON.
+    # Row tuples skip ORM entity construction and the identity map; orjson writes enums (by value), datetimes
+    # and None natively, so no per-row model is built and FastAPI does not validate the result again. The
+    # response model only chooses the columns and documents the schema.
+    def __init__(self, model, response_model: Type[BaseModel]):
+        self.model = model
+        self.names = tuple(response_model.model_fields)
+        self.columns = [getattr(model, name) for name in self.names]
+
+    def select(self):
+        return select(*self.columns)
+
+    def items(self, rows: Sequence) -> list:
+        # zip stops at the response fields, ignoring a sort column paginate may have appended
+        names = self.names
+        return [dict(zip(names, row)) for row in rows]
+
+    def array(self, rows: Sequence) -> bytes:
+        return orjson.dumps(self.items(rows))
+
+    def page(self, rows: Sequence, next_cursor: Optional[str], limit: int, **extra: Any) -> bytes:
+        return orjson.dumps({"items": self.items(rows), **extra, "next_cursor": next_cursor, "limit": limit})
+
+def encode(body: Union[BaseModel, bytes]) -> bytes:
+    return body if isinstance(body, bytes) else body.model_dump_json().encode()
+
+def json_response(body: Union[BaseModel, bytes], headers: Optional[Dict[str, str]] = None) -> Response:
+    return Response(content=encode(body), media_type="application/json", headers=headers)
@@ -0,0 +1,72 @@
+# Measures in-process event fan-out to many subscribers and shows what happens to a client that cannot keep up.
+#
+#   cd backend && python -m benchmarks.event_fanout --subscribers 500 --events 2000 --rate 200 --slow 5
+#
+# Fast subscribers drain their queues as events arrive; slow ones take --slow-delay per event. Publishers are
+# never blocked by them: a slow subscriber's backlog is dropped for a single resync message once it exceeds
+# EVENTS_QUEUE_SIZE, and the client reloads with updated_since.
+import argparse
+import asyncio
+import statistics
+import time
+
+from app.events import EVENTS_QUEUE_SIZE, RESYNC, EventBus
+
+async def consume(subscriber, delay: float, received: list, resyncs: list, stop: asyncio.Event):
+    while not stop.is_set() or not subscriber.queue.empty():
+        try:
+            message = await asyncio.wait_for(subscriber.queue.get(), 0.1)
+        except asyncio.TimeoutError:
+            continue
+        if message == RESYNC:
+            resyncs.append(1)
+        else:
+            received.append(1)
+        if delay:
+            await asyncio.sleep(delay)
+
+async def run(args):
+    bus = EventBus()
+    stop = asyncio.Event()
+    fast_received, fast_resyncs, slow_received, slow_resyncs = [], [], [], []
+    consumers = []
+    for index in range(args.subscribers):
+        slow = index < args.slow
+        subscriber = bus.subscribe({"rooms", "tasks"})
+        consumers.append(asyncio.create_task(consume(
+            subscriber, args.slow_delay if slow else 0, slow_received if slow else fast_received,
+            slow_resyncs if slow else fast_resyncs, stop
+        )))
+
+    publish_times = []
+    started = time.perf_counter()
+    for event in range(args.events):
+        before = time.perf_counter()
+        await bus.publish("rooms", "updated", event, {"id": event, "status": "cleaning"})
+        publish_times.append((time.perf_counter() - before) * 1e6)
+        # Writes arrive spread out over time, as requests would
+        await asyncio.sleep(1 / args.rate)
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await asyncio.gather(*consumers)
+
+    fast = args.subscribers - args.slow
+    print(f"{args.events} events at up to {args.rate:.0f}/s to {args.subscribers} subscribers (queue size {EVENTS_QUEUE_SIZE}) in {elapsed:.2f}s")
+    print(f"  publish: median {statistics.median(publish_times):.0f} us, max {max(publish_times):.0f} us "
+          f"({statistics.median(publish_times) / args.subscribers:.2f} us per subscriber)")
+    print(f"  fast subscribers: {len(fast_received) / max(fast, 1):.0f} events each, {len(fast_resyncs)} resyncs")
+    if args.slow:
+        print(f"  slow subscribers: {len(slow_received) / args.slow:.0f} events each, {len(slow_resyncs) / args.slow:.0f} resyncs each")
+    print(f"  bus: {bus.stats()}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure event fan-out and slow-subscriber handling")
+    parser.add_argument("--subscribers", type=int, default=500)
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--rate", type=float, default=200, help="events published per second")
+    parser.add_argument("--slow", type=int, default=5, help="subscribers that consume slowly")
+    parser.add_argument("--slow-delay", type=float, default=0.01, help="seconds a slow subscriber spends per event")
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
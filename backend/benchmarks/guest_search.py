@@ -0,0 +1,134 @@
+# Builds the guest search index over synthetic guests and times ranked top-k queries against it.
+#
+#   cd backend && python -m benchmarks.guest_search --guests 1000000 --repeat 200
+#
+# Reports build time and memory, the latency of typical front-desk queries (surname prefix, full name, email,
+# phone, id number, a one-letter prefix), and the cost of merging a batch of changed guests into the arrays.
+# With --endpoint N it also seeds N guests into a throwaway SQLite database and times GET /api/guests/search
+# end to end, against the LIKE query used while the index is unavailable.
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/guest_search.db"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+
+from app.search import GuestIndex, Snapshot, guest_keys, query_terms
+
+FIRST_NAMES = ["James", "Mary", "John", "Patricia", "Robert", "Jennifer", "Michael", "Linda", "William", "Elizabeth",
+               "David", "Barbara", "Richard", "Susan", "José", "María", "Wei", "Aiko", "Olu", "Ingrid", "Mary-Jane", "Jean-Luc"]
+LAST_NAMES = ["Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez", "Martinez",
+              "Hernández", "Lopez", "Gonzalez", "Wilson", "Anderson", "Thomas", "O'Brien", "van Dyke", "Nakamura", "Okafor"]
+
+def synthetic(count: int):
+    random.seed(5)
+    for guest_id in range(1, count + 1):
+        first, last = random.choice(FIRST_NAMES), random.choice(LAST_NAMES)
+        # A long tail of surnames, as in a real guest book
+        if random.random() < 0.8:
+            last = f"{last}{random.choice('aeiouy')}{random.randint(1, 9999)}" if random.random() < 0.5 else last + random.choice(["son", "ez", "ski", "ini", "ová"])
+        yield (
+            guest_id, first, last, f"{first.lower()}.{guest_id}@example.com",
+            f"+{random.randint(1, 99)} {random.randint(200, 999)} {random.randint(1000000, 9999999)}", f"ID{guest_id:09d}",
+        )
+
+def percentile(samples, share: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * share))]
+
+def bench_index(args):
+    started = time.perf_counter()
+    index = GuestIndex()
+    index.snapshot = Snapshot.build(synthetic(args.guests))
+    build = time.perf_counter() - started
+    snapshot = index.snapshot
+    print(f"{args.guests:,} guests: {len(snapshot.keys):,} keys, {snapshot.nbytes / 2 ** 20:.0f} MB, built in {build:.1f} s")
+
+    middle = args.guests // 2
+    queries = ["smi", "smith", "john smi", "jose hern", "mary-jane", "james.12", "+44 20", f"ID{middle:09d}", "a"]
+    print(f"top {args.limit}, {args.repeat} runs per query (milliseconds):")
+    for q in queries:
+        terms = query_terms(q)
+        samples, found = [], []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            found = index.rank(terms, args.limit)
+            samples.append((time.perf_counter() - started) * 1000)
+        print(f"  {q!r:>22}: median {statistics.median(samples):6.2f}, p99 {percentile(samples, 0.99):6.2f}, {len(found)} results")
+
+    # A day of front-desk edits, merged into the sorted arrays off the event loop
+    random.seed(6)
+    index.changed = {
+        guest_id: guest_keys("Changed", f"Guest{guest_id}", f"changed.{guest_id}@example.com", "+1 555 0100", f"CH{guest_id}")
+        for guest_id in random.sample(range(1, args.guests + 1), args.changes)
+    }
+    samples = []
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        index._match(query_terms("smith")[0])
+        samples.append((time.perf_counter() - started) * 1000)
+    print(f"  'smith' with {args.changes} unmerged changes: median {statistics.median(samples):.2f} ms")
+    started = time.perf_counter()
+    index.snapshot = snapshot.merged(index.changed, set())
+    print(f"merging {args.changes} changed guests: {(time.perf_counter() - started) * 1000:.0f} ms")
+
+async def bench_endpoint(count: int, repeat: int):
+    import httpx
+    from sqlalchemy import insert
+
+    from app.main import app
+    from app.auth import create_access_token
+    from app.database import get_sync_engine
+    from app.models import Base, Guest, User, UserRole
+    from app.search import guest_index
+
+    Base.metadata.create_all(bind=get_sync_engine())
+    with get_sync_engine().begin() as conn:
+        conn.execute(insert(User), [{"email": "bench@hotel.com", "hashed_password": "-", "first_name": "B", "last_name": "U", "role": UserRole.ADMIN, "is_active": True}])
+        conn.execute(insert(Guest), [
+            {"first_name": first, "last_name": last, "email": email, "phone": phone, "id_number": id_number}
+            for _, first, last, email, phone, id_number in synthetic(count)
+        ])
+
+    headers = {"Authorization": "Bearer " + create_access_token({"sub": "bench@hotel.com"})}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        async def timed(q: str):
+            samples = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                response = await client.get("/api/guests/search", params={"q": q}, headers=headers)
+                samples.append((time.perf_counter() - started) * 1000)
+            return statistics.median(samples), len(response.json())
+
+        print(f"\nGET /api/guests/search over {count:,} guests in SQLite (median ms, whole request):")
+        like = {q: await timed(q) for q in ("smith", "john smi", "+44 20")}
+        guest_index.start()
+        while guest_index.snapshot is None:
+            await asyncio.sleep(0.05)
+        for q, (fallback_ms, fallback_found) in like.items():
+            index_ms, found = await timed(q)
+            print(f"  {q!r:>12}: index {index_ms:6.2f} ({found} results), LIKE fallback {fallback_ms:6.2f} ({fallback_found} results)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the guest search index")
+    parser.add_argument("--guests", type=int, default=1000000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--changes", type=int, default=1000, help="changed guests to merge")
+    parser.add_argument("--endpoint", type=int, default=0, help="also time the endpoint over this many guests in SQLite")
+    args = parser.parse_args()
+
+    bench_index(args)
+    if args.endpoint:
+        asyncio.run(bench_endpoint(args.endpoint, max(1, args.repeat // 10)))
+    sys.stdout.flush()
+    # aiosqlite worker threads are not daemonic; skip waiting on them at exit
+    os._exit(0)
+
+if __name__ == "__main__":
+    main()
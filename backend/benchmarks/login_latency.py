@@ -0,0 +1,85 @@
+# Measures latency of an unrelated endpoint while a burst of logins is in flight.
+#
+#   cd backend && python -m benchmarks.login_latency --logins 40
+#
+# Runs the app in-process against a throwaway SQLite database (needs httpx and aiosqlite).
+# Each run is repeated with PASSWORD_HASH_WORKERS=0 (bcrypt on the event loop) for comparison.
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+import httpx
+
+from app.main import app
+from app.auth import get_password_hash, password_hasher
+from app.database import SessionLocal, get_sync_engine
+from app.models import Base, User, UserRole
+
+def seed(users: int):
+    Base.metadata.create_all(bind=get_sync_engine())
+    hashed = get_password_hash("password")
+    with SessionLocal() as db:
+        db.query(User).delete()
+        db.add_all([
+            User(email=f"staff{i}@hotel.com", hashed_password=hashed, first_name="Staff", last_name=str(i), role=UserRole.RECEPTIONIST)
+            for i in range(users)
+        ])
+        db.commit()
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+async def run(logins: int):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def login(i):
+            response = await client.post("/api/auth/login", data={"username": f"staff{i}@hotel.com", "password": "password"})
+            return response.status_code
+
+        async def probe(done: asyncio.Event):
+            latencies = []
+            while not done.is_set():
+                started = time.perf_counter()
+                await client.get("/api/health")
+                latencies.append((time.perf_counter() - started) * 1000)
+                await asyncio.sleep(0.001)
+            return latencies
+
+        done = asyncio.Event()
+        probing = asyncio.create_task(probe(done))
+        started = time.perf_counter()
+        statuses = await asyncio.gather(*(login(i) for i in range(logins)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        latencies = await probing
+
+    return {
+        "elapsed_s": round(elapsed, 2),
+        "probes": len(latencies),
+        "logins_ok": sum(1 for code in statuses if code == 200),
+        "logins_rejected": sum(1 for code in statuses if code == 503),
+        "health_p50_ms": round(statistics.median(latencies), 2),
+        "health_p99_ms": round(percentile(latencies, 99), 2),
+        "health_max_ms": round(max(latencies), 2),
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=40)
+    parser.add_argument("--workers", type=int, default=password_hasher.workers)
+    args = parser.parse_args()
+
+    seed(args.logins)
+    for label, workers in (("event loop", 0), (f"{password_hasher.executor_kind} pool x{args.workers}", args.workers)):
+        password_hasher.shutdown()
+        password_hasher.workers = workers
+        print(f"{label:>20}: {asyncio.run(run(args.logins))}")
+
+if __name__ == "__main__":
+    main()
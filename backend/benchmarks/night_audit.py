@@ -0,0 +1,142 @@
+# Times the night audit over a synthetic portfolio in a throwaway SQLite database.
+#
+#   cd backend && python -m benchmarks.night_audit --rooms 50000 --chunk-size 1000
+#
+# Every room has one in-house stay to charge; some of them ended on the audited date (departures), and some
+# rooms also have a confirmed arrival that never showed up. "chunked": night_audit.run, keyset chunks with
+# bulk updates and inserts. "per row": the same transitions done on ORM objects one booking at a time, as a
+# straightforward loop would, on an identical copy of the data. Then an audit is interrupted halfway and
+# resumed, and a finished date is audited again, which must change nothing.
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+directory = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{directory}/night_audit.db"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+os.environ["NIGHT_AUDIT_NO_SHOWS"] = "true"
+
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.orm import Session
+
+from app import night_audit
+from app.database import SessionLocal, get_sync_engine
+from app.models import (
+    Base, Booking, BookingStatus, Guest, Priority, Room, RoomStatus, RoomType, Task, TaskStatus, TaskType, User, UserRole,
+)
+
+def seed(rooms: int, business_date):
+    random.seed(11)
+    engine = get_sync_engine()
+    Base.metadata.create_all(bind=engine)
+    midnight = datetime.combine(business_date, datetime.min.time())
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{"email": "bench@hotel.com", "hashed_password": "-", "first_name": "B", "last_name": "U", "role": UserRole.ADMIN, "is_active": True}])
+        conn.execute(insert(Guest), [
+            {"first_name": "G", "last_name": str(n), "email": f"g{n}@example.com", "phone": "1", "id_number": f"ID{n}"}
+            for n in range(1, rooms + 1)
+        ])
+        conn.execute(insert(Room), [
+            {"room_number": str(n), "room_type": RoomType.STANDARD, "status": RoomStatus.OCCUPIED, "price_per_night": 100.0, "floor": n // 100}
+            for n in range(1, rooms + 1)
+        ])
+        bookings = []
+        for n in range(1, rooms + 1):
+            arrived = midnight - timedelta(days=random.randint(0, 6)) + timedelta(hours=15)
+            # About one stay in eight ends on the audited date
+            nights = (business_date - arrived.date()).days + (0 if random.random() < 0.125 else random.randint(1, 5))
+            leaves = datetime.combine(arrived.date() + timedelta(days=max(1, nights)), datetime.min.time()) + timedelta(hours=11)
+            bookings.append({
+                "guest_id": n, "room_id": n, "check_in_date": arrived, "check_out_date": leaves, "status": BookingStatus.CHECKED_IN,
+                "total_amount": 100.0 * max(1, nights), "created_by": 1,
+            })
+            if random.random() < 0.03:
+                bookings.append({
+                    "guest_id": n, "room_id": n, "check_in_date": midnight + timedelta(hours=15), "check_out_date": leaves + timedelta(days=3),
+                    "status": BookingStatus.CONFIRMED, "total_amount": 300.0, "created_by": 1,
+                })
+        conn.execute(insert(Booking), bookings)
+    return len(bookings)
+
+def per_row(db: Session, business_date):
+    # One booking at a time through the ORM; no resumability, one transaction
+    close = datetime.combine(business_date + timedelta(days=1), datetime.min.time())
+    for booking in db.execute(select(Booking).where(Booking.status == BookingStatus.CONFIRMED, Booking.check_in_date < close)).scalars():
+        booking.status = BookingStatus.CANCELLED
+    for booking in db.execute(select(Booking).where(Booking.status == BookingStatus.CHECKED_IN, Booking.check_out_date < close)).scalars():
+        booking.status = BookingStatus.CHECKED_OUT
+        booking.charged_amount = booking.total_amount
+        booking.room.status = RoomStatus.CLEANING
+        open_task = db.execute(select(Task.id).where(Task.room_id == booking.room_id, Task.task_type == TaskType.CLEANING, Task.status != TaskStatus.COMPLETED)).first()
+        if open_task is None:
+            db.add(Task(room_id=booking.room_id, title=f"Departure cleaning, room {booking.room.room_number}", task_type=TaskType.CLEANING, priority=Priority.HIGH))
+        db.flush()
+    for booking in db.execute(select(Booking).where(Booking.status == BookingStatus.CHECKED_IN, Booking.check_in_date < close)).scalars():
+        nights = max(1, (booking.check_out_date.date() - booking.check_in_date.date()).days)
+        booking.charged_amount = round(booking.total_amount * min(nights, (business_date - booking.check_in_date.date()).days + 1) / nights, 2)
+    db.commit()
+
+def state(db: Session):
+    return (
+        db.execute(select(Booking.status, func.count(), func.round(func.sum(Booking.charged_amount), 2)).group_by(Booking.status).order_by(Booking.status)).all(),
+        db.execute(select(func.count(Task.id))).scalar(),
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the night audit")
+    parser.add_argument("--rooms", type=int, default=50000)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    business_date = datetime.utcnow().date() - timedelta(days=1)
+    started = time.perf_counter()
+    count = seed(args.rooms, business_date)
+    print(f"{args.rooms:,} rooms, {count:,} bookings seeded in {time.perf_counter() - started:.1f} s")
+    get_sync_engine().dispose()
+    pristine = os.path.join(directory, "pristine.db")
+    shutil.copy(os.path.join(directory, "night_audit.db"), pristine)
+
+    with SessionLocal() as db:
+        started = time.perf_counter()
+        result = night_audit.run(db, business_date, args.chunk_size)
+        chunked = time.perf_counter() - started
+        audited = state(db)
+    print(f"chunked: {chunked:6.2f} s, {result}")
+
+    baseline = shutil.copy(pristine, os.path.join(directory, "per_row.db"))
+    with Session(create_engine(f"sqlite:///{baseline}")) as db:
+        started = time.perf_counter()
+        per_row(db, business_date)
+        slow = time.perf_counter() - started
+        print(f"per row: {slow:6.2f} s, x{slow / chunked:.1f}, same result: {state(db) == audited}")
+
+    # Interrupt the next day's audit after a few chunks of charges, then resume it
+    following = business_date + timedelta(days=1)
+    charges, calls = night_audit._charges, []
+    def crash(*stage_args):
+        calls.append(1)
+        if len(calls) > 2:
+            raise KeyboardInterrupt
+        return charges(*stage_args)
+    night_audit.STAGE_QUERIES["charges"] = (*night_audit.STAGE_QUERIES["charges"][:2], crash)
+    with SessionLocal() as db:
+        try:
+            night_audit.run(db, following, args.chunk_size)
+        except KeyboardInterrupt:
+            db.rollback()
+    night_audit.STAGE_QUERIES["charges"] = (*night_audit.STAGE_QUERIES["charges"][:2], charges)
+    with SessionLocal() as db:
+        started = time.perf_counter()
+        result = night_audit.run(db, following, args.chunk_size)
+        print(f"resumed after 2 chunks: {time.perf_counter() - started:6.2f} s, {result}")
+
+        started = time.perf_counter()
+        result = night_audit.run(db, business_date, args.chunk_size, rerun=True)
+        print(f"rerun of a finished date: {time.perf_counter() - started:6.2f} s, {result}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+# Drives list requests through a deliberately small connection pool, then holds every connection to show
+# what saturation looks like: requests wait up to DB_POOL_TIMEOUT, are shed with 503 + Retry-After, and
+# the service recovers as soon as connections are released.
+#
+#   cd backend && python -m benchmarks.pool_saturation --pool-size 4 --max-overflow 2 --pool-timeout 1
+#
+# Runs the app in-process against a throwaway SQLite database (needs httpx and aiosqlite).
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+def configure_pool():
+    # Pool settings are read when app.database is imported, so parse them first
+    parser = argparse.ArgumentParser(description="Show request behavior when the connection pool is saturated")
+    parser.add_argument("--pool-size", type=int, default=4)
+    parser.add_argument("--max-overflow", type=int, default=2)
+    parser.add_argument("--pool-timeout", type=float, default=1.0)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--hold", type=float, default=3.0, help="seconds every connection is held in the saturated phase")
+    args = parser.parse_args()
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+    os.environ["DB_POOL_SIZE"] = str(args.pool_size)
+    os.environ["DB_POOL_MAX_OVERFLOW"] = str(args.max_overflow)
+    os.environ["DB_POOL_TIMEOUT"] = str(args.pool_timeout)
+    return args
+
+ARGS = configure_pool() if __name__ == "__main__" else None
+
+import httpx
+from sqlalchemy import text
+
+from app.main import app
+from app.auth import create_access_token, get_password_hash
+from app.database import SessionLocal, get_engine, get_sync_engine, pool_status
+from app.metrics import POOL_WAIT
+from app.models import Base, Room, RoomType, User, UserRole
+
+def seed(rooms: int = 200):
+    Base.metadata.create_all(bind=get_sync_engine())
+    with SessionLocal() as db:
+        db.query(Room).delete()
+        db.query(User).delete()
+        db.add(User(email="bench@hotel.com", hashed_password=get_password_hash("password"), first_name="Bench", last_name="User", role=UserRole.ADMIN))
+        db.add_all([
+            Room(room_number=str(100 + i), room_type=RoomType.STANDARD, price_per_night=100, floor=1 + i // 50)
+            for i in range(rooms)
+        ])
+        db.commit()
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def pool_wait_count() -> int:
+    return sum(int(sum(series[:-1])) for series in POOL_WAIT._series.values())
+
+async def drive(client: httpx.AsyncClient, headers: dict, concurrency: int, total: int):
+    results = []
+    queue = iter(range(total))
+
+    async def worker():
+        for _ in queue:
+            started = time.perf_counter()
+            response = await client.get("/api/rooms/?limit=50", headers=headers)
+            results.append((response.status_code, (time.perf_counter() - started) * 1000, response.headers.get("retry-after")))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return results, time.perf_counter() - started
+
+def summarize(label: str, results, elapsed: float):
+    latencies = [latency for _, latency, _ in results]
+    ok = sum(1 for code, _, _ in results if code == 200)
+    shed = [retry for code, _, retry in results if code == 503]
+    pool = pool_status()[0]
+    print(
+        f"{label:>10}: {len(results)} requests in {elapsed:.2f}s ({len(results) / elapsed:.0f} req/s), "
+        f"ok {ok}, 503 {len(shed)} (Retry-After {shed[0] if shed else '-'}), "
+        f"p50 {statistics.median(latencies):.1f} ms, p99 {percentile(latencies, 99):.1f} ms, max {max(latencies):.1f} ms, "
+        f"pool timeouts so far {pool['timeouts']}"
+    )
+
+async def hold_connections(count: int, seconds: float, ready: asyncio.Event):
+    # Stands in for slow queries or long transactions that keep every pooled connection busy
+    held = 0
+
+    async def hold():
+        nonlocal held
+        async with get_engine().connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            held += 1
+            if held == count:
+                ready.set()
+            await asyncio.sleep(seconds)
+
+    await asyncio.gather(*(hold() for _ in range(count)))
+
+async def run(args):
+    headers = {"Authorization": "Bearer " + create_access_token({"sub": "bench@hotel.com"})}
+    capacity = args.pool_size + args.max_overflow
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        summarize("warm", *await drive(client, headers, args.concurrency, args.requests))
+
+        ready = asyncio.Event()
+        holders = asyncio.create_task(hold_connections(capacity, args.hold, ready))
+        await ready.wait()
+        print(f"\nholding all {capacity} connections for {args.hold}s: {pool_status()[0]}")
+        summarize("saturated", *await drive(client, headers, args.concurrency, args.concurrency * 2))
+        await holders
+
+        print(f"\nreleased: {pool_status()[0]}")
+        summarize("recovered", *await drive(client, headers, args.concurrency, args.requests))
+        print(f"\npool checkouts observed: {pool_wait_count()}")
+
+def main(args):
+    seed()
+    asyncio.run(run(args))
+    # aiosqlite worker threads are not daemonic; skip waiting on them at exit
+    sys.stdout.flush()
+    os._exit(0)
+
+if __name__ == "__main__":
+    main(ARGS)
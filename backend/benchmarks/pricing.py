@@ -0,0 +1,74 @@
+# Times batch quotes from the precomputed rate calendar against pricing the same stays night by night.
+#
+#   cd backend && python -m benchmarks.pricing --rooms 2000 --repeat 20
+#
+# "per night": for every room and night, work out the weekend and season multipliers from the rules (what
+# a straightforward pricing loop does). "calendar": pricing.quote, two gathers from the running sums per
+# room type and a handful of array operations for all rooms at once. The totals may differ by a cent where
+# the two sums round a half cent differently; quotes and bookings both use the calendar, so they always agree.
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from app.models import RoomType
+from app.pricing import RateCalendar, pricing_settings, quote, stay_discount, stay_nights
+
+def per_night(room_types, prices, check_in: datetime, check_out: datetime, guests: int):
+    settings = pricing_settings
+    nights = stay_nights(check_in, check_out)
+    totals = []
+    for room_type, price in zip(room_types, prices):
+        total = 0.0
+        for night in range(nights):
+            day = check_in.date() + timedelta(days=night)
+            rate = settings.weekend_multiplier.get(room_type, 1.0) if day.weekday() in settings.weekend_days else 1.0
+            month_day = day.month * 100 + day.day
+            for season in settings.seasons:
+                if season.room_types and room_type not in season.room_types:
+                    continue
+                start = sum(int(part) * scale for part, scale in zip(season.start.split("-"), (100, 1)))
+                end = sum(int(part) * scale for part, scale in zip(season.end.split("-"), (100, 1)))
+                inside = start <= month_day <= end if start <= end else (month_day >= start or month_day <= end)
+                if inside:
+                    rate *= season.multiplier
+            total += price * rate
+        extra = max(0, guests - settings.included_guests.get(room_type, 1))
+        totals.append(round(total * (1 + extra * settings.extra_guest_rate) * (1 - stay_discount(nights)), 2))
+    return totals
+
+def timed(run, repeat: int):
+    samples, result = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = run()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), result
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare calendar quotes with night-by-night pricing")
+    parser.add_argument("--rooms", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    random.seed(3)
+    room_types = [random.choice(list(RoomType)) for _ in range(args.rooms)]
+    prices = [float(random.randint(80, 900)) for _ in range(args.rooms)]
+
+    origin = datetime.utcnow().date().replace(month=1, day=1)
+    started = time.perf_counter()
+    RateCalendar(pricing_settings, origin, 365 * (2 * pricing_settings.calendar_years + 1))
+    print(f"calendar for {2 * pricing_settings.calendar_years + 1} years of nights: built in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    print(f"{args.rooms} rooms per quote, median of {args.repeat} runs")
+    check_in = datetime.combine(origin + timedelta(days=160), datetime.min.time()).replace(hour=15)
+    for nights in (1, 3, 7, 14, 28, 90):
+        check_out = check_in + timedelta(days=nights)
+        loop_ms, expected = timed(lambda: per_night(room_types, prices, check_in, check_out, 3), max(1, args.repeat // 5))
+        calendar_ms, quotes = timed(lambda: quote(room_types, prices, check_in, check_out, 3), args.repeat)
+        difference = max(abs(total - reference) for total, reference in zip(quotes.totals.tolist(), expected))
+        print(f"  {nights:>3} nights: per night {loop_ms:8.1f} ms, calendar {calendar_ms:6.2f} ms, x{loop_ms / calendar_ms:,.0f}, largest difference {difference:.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+# Shows the query plan and timing of the hot read paths so index coverage can be checked after a migration.
+#
+#   cd backend && python -m benchmarks.query_plans --rooms 2000 --bookings 100000 --tasks 50000
+#   cd backend && DATABASE_URL=mysql+pymysql://... python -m benchmarks.query_plans --no-seed
+#
+# By default a throwaway SQLite database is migrated to head and seeded (EXPLAIN QUERY PLAN stands in
+# for MySQL's EXPLAIN). With --no-seed the plans are taken against DATABASE_URL as it is.
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+# Only a throwaway database is ever seeded
+THROWAWAY = "DATABASE_URL" not in os.environ
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/plans.db")
+
+from alembic import command
+from sqlalchemy import create_engine, event, func, insert, select, text
+
+from app.availability import available_rooms_query, overlapping
+from app.database import DATABASE_URL
+from app.schema import alembic_config
+from app.models import (
+    Booking, BookingStatus, DailyStat, Guest, Priority, Room, RoomStatus, RoomType, Task, TaskStatus, TaskType, User, UserRole
+)
+
+BATCH = 5000
+ORIGIN = datetime(2025, 1, 1, 14)
+
+def explain_prefix(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and context.execution_options.get("explain"):
+        prefix = "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN "
+        statement = prefix + statement
+    return statement, parameters
+
+def insert_batches(conn, model, rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == BATCH:
+            conn.execute(insert(model), batch)
+            batch = []
+    if batch:
+        conn.execute(insert(model), batch)
+
+def seed(engine, rooms: int, bookings: int, tasks: int):
+    random.seed(42)
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        insert_batches(conn, User, (
+            {"email": f"staff{i}@hotel.com", "hashed_password": "-", "first_name": "Staff", "last_name": str(i),
+             "role": UserRole.HOUSEKEEPING if i else UserRole.ADMIN, "is_active": True, "created_at": now}
+            for i in range(50)
+        ))
+        insert_batches(conn, Room, (
+            {"room_number": f"{i // 100 + 1}{i % 100:03d}", "room_type": random.choice(list(RoomType)),
+             "status": random.choices(list(RoomStatus), weights=(70, 20, 7, 3))[0], "price_per_night": random.randint(80, 600),
+             "floor": i // 100 + 1, "created_at": now}
+            for i in range(rooms)
+        ))
+        guests = max(1, bookings // 3)
+        insert_batches(conn, Guest, (
+            {"first_name": "Guest", "last_name": str(i), "email": f"guest{i}@example.com", "phone": "555",
+             "id_number": f"ID{i}", "vip_status": False, "created_at": now}
+            for i in range(guests)
+        ))
+        # Non-overlapping stays per room spread over two years, so availability has real work to do
+        next_free = [ORIGIN] * rooms
+        def booking_rows():
+            for i in range(bookings):
+                room = random.randrange(rooms)
+                check_in = next_free[room] + timedelta(days=random.randint(0, 6))
+                check_out = check_in + timedelta(days=random.randint(1, 7))
+                next_free[room] = check_out
+                yield {"guest_id": random.randint(1, guests), "room_id": room + 1, "check_in_date": check_in,
+                       "check_out_date": check_out, "status": random.choices(list(BookingStatus), weights=(60, 10, 25, 5))[0],
+                       "total_amount": 100.0 * (check_out - check_in).days, "paid_amount": 0.0, "number_of_guests": 2,
+                       "created_by": 1, "created_at": now}
+        insert_batches(conn, Booking, booking_rows())
+        insert_batches(conn, Task, (
+            {"room_id": random.randint(1, rooms), "title": "Turn down", "task_type": random.choice(list(TaskType)),
+             "priority": random.choice(list(Priority)), "status": random.choices(list(TaskStatus), weights=(15, 5, 80))[0],
+             "assigned_to": random.randint(2, 50), "due_date": ORIGIN + timedelta(hours=random.randint(0, 17520)), "created_at": now}
+            for i in range(tasks)
+        ))
+        insert_batches(conn, DailyStat, (
+            {"stat_date": ORIGIN.date() + timedelta(days=day), "rooms_sold": random.randint(0, rooms),
+             "room_revenue": random.uniform(0, 1e6), "updated_at": now}
+            for day in range(730)
+        ))
+        if engine.dialect.name == "sqlite":
+            conn.execute(text("ANALYZE"))
+
+def hot_queries():
+    check_in = ORIGIN + timedelta(days=200)
+    check_out = check_in + timedelta(days=3)
+    return {
+        "availability": available_rooms_query(check_in, check_out),
+        "availability by type": available_rooms_query(check_in, check_out, RoomType.SUITE),
+        "booking conflict check": select(Booking.id).where(Booking.room_id == 17, overlapping(check_in, check_out)),
+        "arrivals list": (
+            select(Booking).where(Booking.status == BookingStatus.CONFIRMED, Booking.check_in_date >= check_in,
+                                  Booking.check_in_date < check_out).order_by(Booking.check_in_date, Booking.id).limit(50)
+        ),
+        "guest history": select(Booking).where(Booking.guest_id == 42).order_by(Booking.id),
+        "task board": (
+            select(Task).where(Task.status == TaskStatus.PENDING, Task.assigned_to == 7)
+            .order_by(Task.due_date, Task.id).limit(50)
+        ),
+        "tasks due": (
+            select(Task).where(Task.due_date >= check_in, Task.due_date < check_out).order_by(Task.due_date, Task.id).limit(50)
+        ),
+        "dashboard rooms by status": select(Room.status, func.count(Room.id)).group_by(Room.status),
+        "dashboard period summary": (
+            select(func.sum(DailyStat.rooms_sold), func.sum(DailyStat.room_revenue))
+            .where(DailyStat.stat_date >= date(2025, 3, 1), DailyStat.stat_date < date(2025, 4, 1))
+        ),
+    }
+
+def full_scans(dialect: str, plan) -> list:
+    # Table scans that no index serves; small lookup tables scanned on purpose are still listed
+    if dialect == "sqlite":
+        return [row[-1] for row in plan if row[-1].startswith("SCAN") and "INDEX" not in row[-1]]
+    return [f"{row._mapping['table']} (type=ALL)" for row in plan if row._mapping.get("type") == "ALL"]
+
+def main():
+    parser = argparse.ArgumentParser(description="EXPLAIN the hot read queries and time them")
+    parser.add_argument("--rooms", type=int, default=2000)
+    parser.add_argument("--bookings", type=int, default=100000)
+    parser.add_argument("--tasks", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--no-seed", action="store_true", help="use DATABASE_URL as is instead of migrating and seeding it")
+    args = parser.parse_args()
+    if not args.no_seed and not THROWAWAY:
+        parser.error("refusing to seed DATABASE_URL; pass --no-seed to explain against it as it is")
+
+    engine = create_engine(DATABASE_URL)
+    event.listen(engine, "before_cursor_execute", explain_prefix, retval=True)
+    if not args.no_seed:
+        config = alembic_config()
+        with engine.begin() as conn:
+            config.attributes["connection"] = conn
+            command.upgrade(config, "head")
+        started = time.perf_counter()
+        seed(engine, args.rooms, args.bookings, args.tasks)
+        print(f"Seeded {args.rooms} rooms, {args.bookings} bookings, {args.tasks} tasks in {time.perf_counter() - started:.1f}s")
+
+    dialect = engine.dialect.name
+    with engine.connect() as conn:
+        for name, stmt in hot_queries().items():
+            plan = conn.execute(stmt.execution_options(explain=True)).all()
+            timings = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                conn.execute(stmt).all()
+                timings.append((time.perf_counter() - started) * 1000)
+            print(f"\n== {name}: median {statistics.median(timings):.2f} ms, max {max(timings):.2f} ms")
+            for row in plan:
+                print("   ", row[-1] if dialect == "sqlite" else dict(row._mapping))
+            for scan in full_scans(dialect, plan):
+                print("    !! full scan:", scan)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+# Exercises read-replica routing with SQLite files standing in for a primary and two replicas.
+#
+#   cd backend && python -m benchmarks.replica_routing --selection round_robin --requests 40
+#
+# Each replica starts as a copy of the primary with one marker row changed, so every response shows which
+# database served it. The replicas are then taken away one by one to show the fallback to the primary.
+import argparse
+import asyncio
+import collections
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+WORKDIR = tempfile.mkdtemp()
+REPLICA_DIRS = [os.path.join(WORKDIR, f"replica{index}") for index in range(2)]
+
+parser = argparse.ArgumentParser(description="Show how reads are spread over replicas and fall back to the primary")
+parser.add_argument("--selection", choices=("round_robin", "least_connections"), default="round_robin")
+parser.add_argument("--requests", type=int, default=40)
+parser.add_argument("--concurrency", type=int, default=8)
+ARGS = parser.parse_args() if __name__ == "__main__" else parser.parse_args([])
+
+os.environ["DATABASE_URL"] = f"sqlite:///{WORKDIR}/primary.db"
+os.environ["DATABASE_REPLICA_URLS"] = ",".join(f"sqlite:///{directory}/hotel.db" for directory in REPLICA_DIRS)
+os.environ["DATABASE_REPLICA_SELECTION"] = ARGS.selection
+os.environ.pop("ASYNC_DATABASE_URL", None)
+# Every request must reach a database for the counts to show where reads went
+os.environ["RESPONSE_CACHE_ENABLED"] = "false"
+
+import httpx
+from sqlalchemy import create_engine, select, update
+
+from app.main import app
+from app.auth import create_access_token, get_password_hash
+from app.database import SessionLocal, get_replicas, get_sync_engine, read_session, replica_status, start_replica_monitor
+from app.models import Base, Room, RoomType, User, UserRole
+
+def seed():
+    Base.metadata.create_all(bind=get_sync_engine())
+    with SessionLocal() as db:
+        db.add(User(email="bench@hotel.com", hashed_password=get_password_hash("password"), first_name="Bench", last_name="User", role=UserRole.ADMIN))
+        db.add_all([Room(room_number=str(100 + i), room_type=RoomType.STANDARD, price_per_night=100, floor=1) for i in range(20)])
+        db.commit()
+        db.execute(update(Room).where(Room.id == 1).values(amenities="primary"))
+        db.commit()
+    get_sync_engine().dispose()
+    for index, directory in enumerate(REPLICA_DIRS):
+        os.makedirs(directory)
+        shutil.copy(f"{WORKDIR}/primary.db", f"{directory}/hotel.db")
+        engine = create_engine(f"sqlite:///{directory}/hotel.db")
+        with engine.begin() as conn:
+            conn.execute(update(Room).where(Room.id == 1).values(amenities=f"replica{index}"))
+        engine.dispose()
+
+async def served_by(client, headers, requests: int, concurrency: int):
+    sources = collections.Counter()
+    pending = iter(range(requests))
+
+    async def worker():
+        for _ in pending:
+            response = await client.get("/api/rooms/?limit=1&sort=id", headers=headers)
+            sources[response.json()["items"][0]["amenities"] if response.status_code == 200 else f"HTTP {response.status_code}"] += 1
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return dict(sorted(sources.items()))
+
+async def read_your_writes():
+    # One read-only session: the first SELECT goes to a replica, the flush and every later read to the primary
+    async with read_session() as db:
+        before = (await db.execute(select(Room.amenities).where(Room.id == 1))).scalar_one()
+        db.add(Room(room_number="999", room_type=RoomType.SUITE, price_per_night=500, floor=9))
+        await db.flush()
+        after = (await db.execute(select(Room.amenities).where(Room.id == 1))).scalar_one()
+        visible = (await db.execute(select(Room.id).where(Room.room_number == "999"))).scalar_one_or_none() is not None
+        await db.rollback()
+    return before, after, visible
+
+async def take_down(index: int):
+    # The directory disappears, so new connections fail; pooled ones are dropped to force reconnects
+    os.rename(REPLICA_DIRS[index], REPLICA_DIRS[index] + ".down")
+    replica = get_replicas().replicas[index]
+    await replica.engine.dispose()
+    await get_replicas().check()
+
+async def bring_back(index: int):
+    os.rename(REPLICA_DIRS[index] + ".down", REPLICA_DIRS[index])
+    await get_replicas().check()
+
+async def run(args):
+    headers = {"Authorization": "Bearer " + create_access_token({"sub": "bench@hotel.com"})}
+    monitor = await start_replica_monitor()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        started = time.perf_counter()
+        print(f"GET with both replicas up ({args.selection}):", await served_by(client, headers, args.requests, args.concurrency))
+        print(f"  {args.requests / (time.perf_counter() - started):.0f} req/s")
+
+        before, after, visible = await read_your_writes()
+        print(f"read-only session: first read from {before}, after its own write from {after}, own row visible: {visible}")
+
+        response = await client.post("/api/rooms/", headers=headers, json={"room_number": "777", "room_type": "deluxe", "price_per_night": 200, "floor": 7})
+        rows = await client.get("/api/rooms/?limit=200", headers=headers)
+        print(f"POST /api/rooms/ -> {response.status_code}; the copies do not replicate, so a later GET sees it: "
+              f"{any(room['room_number'] == '777' for room in rows.json()['items'])}")
+
+        await take_down(0)
+        print("GET with replica0 down:", await served_by(client, headers, args.requests, args.concurrency))
+        await take_down(1)
+        print("GET with both replicas down:", await served_by(client, headers, args.requests, args.concurrency))
+        await bring_back(0)
+        await bring_back(1)
+        print("GET after both came back:", await served_by(client, headers, args.requests, args.concurrency))
+    monitor.cancel()
+
+    status = replica_status()
+    print(f"\nfallbacks to primary: {status['fallbacks_to_primary']}")
+    for replica in status["replicas"]:
+        print(f"  {replica['engine']}: healthy {replica['healthy']}, reads {replica['reads']}, last error {replica['error']}")
+
+if __name__ == "__main__":
+    seed()
+    asyncio.run(run(ARGS))
+    sys.stdout.flush()
+    # aiosqlite worker threads are not daemonic; skip waiting on them at exit
+    os._exit(0)
@@ -0,0 +1,105 @@
+# Compares the two ways a list endpoint can turn rows into a response body, for 10k-row lists.
+#
+#   cd backend && python -m benchmarks.serialization --rows 10000 --repeat 5
+#
+# "orm": full entities -> a pydantic model per row -> Page -> FastAPI validating and serializing it against
+# response_model (what the list endpoints did before). "projection": only the response columns as row
+# tuples -> orjson (what they do now). Both run against the same throwaway SQLite database and the bodies
+# are checked to decode to the same JSON.
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/serialization.db"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+
+import anyio
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from app.database import get_sync_engine
+from app.models import Base, Booking, BookingStatus, Guest, Room, RoomStatus, RoomType, Task, TaskStatus, TaskType, Priority, User, UserRole
+from app.pagination import Page
+from app.routers.bookings import BookingResponse, _booking_response, BOOKING_PROJECTION
+from app.routers.rooms import RoomResponse, _room_response, ROOM_PROJECTION
+from app.routers.tasks import TaskResponse, _task_response, TASK_PROJECTION
+
+def seed(engine, rows: int):
+    random.seed(7)
+    now = datetime.utcnow()
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{"email": "bench@hotel.com", "hashed_password": "-", "first_name": "B", "last_name": "U", "role": UserRole.ADMIN}])
+        conn.execute(insert(Room), [
+            {"room_number": str(1000 + i), "room_type": random.choice(list(RoomType)), "status": random.choice(list(RoomStatus)),
+             "price_per_night": random.randint(80, 600), "floor": i // 100 + 1, "amenities": '["wifi", "minibar", "sea view"]',
+             "last_cleaned": now - timedelta(hours=i % 48)}
+            for i in range(rows)
+        ])
+        conn.execute(insert(Guest), [{"first_name": "G", "last_name": "1", "email": "g@example.com", "phone": "555", "id_number": "X1"}])
+        conn.execute(insert(Booking), [
+            {"guest_id": 1, "room_id": 1 + i % rows, "check_in_date": now + timedelta(days=i), "check_out_date": now + timedelta(days=i + 2),
+             "status": random.choice(list(BookingStatus)), "total_amount": 200.0 + i % 7, "paid_amount": 0.0, "number_of_guests": 2,
+             "special_requests": "Late arrival, please keep the room" if i % 3 == 0 else None, "created_by": 1}
+            for i in range(rows)
+        ])
+        conn.execute(insert(Task), [
+            {"room_id": 1 + i % rows, "title": "Clean room", "description": "Full turnover clean", "task_type": random.choice(list(TaskType)),
+             "priority": random.choice(list(Priority)), "status": random.choice(list(TaskStatus)), "due_date": now + timedelta(hours=i)}
+            for i in range(rows)
+        ])
+
+def orm_body(engine, model, response_model, to_response, rows: int) -> bytes:
+    field = create_response_field(name="Response", type_=Page[response_model])
+    with Session(engine) as db:
+        entities = db.execute(select(model).order_by(model.id).limit(rows)).scalars().all()
+        page = Page[response_model](items=[to_response(entity) for entity in entities], next_cursor=None, limit=rows)
+    content = anyio.run(lambda: serialize_response(field=field, response_content=page))
+    return json.dumps(content).encode()
+
+def projection_body(engine, model, projection, rows: int) -> bytes:
+    with Session(engine) as db:
+        result = db.execute(projection.select().order_by(model.id).limit(rows)).all()
+    return projection.page(result, None, rows)
+
+def timed(run, repeat: int):
+    samples, body = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = run()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples), body
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare list serialization paths")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    engine = get_sync_engine()
+    seed(engine, args.rows)
+    cases = [
+        ("rooms", Room, RoomResponse, _room_response, ROOM_PROJECTION),
+        ("bookings", Booking, BookingResponse, _booking_response, BOOKING_PROJECTION),
+        ("tasks", Task, TaskResponse, _task_response, TASK_PROJECTION),
+    ]
+    print(f"{args.rows} rows per list, median of {args.repeat} runs")
+    for name, model, response_model, to_response, projection in cases:
+        orm_seconds, orm = timed(lambda: orm_body(engine, model, response_model, to_response, args.rows), args.repeat)
+        projection_seconds, fast = timed(lambda: projection_body(engine, model, projection, args.rows), args.repeat)
+        same = json.loads(orm) == json.loads(fast)
+        print(
+            f"  {name:>9}: orm {args.rows / orm_seconds:>9,.0f} rows/s ({orm_seconds * 1000:.0f} ms), "
+            f"projection {args.rows / projection_seconds:>9,.0f} rows/s ({projection_seconds * 1000:.0f} ms), "
+            f"x{orm_seconds / projection_seconds:.1f}, identical output: {same}"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+# Production serving mode:  gunicorn -c gunicorn.conf.py app.main:app
+#
+# The app is imported once in the master (preload) and forked into uvicorn workers. Importing it opens no
+# database connections, each worker creates its own pools on its first request, and the schema is checked
+# once here rather than by every worker.
+import multiprocessing
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+# The app reads it too: per-process caches are only safe with a single worker
+os.environ["WEB_CONCURRENCY"] = str(workers)
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true"
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = 5
+# Jitter keeps recycled workers from restarting all at once
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "0"))
+max_requests_jitter = max_requests // 10
+accesslog = os.getenv("GUNICORN_ACCESS_LOG", "-")
+
+SCHEMA_CHECK = os.getenv("SCHEMA_CHECK_ON_START", "true").lower() == "true"
+SCHEMA_CHECK_WAIT = float(os.getenv("SCHEMA_CHECK_WAIT_SECONDS", "30"))
+
+def on_starting(server):
+    if SCHEMA_CHECK:
+        from app.schema import check_schema
+
+        server.log.info("Database schema at revision %s", check_schema(SCHEMA_CHECK_WAIT))
+
+def post_fork(server, worker):
+    from app.database import reset_after_fork
+
+    reset_after_fork()
\ No newline at end of file
@@ -0,0 +1,128 @@
+"""initial schema
+
+Revision ID: 0001
+Revises:
+Create Date: 2025-07-10 08:34:31
+
+Databases created earlier by Base.metadata.create_all already have these
+tables; mark them with `alembic stamp 0001` before running `alembic upgrade head`.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+USER_ROLE = sa.Enum("ADMIN", "MANAGER", "RECEPTIONIST", "HOUSEKEEPING", name="userrole")
+ROOM_TYPE = sa.Enum("STANDARD", "DELUXE", "SUITE", "PRESIDENTIAL", name="roomtype")
+ROOM_STATUS = sa.Enum("AVAILABLE", "OCCUPIED", "CLEANING", "MAINTENANCE", name="roomstatus")
+BOOKING_STATUS = sa.Enum("CONFIRMED", "CHECKED_IN", "CHECKED_OUT", "CANCELLED", name="bookingstatus")
+TASK_STATUS = sa.Enum("PENDING", "IN_PROGRESS", "COMPLETED", name="taskstatus")
+TASK_TYPE = sa.Enum("CLEANING", "MAINTENANCE", "INSPECTION", name="tasktype")
+PRIORITY = sa.Enum("LOW", "MEDIUM", "HIGH", "URGENT", name="priority")
+
+def upgrade():
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("email", sa.String(255), nullable=False),
+        sa.Column("hashed_password", sa.String(255), nullable=False),
+        sa.Column("first_name", sa.String(100), nullable=False),
+        sa.Column("last_name", sa.String(100), nullable=False),
+        sa.Column("role", USER_ROLE, nullable=False),
+        sa.Column("is_active", sa.Boolean()),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("updated_at", sa.DateTime()),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    op.create_table(
+        "rooms",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("room_number", sa.String(10), nullable=False, unique=True),
+        sa.Column("room_type", ROOM_TYPE, nullable=False),
+        sa.Column("status", ROOM_STATUS),
+        sa.Column("price_per_night", sa.Float(), nullable=False),
+        sa.Column("floor", sa.Integer(), nullable=False),
+        sa.Column("amenities", sa.Text()),
+        sa.Column("last_cleaned", sa.DateTime()),
+        sa.Column("next_maintenance", sa.DateTime()),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("updated_at", sa.DateTime()),
+    )
+    op.create_index("ix_rooms_id", "rooms", ["id"])
+
+    op.create_table(
+        "guests",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("first_name", sa.String(100), nullable=False),
+        sa.Column("last_name", sa.String(100), nullable=False),
+        sa.Column("email", sa.String(255), nullable=False, unique=True),
+        sa.Column("phone", sa.String(20), nullable=False),
+        sa.Column("address", sa.Text()),
+        sa.Column("id_number", sa.String(50), nullable=False, unique=True),
+        sa.Column("date_of_birth", sa.DateTime()),
+        sa.Column("nationality", sa.String(50)),
+        sa.Column("vip_status", sa.Boolean()),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("updated_at", sa.DateTime()),
+    )
+    op.create_index("ix_guests_id", "guests", ["id"])
+
+    op.create_table(
+        "bookings",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("guest_id", sa.Integer(), sa.ForeignKey("guests.id"), nullable=False),
+        sa.Column("room_id", sa.Integer(), sa.ForeignKey("rooms.id"), nullable=False),
+        sa.Column("check_in_date", sa.DateTime(), nullable=False),
+        sa.Column("check_out_date", sa.DateTime(), nullable=False),
+        sa.Column("status", BOOKING_STATUS),
+        sa.Column("total_amount", sa.Float(), nullable=False),
+        sa.Column("paid_amount", sa.Float()),
+        sa.Column("number_of_guests", sa.Integer()),
+        sa.Column("special_requests", sa.Text()),
+        sa.Column("created_by", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("updated_at", sa.DateTime()),
+    )
+    op.create_index("ix_bookings_id", "bookings", ["id"])
+
+    op.create_table(
+        "tasks",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("room_id", sa.Integer(), sa.ForeignKey("rooms.id"), nullable=False),
+        sa.Column("title", sa.String(255), nullable=False),
+        sa.Column("description", sa.Text()),
+        sa.Column("task_type", TASK_TYPE, nullable=False),
+        sa.Column("priority", PRIORITY),
+        sa.Column("status", TASK_STATUS),
+        sa.Column("assigned_to", sa.Integer(), sa.ForeignKey("users.id")),
+        sa.Column("due_date", sa.DateTime()),
+        sa.Column("completed_at", sa.DateTime()),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("updated_at", sa.DateTime()),
+    )
+    op.create_index("ix_tasks_id", "tasks", ["id"])
+
+    op.create_table(
+        "reports",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("title", sa.String(255), nullable=False),
+        sa.Column("report_type", sa.String(50), nullable=False),
+        sa.Column("period_start", sa.DateTime(), nullable=False),
+        sa.Column("period_end", sa.DateTime(), nullable=False),
+        sa.Column("data", sa.Text()),
+        sa.Column("created_at", sa.DateTime()),
+    )
+    op.create_index("ix_reports_id", "reports", ["id"])
+
+def downgrade():
+    op.drop_table("reports")
+    op.drop_table("tasks")
+    op.drop_table("bookings")
+    op.drop_table("guests")
+    op.drop_table("rooms")
+    op.drop_table("users")
\ No newline at end of file
@@ -0,0 +1,29 @@
+"""daily dashboard rollups
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Skipped on databases where create_all already built the table
+    if sa.inspect(op.get_bind()).has_table("daily_stats"):
+        return
+    op.create_table(
+        "daily_stats",
+        sa.Column("stat_date", sa.Date(), primary_key=True),
+        sa.Column("rooms_sold", sa.Integer(), nullable=False),
+        sa.Column("room_revenue", sa.Float(), nullable=False),
+        sa.Column("updated_at", sa.DateTime()),
+    )
+
+def downgrade():
+    op.drop_table("daily_stats")
\ No newline at end of file
@@ -0,0 +1,41 @@
+"""indexes for availability, task board, dashboard and list queries
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_bookings_room_stay", "bookings", ["room_id", "check_in_date", "check_out_date"]),
+    ("ix_bookings_guest_id", "bookings", ["guest_id"]),
+    ("ix_bookings_status_check_in", "bookings", ["status", "check_in_date"]),
+    ("ix_bookings_check_in_date", "bookings", ["check_in_date"]),
+    ("ix_bookings_created_at", "bookings", ["created_at"]),
+    ("ix_tasks_status_assigned_to", "tasks", ["status", "assigned_to", "due_date"]),
+    ("ix_tasks_due_date", "tasks", ["due_date"]),
+    ("ix_tasks_room_id", "tasks", ["room_id"]),
+    ("ix_tasks_created_at", "tasks", ["created_at"]),
+    ("ix_rooms_status", "rooms", ["status"]),
+    ("ix_guests_created_at", "guests", ["created_at"]),
+]
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    for name, table, columns in INDEXES:
+        if name not in {index["name"] for index in inspector.get_indexes(table)}:
+            op.create_index(name, table, columns)
+
+def downgrade():
+    # Upgrade skips indexes that were already there, so any of them may be missing when this runs
+    inspector = sa.inspect(op.get_bind())
+    for name, table, _ in reversed(INDEXES):
+        if name in {index["name"] for index in inspector.get_indexes(table)}:
+            op.drop_index(name, table_name=table)
@@ -0,0 +1,57 @@
+"""change tracking for ETags and updated_since deltas
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+TRACKED_TABLES = ["users", "rooms", "guests", "bookings", "tasks"]
+
+INDEXES = [
+    ("ix_rooms_updated_at", "rooms", ["updated_at"]),
+    ("ix_guests_updated_at", "guests", ["updated_at"]),
+    ("ix_bookings_updated_at", "bookings", ["updated_at"]),
+    ("ix_tasks_updated_at", "tasks", ["updated_at"]),
+]
+
+def upgrade():
+    bind = op.get_bind()
+    # Delta queries filter and keyset on updated_at, which must therefore be set on every row
+    for table in TRACKED_TABLES:
+        op.execute(f"UPDATE {table} SET updated_at = COALESCE(created_at, CURRENT_TIMESTAMP) WHERE updated_at IS NULL")
+    if bind.dialect.name == "mysql":
+        for table in TRACKED_TABLES:
+            op.alter_column(table, "updated_at", type_=mysql.DATETIME(fsp=6), existing_type=mysql.DATETIME(), existing_nullable=True)
+
+    inspector = sa.inspect(bind)
+    for name, table, columns in INDEXES:
+        if name not in {index["name"] for index in inspector.get_indexes(table)}:
+            op.create_index(name, table, columns)
+
+    if not inspector.has_table("tombstones"):
+        op.create_table(
+            "tombstones",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("resource", sa.String(32), nullable=False),
+            sa.Column("row_id", sa.Integer(), nullable=False),
+            sa.Column("deleted_at", sa.DateTime().with_variant(mysql.DATETIME(fsp=6), "mysql"), nullable=False),
+        )
+        op.create_index("ix_tombstones_resource_deleted_at", "tombstones", ["resource", "deleted_at"])
+
+def downgrade():
+    op.drop_index("ix_tombstones_resource_deleted_at", table_name="tombstones")
+    op.drop_table("tombstones")
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
+    if op.get_bind().dialect.name == "mysql":
+        for table in TRACKED_TABLES:
+            op.alter_column(table, "updated_at", type_=mysql.DATETIME(), existing_type=mysql.DATETIME(fsp=6), existing_nullable=True)
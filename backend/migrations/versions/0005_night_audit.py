@@ -0,0 +1,41 @@
+"""night audit: posted charges, audit progress and the departures index
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if "charged_amount" not in {column["name"] for column in inspector.get_columns("bookings")}:
+        op.add_column("bookings", sa.Column("charged_amount", sa.Float(), nullable=True, server_default=sa.text("0")))
+    if "ix_bookings_status_check_out" not in {index["name"] for index in inspector.get_indexes("bookings")}:
+        op.create_index("ix_bookings_status_check_out", "bookings", ["status", "check_out_date"])
+
+    if not inspector.has_table("night_audits"):
+        op.create_table(
+            "night_audits",
+            sa.Column("business_date", sa.Date(), primary_key=True),
+            sa.Column("stage", sa.String(20), nullable=False),
+            sa.Column("cursor_at", sa.DateTime(), nullable=True),
+            sa.Column("cursor_id", sa.Integer(), nullable=True),
+            sa.Column("no_shows", sa.Integer(), nullable=False),
+            sa.Column("departures", sa.Integer(), nullable=False),
+            sa.Column("charges", sa.Integer(), nullable=False),
+            sa.Column("tasks_created", sa.Integer(), nullable=False),
+            sa.Column("started_at", sa.DateTime(), nullable=True),
+            sa.Column("finished_at", sa.DateTime(), nullable=True),
+        )
+
+def downgrade():
+    op.drop_table("night_audits")
+    op.drop_index("ix_bookings_status_check_out", table_name="bookings")
+    op.drop_column("bookings", "charged_amount")
@@ -0,0 +1,29 @@
+"""submitted background jobs and their owners
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    if not sa.inspect(op.get_bind()).has_table("jobs"):
+        op.create_table(
+            "jobs",
+            sa.Column("id", sa.String(36), primary_key=True),
+            sa.Column("kind", sa.String(50), nullable=False),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+        )
+        op.create_index("ix_jobs_created_at", "jobs", ["created_at"])
+
+def downgrade():
+    op.drop_index("ix_jobs_created_at", table_name="jobs")
+    op.drop_table("jobs")
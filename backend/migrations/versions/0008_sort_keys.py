@@ -0,0 +1,38 @@
+"""indexes and NOT NULL for every list sort key
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_rooms_floor", "rooms", ["floor"]),
+    ("ix_reports_period_start", "reports", ["period_start"]),
+]
+
+# Keyset pagination skips rows whose sort value is NULL, so created_at may not be NULL where it is a sort key
+SORTED_BY_CREATED_AT = ["guests", "bookings", "tasks"]
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+    for table in SORTED_BY_CREATED_AT:
+        # Rows written before created_at had a default: their first recorded change is the best estimate
+        op.execute(f"UPDATE {table} SET created_at = COALESCE(updated_at, CURRENT_TIMESTAMP) WHERE created_at IS NULL")
+        with op.batch_alter_table(table) as batch:
+            batch.alter_column("created_at", existing_type=sa.DateTime(), nullable=False)
+
+def downgrade():
+    for table in reversed(SORTED_BY_CREATED_AT):
+        with op.batch_alter_table(table) as batch:
+            batch.alter_column("created_at", existing_type=sa.DateTime(), nullable=True)
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
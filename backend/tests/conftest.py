@@ -0,0 +1,100 @@
+# Tests run against a throwaway SQLite database through aiosqlite, with the in-process event bus and no
+# Redis. Settings are read when the app modules are imported, so they are set first.
+#
+#   cd backend && pip install -r requirements-dev.txt && python -m pytest -q
+import os
+import shutil
+import tempfile
+
+WORKDIR = tempfile.mkdtemp(prefix="hotel-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{WORKDIR}/hotel.db"
+os.environ["JOB_FILES_DIR"] = os.path.join(WORKDIR, "jobs")
+for name in ("WEB_CONCURRENCY", "ASYNC_DATABASE_URL", "DATABASE_REPLICA_URLS", "REDIS_URL", "CELERY_BROKER_URL", "CELERY_RESULT_BACKEND"):
+    os.environ.pop(name, None)
+os.environ["PRINCIPAL_CACHE_REDIS"] = "false"
+# Every request reaches the database, so query counts and replica routing are visible; tests of the
+# cache itself switch it on
+os.environ["RESPONSE_CACHE_ENABLED"] = "false"
+os.environ["EVENTS_REDIS"] = "false"
+# Built in a background thread, whose queries would land in the counted ones
+os.environ["GUEST_SEARCH_INDEX"] = "false"
+
+from datetime import datetime, timedelta
+from typing import Callable, Dict
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.auth import create_access_token, get_password_hash, principal_cache
+from app.database import SessionLocal, get_sync_engine
+from app.main import app
+from app.response_cache import response_cache
+from app.models import Base, Booking, Guest, Room, RoomType, Task, TaskType, User, UserRole
+from app.rollups import stats_cache
+
+PASSWORD_HASH = get_password_hash("password")
+
+@pytest.fixture(scope="session", autouse=True)
+def schema():
+    Base.metadata.create_all(bind=get_sync_engine())
+    yield
+    get_sync_engine().dispose()
+    shutil.rmtree(WORKDIR, ignore_errors=True)
+
+@pytest.fixture(autouse=True)
+def clean_database():
+    # Every test starts from empty tables and cold caches
+    yield
+    with get_sync_engine().begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            conn.execute(table.delete())
+    principal_cache.clear()
+    stats_cache.clear()
+    response_cache.local.clear()
+
+@pytest.fixture
+def client():
+    # Entering the client runs the app lifespan; leaving it disposes the aiosqlite pools,
+    # whose worker threads would otherwise keep the test run from exiting
+    with TestClient(app) as client:
+        yield client
+
+@pytest.fixture
+def make_user() -> Callable[..., Dict[str, str]]:
+    # Returns the Authorization header of a new user with the given role
+    def make_user(role: UserRole = UserRole.ADMIN, email: str = None) -> Dict[str, str]:
+        email = email or f"{role.value}{datetime.utcnow().timestamp()}@hotel.com"
+        with SessionLocal() as db:
+            db.add(User(email=email, hashed_password=PASSWORD_HASH, first_name="Test", last_name=role.value.title(), role=role))
+            db.commit()
+        return {"Authorization": "Bearer " + create_access_token({"sub": email})}
+    return make_user
+
+@pytest.fixture
+def admin_headers(make_user) -> Dict[str, str]:
+    return make_user(UserRole.ADMIN, "admin@hotel.com")
+
+@pytest.fixture
+def hotel(admin_headers):
+    # A small hotel: rooms on two floors, a guest and booking per room (the same stay for all), one task per room
+    now = datetime.utcnow().replace(hour=12, minute=0, second=0, microsecond=0)
+    with SessionLocal() as db:
+        admin = db.query(User).filter(User.email == "admin@hotel.com").one()
+        rooms = [Room(room_number=str(100 * floor + number), room_type=RoomType.STANDARD, price_per_night=100, floor=floor)
+                 for floor in (1, 2) for number in range(1, 6)]
+        guests = [Guest(first_name="Guest", last_name=str(index), email=f"guest{index}@example.com", phone=f"555-{index:04d}", id_number=f"ID{index:06d}")
+                  for index in range(len(rooms))]
+        db.add_all(rooms + guests)
+        db.flush()
+        db.add_all([
+            Booking(guest_id=guest.id, room_id=room.id, check_in_date=now + timedelta(days=1), check_out_date=now + timedelta(days=3),
+                    total_amount=200, created_by=admin.id)
+            for guest, room in zip(guests, rooms)
+        ])
+        db.add_all([Task(room_id=room.id, title=f"Clean {room.room_number}", task_type=TaskType.CLEANING) for room in rooms])
+        db.commit()
+        return {
+            "rooms": [room.id for room in rooms],
+            "guests": [guest.id for guest in guests],
+            "stay": (now + timedelta(days=1), now + timedelta(days=3)),
+        }
@@ -0,0 +1,58 @@
+# Request handlers run their queries on the async engine (aiosqlite here, aiomysql in production), so a
+# slow statement waits in the driver's thread while the event loop keeps serving other requests.
+import asyncio
+import time
+
+from sqlalchemy import text
+
+from app.database import AsyncSessionLocal, dispose_engines, get_engine, to_async_url
+
+# About a quarter of a second of SQLite work
+SLOW_QUERY = "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 500000) SELECT count(*) FROM n"
+
+def test_async_driver_urls():
+    assert to_async_url("mysql+pymysql://hotel_user:secret@db:3306/hotel_db") == "mysql+aiomysql://hotel_user:secret@db:3306/hotel_db"
+    assert to_async_url("mysql://hotel_user:secret@db/hotel_db") == "mysql+aiomysql://hotel_user:secret@db/hotel_db"
+    assert to_async_url("sqlite:////var/lib/hotel.db") == "sqlite+aiosqlite:////var/lib/hotel.db"
+    assert to_async_url("mysql+aiomysql://db/hotel_db") == "mysql+aiomysql://db/hotel_db"
+
+def test_requests_use_the_async_driver():
+    assert get_engine().dialect.is_async
+    assert get_engine().dialect.driver == "aiosqlite"
+
+def test_slow_query_does_not_block_the_event_loop():
+    async def run():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker = asyncio.create_task(tick())
+        try:
+            async with AsyncSessionLocal() as db:
+                started = time.perf_counter()
+                assert (await db.execute(text(SLOW_QUERY))).scalar_one() == 500000
+                elapsed = time.perf_counter() - started
+        finally:
+            ticker.cancel()
+            await dispose_engines()
+        return ticks, elapsed
+
+    ticks, elapsed = asyncio.run(run())
+    # A blocking driver would leave the ticker stuck until the query returned
+    assert ticks >= max(3, int(elapsed / 0.01 / 3))
+
+def test_write_then_read_through_the_api(client, admin_headers):
+    room = {"room_number": "101", "room_type": "deluxe", "price_per_night": 180, "floor": 1}
+    created = client.post("/api/rooms/", headers=admin_headers, json=room)
+    assert created.status_code == 200
+
+    listed = client.get("/api/rooms/", headers=admin_headers).json()["items"]
+    assert [(item["id"], item["room_number"]) for item in listed] == [(created.json()["id"], "101")]
+
+def test_invalid_token_is_rejected(client):
+    response = client.get("/api/rooms/", headers={"Authorization": "Bearer not-a-token"})
+    assert response.status_code == 401
@@ -0,0 +1,65 @@
+# Which rooms GET /api/rooms/availability offers for a stay.
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import delete, update
+
+from app.database import SessionLocal
+from app.models import Booking, BookingStatus, Room, RoomStatus, RoomType
+
+@pytest.fixture
+def rooms(hotel):
+    # Every room holds the fixture's stay; a few are changed so each rule below has a room to show it
+    first, second, third, fourth = hotel["rooms"][:4]
+    with SessionLocal() as db:
+        db.execute(update(Booking).where(Booking.room_id == first).values(status=BookingStatus.CANCELLED))
+        db.execute(update(Booking).where(Booking.room_id == second).values(status=BookingStatus.CHECKED_OUT))
+        # Free, but out of service
+        db.execute(delete(Booking).where(Booking.room_id == third))
+        db.execute(update(Room).where(Room.id == third).values(status=RoomStatus.MAINTENANCE))
+        db.execute(delete(Booking).where(Booking.room_id == fourth))
+        db.execute(update(Room).where(Room.id == fourth).values(room_type=RoomType.DELUXE))
+        db.commit()
+    return {"cancelled": first, "checked_out": second, "maintenance": third, "deluxe": fourth, "booked": hotel["rooms"][4:]}
+
+def available(client, headers, check_in, check_out, **params):
+    response = client.get("/api/rooms/availability", headers=headers, params={"check_in": check_in.isoformat(), "check_out": check_out.isoformat(), **params})
+    assert response.status_code == 200
+    return {room["id"] for room in response.json()}
+
+def test_only_blocking_bookings_hold_a_room(client, rooms, hotel, admin_headers):
+    check_in, check_out = hotel["stay"]
+    assert available(client, admin_headers, check_in, check_out) == {rooms["cancelled"], rooms["checked_out"], rooms["deluxe"]}
+
+def test_checked_in_guests_hold_their_room(client, rooms, hotel, admin_headers):
+    with SessionLocal() as db:
+        db.execute(update(Booking).where(Booking.room_id == rooms["booked"][0]).values(status=BookingStatus.CHECKED_IN))
+        db.commit()
+    check_in, check_out = hotel["stay"]
+    assert rooms["booked"][0] not in available(client, admin_headers, check_in, check_out)
+
+def test_same_day_turnover_is_not_a_conflict(client, rooms, hotel, admin_headers):
+    check_in, check_out = hotel["stay"]
+    every_room_in_service = set(hotel["rooms"]) - {rooms["maintenance"]}
+    assert available(client, admin_headers, check_out, check_out + timedelta(days=2)) == every_room_in_service
+    assert available(client, admin_headers, check_in - timedelta(days=2), check_in) == every_room_in_service
+    # An hour into either side of the stay is a conflict again
+    assert available(client, admin_headers, check_out - timedelta(hours=1), check_out + timedelta(days=1)) == {rooms["cancelled"], rooms["checked_out"], rooms["deluxe"]}
+
+def test_maintenance_rooms_are_never_offered(client, rooms, hotel, admin_headers):
+    far = hotel["stay"][1] + timedelta(days=30)
+    offered = available(client, admin_headers, far, far + timedelta(days=1))
+    assert rooms["maintenance"] not in offered and len(offered) == len(hotel["rooms"]) - 1
+
+def test_room_type_filter(client, rooms, hotel, admin_headers):
+    check_in, check_out = hotel["stay"]
+    assert available(client, admin_headers, check_in, check_out, room_type="deluxe") == {rooms["deluxe"]}
+    assert available(client, admin_headers, check_in, check_out, room_type="standard") == {rooms["cancelled"], rooms["checked_out"]}
+    assert available(client, admin_headers, check_in, check_out, room_type="suite") == set()
+
+def test_invalid_requests(client, rooms, hotel, admin_headers):
+    check_in, check_out = hotel["stay"]
+    params = {"check_in": check_out.isoformat(), "check_out": check_in.isoformat()}
+    assert client.get("/api/rooms/availability", headers=admin_headers, params=params).status_code == 400
+    params = {"check_in": check_in.isoformat(), "check_out": check_out.isoformat(), "room_type": "penthouse"}
+    assert client.get("/api/rooms/availability", headers=admin_headers, params=params).status_code == 400
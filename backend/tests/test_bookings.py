@@ -0,0 +1,88 @@
+# The single-booking write path: availability under the room lock, pricing and Idempotency-Key retries.
+from datetime import timedelta
+
+from app.database import SessionLocal
+from app.models import Booking, IdempotencyKey
+
+def booking(hotel, check_in, check_out, room: int = 0, guest: int = 0):
+    return {
+        "guest_id": hotel["guests"][guest],
+        "room_id": hotel["rooms"][room],
+        "check_in_date": check_in.isoformat(),
+        "check_out_date": check_out.isoformat(),
+    }
+
+def test_unknown_guest_is_rejected_before_anything_is_saved(client, hotel, admin_headers):
+    check_in = hotel["stay"][1] + timedelta(days=7)
+    body = {**booking(hotel, check_in, check_in + timedelta(days=1)), "guest_id": 99999}
+    response = client.post("/api/bookings/", headers={**admin_headers, "Idempotency-Key": "unknown-guest"}, json=body)
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Guest not found"
+
+    with SessionLocal() as db:
+        assert db.query(Booking).filter(Booking.guest_id == 99999).count() == 0
+        # The claimed key went with the rolled back transaction, so a corrected retry can reuse it
+        assert db.query(IdempotencyKey).count() == 0
+
+def test_overlapping_stays_are_refused(client, hotel, admin_headers):
+    check_in, check_out = hotel["stay"]
+    overlaps = [
+        (check_in + timedelta(days=1), check_out + timedelta(days=1)),
+        (check_in - timedelta(days=1), check_in + timedelta(hours=1)),
+        (check_in + timedelta(hours=1), check_out - timedelta(hours=1)),
+        (check_in - timedelta(days=1), check_out + timedelta(days=1)),
+    ]
+    for start, end in overlaps:
+        response = client.post("/api/bookings/", headers=admin_headers, json=booking(hotel, start, end))
+        assert response.status_code == 409, (start, end)
+    with SessionLocal() as db:
+        assert db.query(Booking).filter(Booking.room_id == hotel["rooms"][0]).count() == 1
+
+def test_back_to_back_stays_do_not_conflict(client, hotel, admin_headers):
+    # Stays are half-open [check_in, check_out): a departure and an arrival at the same time share the room
+    check_in, check_out = hotel["stay"]
+    after = client.post("/api/bookings/", headers=admin_headers, json=booking(hotel, check_out, check_out + timedelta(days=2)))
+    before = client.post("/api/bookings/", headers=admin_headers, json=booking(hotel, check_in - timedelta(days=1), check_in))
+    assert (after.status_code, before.status_code) == (200, 200)
+
+    # One second into the next stay is a conflict
+    response = client.post("/api/bookings/", headers=admin_headers, json=booking(hotel, check_out - timedelta(seconds=1), check_out + timedelta(days=1), room=1))
+    assert response.status_code == 409
+
+def test_check_out_must_follow_check_in(client, hotel, admin_headers):
+    check_in = hotel["stay"][1] + timedelta(days=7)
+    response = client.post("/api/bookings/", headers=admin_headers, json=booking(hotel, check_in, check_in))
+    assert response.status_code == 400
+
+def test_retry_with_the_same_key_returns_the_first_booking(client, hotel, admin_headers):
+    check_in = hotel["stay"][1] + timedelta(days=7)
+    body = booking(hotel, check_in, check_in + timedelta(days=2))
+    headers = {**admin_headers, "Idempotency-Key": "booking-42"}
+
+    first = client.post("/api/bookings/", headers=headers, json=body)
+    retry = client.post("/api/bookings/", headers=headers, json=body)
+    assert (first.status_code, retry.status_code) == (200, 200)
+    assert retry.json() == first.json()
+    assert retry.headers["Idempotent-Replayed"] == "true" and "Idempotent-Replayed" not in first.headers
+
+    # Without the key the same request is a second booking of a now taken room
+    assert client.post("/api/bookings/", headers=admin_headers, json=body).status_code == 409
+    with SessionLocal() as db:
+        assert db.query(Booking).filter(Booking.check_in_date == check_in).count() == 1
+
+def test_reused_key_with_a_different_request_is_refused(client, hotel, admin_headers):
+    check_in = hotel["stay"][1] + timedelta(days=7)
+    headers = {**admin_headers, "Idempotency-Key": "booking-43"}
+    assert client.post("/api/bookings/", headers=headers, json=booking(hotel, check_in, check_in + timedelta(days=2))).status_code == 200
+
+    response = client.post("/api/bookings/", headers=headers, json=booking(hotel, check_in, check_in + timedelta(days=3)))
+    assert response.status_code == 422
+
+def test_keys_are_scoped_to_the_user(client, hotel, admin_headers, make_user):
+    check_in = hotel["stay"][1] + timedelta(days=7)
+    assert client.post("/api/bookings/", headers={**admin_headers, "Idempotency-Key": "shared"}, json=booking(hotel, check_in, check_in + timedelta(days=1))).status_code == 200
+
+    # The same key from another user is a new request, not a replay of the admin's booking
+    other = {**make_user(), "Idempotency-Key": "shared"}
+    response = client.post("/api/bookings/", headers=other, json=booking(hotel, check_in, check_in + timedelta(days=1), room=1))
+    assert response.status_code == 200 and "Idempotent-Replayed" not in response.headers
@@ -0,0 +1,125 @@
+# Conditional list requests (ETag / If-None-Match) and updated_since deltas with delete tombstones.
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import update
+
+from app.changes import TOMBSTONE_RETENTION_DAYS, prune_tombstones
+from app.database import SessionLocal
+from app.models import Room, Task, Tombstone
+
+@pytest.fixture
+def settled(hotel):
+    # Rows last changed an hour ago, well outside the settle window, so ETags only move with real changes
+    an_hour_ago = datetime.utcnow() - timedelta(hours=1)
+    with SessionLocal() as db:
+        db.execute(update(Room).values(updated_at=an_hour_ago))
+        db.execute(update(Task).values(updated_at=an_hour_ago))
+        db.commit()
+    return hotel
+
+def since(moment: datetime) -> dict:
+    return {"updated_since": moment.isoformat()}
+
+def test_matching_etag_gets_304(client, settled, admin_headers):
+    first = client.get("/api/rooms/", headers=admin_headers)
+    etag = first.headers["ETag"]
+    assert first.status_code == 200 and etag.startswith('W/"')
+    assert first.headers["Cache-Control"] == "private, no-cache"
+
+    for if_none_match in (etag, etag.removeprefix("W/"), f'W/"other", {etag}', "*"):
+        response = client.get("/api/rooms/", headers={**admin_headers, "If-None-Match": if_none_match})
+        assert response.status_code == 304, if_none_match
+        assert response.headers["ETag"] == etag and not response.content
+    assert client.get("/api/rooms/", headers={**admin_headers, "If-None-Match": 'W/"other"'}).status_code == 200
+
+def test_etag_depends_on_the_query(client, settled, admin_headers):
+    etag = client.get("/api/rooms/", headers=admin_headers).headers["ETag"]
+    response = client.get("/api/rooms/?limit=5", headers={**admin_headers, "If-None-Match": etag})
+    assert response.status_code == 200 and response.headers["ETag"] != etag
+
+def test_etag_changes_after_an_update_and_a_delete(client, settled, admin_headers):
+    etag = client.get("/api/rooms/", headers=admin_headers).headers["ETag"]
+    assert client.put(f"/api/rooms/{settled['rooms'][0]}", headers=admin_headers, json={"floor": 9}).status_code == 200
+    response = client.get("/api/rooms/", headers={**admin_headers, "If-None-Match": etag})
+    assert response.status_code == 200 and response.headers["ETag"] != etag
+
+    # The deleted task is not the newest, so max(updated_at) stays as it was; the count still changes the tag
+    with SessionLocal() as db:
+        task_id = db.query(Task.id).first()[0]
+        db.execute(update(Task).where(Task.id == task_id).values(updated_at=datetime.utcnow() - timedelta(hours=2)))
+        db.commit()
+    etag = client.get("/api/tasks/", headers=admin_headers).headers["ETag"]
+    assert client.delete(f"/api/tasks/{task_id}", headers=admin_headers).status_code == 204
+    assert client.get("/api/tasks/", headers={**admin_headers, "If-None-Match": etag}).status_code == 200
+
+def test_delete_records_a_tombstone(client, settled, admin_headers):
+    with SessionLocal() as db:
+        task_id = db.query(Task.id).first()[0]
+    assert client.delete(f"/api/tasks/{task_id}", headers=admin_headers).status_code == 204
+    with SessionLocal() as db:
+        tombstone = db.query(Tombstone).one()
+    assert (tombstone.resource, tombstone.row_id) == ("tasks", task_id)
+    assert tombstone.deleted_at > datetime.utcnow() - timedelta(minutes=1)
+
+def test_delta_pages_changes_with_tombstones_on_the_first_page(client, settled, admin_headers):
+    poll_from = datetime.utcnow() - timedelta(minutes=30)
+    with SessionLocal() as db:
+        task_ids = [task_id for task_id, in db.query(Task.id).order_by(Task.id)]
+    changed, deleted = task_ids[:3], task_ids[3:5]
+    for task_id in changed:
+        assert client.post(f"/api/tasks/{task_id}/complete?redispatch=false", headers=admin_headers).status_code == 200
+    for task_id in deleted:
+        assert client.delete(f"/api/tasks/{task_id}", headers=admin_headers).status_code == 204
+
+    pages, cursor = [], None
+    while True:
+        params = {**since(poll_from), "limit": 2, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/api/tasks/", headers=admin_headers, params=params)
+        assert response.status_code == 200
+        pages.append(response.json())
+        cursor = pages[-1]["next_cursor"]
+        if cursor is None:
+            break
+
+    assert len(pages) == 2
+    assert sorted(item["id"] for page in pages for item in page["items"]) == changed
+    assert {item["status"] for page in pages for item in page["items"]} == {"completed"}
+    assert sorted(pages[0]["deleted"]) == deleted and pages[1]["deleted"] == []
+    # Only the last page says where the next poll starts: a little before now, inside the settle window
+    assert pages[0]["next_updated_since"] is None
+    next_since = datetime.fromisoformat(pages[1]["next_updated_since"])
+    assert poll_from < next_since < datetime.utcnow()
+
+    # Nothing changed after the last write
+    again = client.get("/api/tasks/", headers=admin_headers, params=since(datetime.utcnow() + timedelta(seconds=1))).json()
+    assert again["items"] == [] and again["deleted"] == []
+
+def test_delta_accepts_aware_timestamps(client, settled, admin_headers):
+    with SessionLocal() as db:
+        task_id = db.query(Task.id).first()[0]
+    assert client.post(f"/api/tasks/{task_id}/complete?redispatch=false", headers=admin_headers).status_code == 200
+    aware = (datetime.now(timezone.utc) - timedelta(minutes=5)).astimezone(timezone(timedelta(hours=2)))
+    body = client.get("/api/tasks/", headers=admin_headers, params=since(aware)).json()
+    assert [item["id"] for item in body["items"]] == [task_id]
+
+def test_delta_older_than_the_delete_history_is_gone(client, settled, admin_headers):
+    too_old = datetime.utcnow() - timedelta(days=TOMBSTONE_RETENTION_DAYS, hours=1)
+    response = client.get("/api/tasks/", headers=admin_headers, params=since(too_old))
+    assert response.status_code == 410
+    assert client.get("/api/tasks/", headers=admin_headers, params=since(too_old + timedelta(hours=2))).status_code == 200
+
+def test_delta_cannot_be_filtered(client, settled, admin_headers):
+    response = client.get("/api/tasks/", headers=admin_headers, params={**since(datetime.utcnow()), "status": "pending"})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "updated_since cannot be combined with: status"
+
+def test_prune_removes_expired_tombstones(settled):
+    with SessionLocal() as db:
+        db.add_all([
+            Tombstone(resource="tasks", row_id=1, deleted_at=datetime.utcnow() - timedelta(days=TOMBSTONE_RETENTION_DAYS + 1)),
+            Tombstone(resource="tasks", row_id=2, deleted_at=datetime.utcnow()),
+        ])
+        db.commit()
+        assert prune_tombstones(db) == 1
+        assert [tombstone.row_id for tombstone in db.query(Tombstone)] == [2]
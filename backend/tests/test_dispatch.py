@@ -0,0 +1,99 @@
+# Housekeeping dispatch: the order tasks are planned in, shift capacity, floor changes, and assignments lost to
+# a concurrent writer before the plan was saved.
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+
+from app import dispatch as dispatch_module
+from app.database import AsyncSessionLocal, SessionLocal, dispose_engines
+from app.dispatch import Attendant, PlanTask, plan
+from app.models import Priority, Task, TaskStatus, TaskType, User, UserRole
+
+NOW = datetime(2026, 3, 2, 9, 0)
+
+def task(id: int, floor: int = 1, priority: Priority = Priority.MEDIUM, task_type: TaskType = TaskType.CLEANING, due_in: int = None) -> PlanTask:
+    deadline = NOW + timedelta(minutes=due_in) if due_in is not None else None
+    return PlanTask(id, room_id=id, floor=floor, room_number=f"{floor}{id:02d}", priority=priority, task_type=task_type, deadline=deadline)
+
+def test_most_urgent_first_then_deadline_window_then_floor():
+    tasks = [
+        task(1, floor=1, priority=Priority.LOW),
+        task(2, floor=1, priority=Priority.HIGH),
+        task(3, floor=1, priority=Priority.HIGH, due_in=180),
+        # Both due within the first hour: the same window, so the lower floor goes first
+        task(4, floor=2, priority=Priority.HIGH, due_in=30),
+        task(5, floor=1, priority=Priority.HIGH, due_in=45),
+        task(6, floor=3, priority=Priority.URGENT),
+    ]
+    result = plan(tasks, [Attendant(1)], NOW, capacity_minutes=10_000)
+    assert result.staff[0].tasks == [6, 5, 4, 3, 2, 1]
+    assert [assignment.sequence for assignment in result.assignments] == [1, 2, 3, 4, 5, 6]
+    assert result.unassigned == []
+
+def test_tasks_beyond_the_shift_stay_unassigned():
+    tasks = [task(1), task(2), task(3), task(4, task_type=TaskType.INSPECTION)]
+    result = plan(tasks, [Attendant(1)], NOW, capacity_minutes=60)
+    assert result.staff[0].tasks == [1, 2] and result.staff[0].minutes == 60
+    assert result.unassigned == [3, 4]
+
+    # A floor change counts against the shift too
+    assert plan([task(1, floor=1), task(2, floor=2)], [Attendant(1)], NOW, capacity_minutes=70).unassigned == []
+    assert plan([task(1, floor=1), task(2, floor=2)], [Attendant(1)], NOW, capacity_minutes=69).unassigned == [2]
+
+def test_floor_change_costs_minutes():
+    # B is less loaded, but would have to come down a floor: A starts sooner
+    staff = [Attendant(1, minutes=20, floor=1), Attendant(2, minutes=15, floor=2)]
+    result = plan([task(1, floor=1)], staff, NOW, floor_change_minutes=10)
+    assert [(a.assigned_to, a.starts_in_minutes) for a in result.assignments] == [(1, 20)]
+
+    # Without the walk B is the earlier start, and moves to the task's floor
+    staff = [Attendant(1, minutes=20, floor=1), Attendant(2, minutes=15, floor=2)]
+    result = plan([task(1, floor=1)], staff, NOW, floor_change_minutes=0)
+    assert [(a.assigned_to, a.starts_in_minutes) for a in result.assignments] == [(2, 15)]
+    assert (staff[1].floor, staff[1].floors, staff[1].minutes) == (1, [1], 45)
+
+def test_spreads_work_and_flags_late_tasks():
+    staff = [Attendant(1), Attendant(2)]
+    result = plan([task(id, floor=1, due_in=50) for id in range(1, 5)], staff, NOW)
+    assert sorted(len(attendant.tasks) for attendant in staff) == [2, 2]
+    # Each attendant's second cleaning ends an hour in, after the 50 minute deadline
+    assert [assignment.late for assignment in sorted(result.assignments, key=lambda a: a.sequence)] == [False, False, True, True]
+
+def test_assignments_lost_to_a_concurrent_writer(hotel, monkeypatch):
+    with SessionLocal() as db:
+        db.add_all([User(email=f"housekeeper{n}@hotel.com", hashed_password="-", first_name="House", last_name=str(n), role=UserRole.HOUSEKEEPING)
+                    for n in range(2)])
+        db.commit()
+        admin_id = db.query(User.id).filter(User.email == "admin@hotel.com").scalar()
+        task_ids = [task_id for task_id, in db.query(Task.id).order_by(Task.id)]
+    taken, started = task_ids[0], task_ids[1]
+
+    load_plan_inputs = dispatch_module.load_plan_inputs
+
+    async def loaded_then_changed(db, now, rebalance=False):
+        # Between planning and saving, someone assigns one task by hand and an attendant starts another
+        inputs = await load_plan_inputs(db, now, rebalance)
+        await db.execute(update(Task).where(Task.id == taken).values(assigned_to=admin_id))
+        await db.execute(update(Task).where(Task.id == started).values(status=TaskStatus.IN_PROGRESS))
+        return inputs
+
+    monkeypatch.setattr(dispatch_module, "load_plan_inputs", loaded_then_changed)
+
+    async def run():
+        try:
+            async with AsyncSessionLocal() as db:
+                return (await dispatch_module.dispatch(db))[0]
+        finally:
+            await dispose_engines()
+
+    result = asyncio.run(run())
+    assert result.lost == sorted([taken, started])
+    assert sorted(assignment.task_id for assignment in result.assignments) == task_ids[2:]
+    assert sorted(task_id for attendant in result.staff for task_id in attendant.tasks) == task_ids[2:]
+
+    with SessionLocal() as db:
+        stored = dict(db.query(Task.id, Task.assigned_to))
+    assert stored[taken] == admin_id and stored[started] is None
+    assert {stored[assignment.task_id] for assignment in result.assignments} == {attendant.id for attendant in result.staff}
+    assert all(stored[assignment.task_id] == assignment.assigned_to for assignment in result.assignments)
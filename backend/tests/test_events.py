@@ -0,0 +1,59 @@
+# Change events through the in-process event bus, the stand-in for Redis pub/sub with a single worker.
+import json
+
+from app.events import RESYNC, EventBus, Subscriber
+from app.models import UserRole
+
+ROOM = {"room_number": "301", "room_type": "standard", "price_per_night": 120, "floor": 3}
+
+def subscribe(websocket, headers, resources):
+    websocket.send_json({"token": headers["Authorization"].split()[1], "resources": resources})
+    return websocket.receive_json()
+
+def test_in_process_bus_delivers_to_matching_subscribers():
+    bus = EventBus()
+    rooms, tasks = bus.subscribe({"rooms"}), bus.subscribe({"tasks"})
+    bus.dispatch('{"type":"event","resource":"rooms"}', "rooms")
+
+    assert rooms.queue.qsize() == 1 and tasks.queue.qsize() == 0
+    assert bus.stats()["backend"] == "memory"
+    bus.unsubscribe(rooms)
+    bus.dispatch('{"type":"event","resource":"rooms"}', "rooms")
+    assert rooms.queue.qsize() == 1
+
+def test_slow_subscriber_gets_a_resync_instead_of_its_backlog():
+    bus = EventBus()
+    slow = Subscriber({"rooms"}, queue_size=2)
+    bus.subscribers.add(slow)
+    for number in range(3):
+        bus.dispatch(json.dumps({"type": "event", "resource": "rooms", "id": number}), "rooms")
+
+    assert slow.queue.qsize() == 1 and slow.queue.get_nowait() == RESYNC
+    assert (bus.delivered, bus.overflows) == (2, 1)
+
+def test_websocket_receives_room_changes(client, admin_headers):
+    with client.websocket_connect("/api/events/ws") as websocket:
+        assert subscribe(websocket, admin_headers, ["rooms"]) == {"type": "subscribed", "resources": ["rooms"]}
+        created = client.post("/api/rooms/", headers=admin_headers, json=ROOM).json()
+
+        event = websocket.receive_json()
+        assert (event["type"], event["resource"], event["action"], event["id"]) == ("event", "rooms", "created", created["id"])
+        assert event["data"]["room_number"] == "301"
+
+def test_subscriptions_are_filtered_by_permission(client, make_user):
+    housekeeping = make_user(UserRole.HOUSEKEEPING)
+    with client.websocket_connect("/api/events/ws") as websocket:
+        # Housekeeping has no bookings permission, so that part of the request is dropped
+        assert subscribe(websocket, housekeeping, ["rooms", "bookings", "tasks"])["resources"] == ["rooms", "tasks"]
+
+    receptionist = make_user(UserRole.RECEPTIONIST)
+    with client.websocket_connect("/api/events/ws") as websocket:
+        websocket.send_json({"token": receptionist["Authorization"].split()[1], "resources": ["tasks"]})
+        closed = websocket.receive()
+        assert (closed["type"], closed["code"]) == ("websocket.close", 4403)
+
+def test_websocket_rejects_invalid_tokens(client):
+    with client.websocket_connect("/api/events/ws") as websocket:
+        websocket.send_json({"token": "not-a-token"})
+        closed = websocket.receive()
+        assert (closed["type"], closed["code"]) == ("websocket.close", 4401)
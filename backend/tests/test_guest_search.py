@@ -0,0 +1,127 @@
+# The in-memory guest search index: prefix matching, ranking, changes applied before and after a merge, and
+# refreshing from other workers' writes and deletes.
+import asyncio
+from datetime import datetime
+
+import numpy as np
+
+from app import search
+from app.database import AsyncSessionLocal, SessionLocal, dispose_engines
+from app.models import Guest
+from app.search import GuestIndex, Snapshot, query_terms, search_key
+
+GUESTS = [
+    (1, "Ann", "Smith", "ann@example.com", "+1 555 0100", "P100200"),
+    (2, "Smith", "Jones", "sj@example.com", "555 0101", "P100201"),
+    (3, "Mary-Jane", "Smithers", "mj@example.com", "555 0102", "P100202"),
+    (4, "Bob", "Brown", "smithy@example.com", "555 0103", "P100203"),
+    (5, "José", "O'Brien", "jose@example.com", "555 0104", "SMITH"),
+    (6, "Anna", "Smith", "anna@example.com", "555 0105", "P100205"),
+]
+
+def index_of(rows) -> GuestIndex:
+    index = GuestIndex()
+    index.snapshot = Snapshot.build(rows)
+    return index
+
+def search_for(index: GuestIndex, q: str, limit: int = 10):
+    return index.rank(query_terms(q), limit)
+
+def same_entries(left: Snapshot, right: Snapshot) -> bool:
+    entries = lambda snapshot: sorted(zip(snapshot.keys.tolist(), snapshot.ids.tolist(), snapshot.fields.tolist()))
+    return entries(left) == entries(right) and bool(np.all(left.keys[:-1] <= left.keys[1:]))
+
+def test_keys_ignore_case_accents_and_punctuation():
+    assert search_key("O'Brien") == b"obrien"
+    assert search_key("José") == b"jose"
+    assert search_key("+1 (555) 010") == b"1555010"
+    assert search_key("x" * 40) == b"x" * search.GUEST_SEARCH_KEY_BYTES
+    # A phone number typed with spaces is one term; words are separate terms
+    assert query_terms("555 0100") == [b"5550100"]
+    assert query_terms("Ann  smith ann") == [b"ann", b"smith"]
+
+def test_prefixes_match_every_field_and_name_part():
+    index = index_of(GUESTS)
+    assert search_for(index, "jos") == [5]
+    assert search_for(index, "obri") == [5]
+    assert search_for(index, "jane") == [3]
+    assert search_for(index, "maryjane") == [3]
+    # The national number without the country code, and the full one
+    assert search_for(index, "555 0100") == [1]
+    assert search_for(index, "+1 555 0100") == [1]
+    assert search_for(index, "zzz") == []
+    # Every term has to match
+    assert search_for(index, "ann smi") == [1, 6]
+    assert search_for(index, "anna smith") == [6]
+
+def test_ranking_weights():
+    index = index_of(GUESTS)
+    # Whole id number, whole last names (older first), whole first name, partial last name, partial email.
+    # A partial identifier ranks below a partial name.
+    assert search_for(index, "smith") == [5, 1, 6, 2, 3, 4]
+    assert search_for(index, "smith", limit=3) == [5, 1, 6]
+    assert search_for(index, "p1002") == [1, 2, 3, 4, 6]
+    assert search_for(index, "ann") == [1, 6]
+
+def test_changes_apply_before_and_after_merging():
+    index = index_of(GUESTS)
+    index.upsert(4, "Bob", "Smith", "bob@example.com", "555 0103", "P100203")
+    index.upsert(7, "Carol", "Smithson", "carol@example.com", "555 0107", "P100207")
+    index.remove(2)
+    expected = [5, 1, 4, 6, 3, 7]
+    assert search_for(index, "smith") == expected
+    assert search_for(index, "smithy") == []
+
+    current = [row for row in GUESTS if row[0] not in (2, 4)] + [
+        (4, "Bob", "Smith", "bob@example.com", "555 0103", "P100203"),
+        (7, "Carol", "Smithson", "carol@example.com", "555 0107", "P100207"),
+    ]
+    merged = index.snapshot.merged(index.changed, index.removed)
+    assert same_entries(merged, Snapshot.build(current))
+
+def test_merge_runs_once_enough_guests_changed(monkeypatch):
+    monkeypatch.setattr(search, "GUEST_SEARCH_MERGE_ROWS", 2)
+    index = index_of(GUESTS)
+
+    async def run():
+        index.upsert(7, "Carol", "Smithson", "carol@example.com", "555 0107", "P100207")
+        assert index._merge_task is None
+        index.remove(2)
+        merging = index._merge_task
+        # Let the merge take its copy of the changes; one written after that is kept aside for the next merge
+        await asyncio.sleep(0)
+        index.upsert(8, "Dan", "Smith", "dan@example.com", "555 0108", "P100208")
+        await merging
+
+    asyncio.run(run())
+    assert index.merges == 1
+    assert set(index.changed) == {8} and index.removed == set()
+    assert search_for(index, "smith") == [5, 1, 6, 8, 3, 7, 4]
+    assert 2 not in index.snapshot.ids and 7 in index.snapshot.ids
+
+def test_refresh_picks_up_other_writers_and_tombstones(admin_headers):
+    with SessionLocal() as db:
+        db.add_all([Guest(id=id, first_name=first, last_name=last, email=email, phone=phone, id_number=id_number)
+                    for id, first, last, email, phone, id_number in GUESTS])
+        db.commit()
+    index = GuestIndex()
+    index.snapshot, index.since = GuestIndex._load()
+    assert search_for(index, "smith") == [5, 1, 6, 2, 3, 4]
+
+    # Another worker renames one guest, adds one and deletes one (leaving a tombstone)
+    with SessionLocal() as db:
+        db.get(Guest, 3).last_name = "Jones"
+        db.add(Guest(id=7, first_name="Carol", last_name="Smith", email="carol@example.com", phone="555 0107", id_number="P100207"))
+        db.delete(db.get(Guest, 1))
+        db.commit()
+
+    async def run():
+        try:
+            async with AsyncSessionLocal() as db:
+                return await index.search(db, "smith", 10)
+        finally:
+            await dispose_engines()
+
+    assert asyncio.run(run()) == [5, 6, 7, 2, 4]
+    assert index.removed == {1} and 3 in index.changed
+    assert index.since <= datetime.utcnow()
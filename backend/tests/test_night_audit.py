@@ -0,0 +1,151 @@
+# The night audit: stage order, resuming from the stored cursor after a crash, and auditing a date twice.
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from app import night_audit
+from app.database import SessionLocal
+from app.models import Booking, BookingStatus, Guest, NightAudit, Room, RoomStatus, RoomType, Task, TaskType, User
+
+BUSINESS_DATE = datetime.utcnow().date() - timedelta(days=1)
+MIDNIGHT = datetime.combine(BUSINESS_DATE, datetime.min.time())
+
+class Crash(Exception):
+    pass
+
+@pytest.fixture
+def in_house(admin_headers):
+    # Twelve guests in the house on the audited date: every third leaves that morning, the rest stay on. Each
+    # arrived 0-3 nights before it, so charges are posted for 1-4 nights. Plus two arrivals that never came.
+    with SessionLocal() as db:
+        admin = db.query(User).filter(User.email == "admin@hotel.com").one()
+        rooms = [Room(room_number=str(300 + n), room_type=RoomType.STANDARD, status=RoomStatus.OCCUPIED, price_per_night=100, floor=3)
+                 for n in range(14)]
+        guests = [Guest(first_name="Guest", last_name=str(n), email=f"audit{n}@example.com", phone=f"555-{n:04d}", id_number=f"AU{n:06d}")
+                  for n in range(14)]
+        db.add_all(rooms + guests)
+        db.flush()
+        bookings = []
+        for n in range(12):
+            arrived = MIDNIGHT - timedelta(days=n % 4) + timedelta(hours=15)
+            leaves = MIDNIGHT + timedelta(hours=11) if n % 3 == 0 else MIDNIGHT + timedelta(days=2, hours=11)
+            nights = (leaves.date() - arrived.date()).days
+            bookings.append(Booking(guest_id=guests[n].id, room_id=rooms[n].id, check_in_date=arrived, check_out_date=leaves,
+                                    status=BookingStatus.CHECKED_IN, total_amount=100.0 * nights, created_by=admin.id))
+        for n in (12, 13):
+            bookings.append(Booking(guest_id=guests[n].id, room_id=rooms[n].id, check_in_date=MIDNIGHT + timedelta(hours=15),
+                                    check_out_date=MIDNIGHT + timedelta(days=2, hours=11), status=BookingStatus.CONFIRMED,
+                                    total_amount=200.0, created_by=admin.id))
+        db.add_all(bookings)
+        db.commit()
+        return [booking.id for booking in bookings]
+
+def expected_charge(booking: Booking) -> float:
+    if booking.check_out_date < MIDNIGHT + timedelta(days=1):
+        return booking.total_amount
+    nights = (booking.check_out_date.date() - booking.check_in_date.date()).days
+    return round(booking.total_amount * ((BUSINESS_DATE - booking.check_in_date.date()).days + 1) / nights, 2)
+
+def bookings_by_id():
+    with SessionLocal() as db:
+        return {booking.id: booking for booking in db.query(Booking)}
+
+@pytest.fixture
+def calls(monkeypatch):
+    # Records which stage saw which bookings; set crash_at to (stage, n) to fail on its nth chunk
+    calls = {"seen": [], "crash_at": None}
+    for stage, (status, column, apply) in list(night_audit.STAGE_QUERIES.items()):
+        def recording(db, rows, business_date, now, stage=stage, apply=apply):
+            calls["seen"].append((stage, [row.id for row in rows]))
+            if calls["crash_at"] == (stage, sum(1 for seen, _ in calls["seen"] if seen == stage)):
+                raise Crash(stage)
+            return apply(db, rows, business_date, now)
+        monkeypatch.setitem(night_audit.STAGE_QUERIES, stage, (status, column, recording))
+    return calls
+
+def test_audit_checks_out_departures_and_charges_in_house_guests(in_house, calls):
+    with SessionLocal() as db:
+        result = night_audit.run(db, BUSINESS_DATE, chunk_size=5)
+    assert result == {"business_date": BUSINESS_DATE.isoformat(), "stage": "done", "no_shows": 0, "departures": 4, "charges": 8, "tasks_created": 4}
+
+    bookings = bookings_by_id()
+    for booking_id in in_house[:12]:
+        booking = bookings[booking_id]
+        assert booking.charged_amount == expected_charge(booking), booking_id
+        leaving = booking.check_out_date < MIDNIGHT + timedelta(days=1)
+        assert booking.status == (BookingStatus.CHECKED_OUT if leaving else BookingStatus.CHECKED_IN)
+    # No-shows are off by default: a confirmed booking may be a guest whose arrival was not recorded
+    assert {bookings[booking_id].status for booking_id in in_house[12:]} == {BookingStatus.CONFIRMED}
+    with SessionLocal() as db:
+        departed = {bookings[booking_id].room_id for booking_id in in_house[:12:3]}
+        assert {room.id for room in db.query(Room).filter(Room.status == RoomStatus.CLEANING)} == departed
+        assert {task.room_id for task in db.query(Task).filter(Task.task_type == TaskType.CLEANING)} == departed
+
+def test_departures_run_before_charges(in_house, calls):
+    with SessionLocal() as db:
+        night_audit.run(db, BUSINESS_DATE, chunk_size=100)
+    assert [stage for stage, _ in calls["seen"]] == ["departures", "charges"]
+    # A departing guest is settled in full by the departure stage and never reaches the nightly charges
+    departed, charged = (set(ids) for _, ids in calls["seen"])
+    assert departed == set(in_house[:12:3]) and not departed & charged
+
+def test_no_shows_are_cancelled_first_when_enabled(in_house, calls, monkeypatch):
+    monkeypatch.setattr(night_audit, "NIGHT_AUDIT_NO_SHOWS", True)
+    with SessionLocal() as db:
+        result = night_audit.run(db, BUSINESS_DATE, chunk_size=100)
+    assert [stage for stage, _ in calls["seen"]] == ["no_shows", "departures", "charges"]
+    assert result["no_shows"] == 2
+    bookings = bookings_by_id()
+    assert {bookings[booking_id].status for booking_id in in_house[12:]} == {BookingStatus.CANCELLED}
+
+@pytest.mark.parametrize("stage", ["departures", "charges"])
+def test_resumes_from_the_stored_cursor(in_house, calls, stage):
+    calls["crash_at"] = (stage, 2)
+    with SessionLocal() as db:
+        with pytest.raises(Crash):
+            night_audit.run(db, BUSINESS_DATE, chunk_size=3)
+        db.rollback()
+
+    # The first chunk of the stage committed with its cursor; the crashed second one left nothing behind
+    first_chunk = next(ids for seen, ids in calls["seen"] if seen == stage)
+    with SessionLocal() as db:
+        audit = db.get(NightAudit, BUSINESS_DATE)
+        assert (audit.stage, audit.cursor_id, getattr(audit, stage)) == (stage, first_chunk[-1], 3)
+        assert audit.finished_at is None
+
+    calls["crash_at"], before = None, len(calls["seen"])
+    with SessionLocal() as db:
+        result = night_audit.run(db, BUSINESS_DATE, chunk_size=3)
+    assert (result["departures"], result["charges"], result["tasks_created"]) == (4, 8, 4)
+
+    # The resumed run starts after the cursor: nothing committed before the crash is applied twice
+    resumed = [booking_id for seen, ids in calls["seen"][before:] if seen == stage for booking_id in ids]
+    assert not set(resumed) & set(first_chunk)
+    bookings = bookings_by_id()
+    assert all(bookings[booking_id].charged_amount == expected_charge(bookings[booking_id]) for booking_id in in_house[:12])
+    with SessionLocal() as db:
+        assert db.query(Task).count() == 4
+
+def test_auditing_a_date_twice_changes_nothing(in_house):
+    with SessionLocal() as db:
+        first = night_audit.run(db, BUSINESS_DATE, chunk_size=5)
+    charged = {booking_id: booking.charged_amount for booking_id, booking in bookings_by_id().items()}
+
+    # A finished date is skipped, and reports what it did the first time
+    with SessionLocal() as db:
+        assert night_audit.run(db, BUSINESS_DATE, chunk_size=5) == first
+    # Run again on purpose, it finds every charge already posted and every departure gone
+    with SessionLocal() as db:
+        again = night_audit.run(db, BUSINESS_DATE, chunk_size=5, rerun=True)
+    assert (again["stage"], again["departures"], again["charges"], again["tasks_created"]) == ("done", 0, 0, 0)
+    # An earlier date after a later one does not lower what was posted
+    with SessionLocal() as db:
+        assert night_audit.run(db, BUSINESS_DATE - timedelta(days=1), chunk_size=5)["charges"] == 0
+    assert {booking_id: booking.charged_amount for booking_id, booking in bookings_by_id().items()} == charged
+    with SessionLocal() as db:
+        assert db.query(Task).count() == 4
+
+def test_future_dates_are_refused(in_house):
+    with SessionLocal() as db:
+        with pytest.raises(ValueError):
+            night_audit.run(db, date.today() + timedelta(days=2))
@@ -0,0 +1,79 @@
+# Keyset pagination: cursors walk every row exactly once, in either direction, across equal sort values.
+from datetime import datetime
+import base64
+import json
+
+import pytest
+from sqlalchemy import UniqueConstraint, update
+
+from app.database import SessionLocal
+from app.models import Base, Room, Task
+from app.pagination import MAX_PAGE_SIZE, _encode_cursor
+from app.routers import bookings, guests, reports, rooms, tasks, users
+
+def walk(client, headers, path, **params):
+    ids, cursor = [], None
+    while True:
+        response = client.get(path, headers=headers, params={**params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200, response.text
+        body = response.json()
+        assert len(body["items"]) <= params["limit"]
+        ids.extend(item["id"] for item in body["items"])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return ids
+
+def tamper(cursor: str, **changes) -> str:
+    payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    payload.update(changes)
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+@pytest.mark.parametrize("router", [bookings, guests, reports, rooms, tasks, users], ids=lambda router: router.__name__.rsplit(".", 1)[1])
+def test_sort_keys_are_indexed_and_not_null(router):
+    # A NULL sort value is skipped by the keyset predicate, and an unindexed one sorts the whole table per page
+    for column in router.SORT_FIELDS.values():
+        table = Base.metadata.tables[column.table.name]
+        leading = {index.columns.values()[0].name for index in table.indexes}
+        leading |= {constraint.columns.values()[0].name for constraint in table.constraints if isinstance(constraint, UniqueConstraint)}
+        leading |= {other.name for other in table.columns if other.primary_key or other.unique}
+        assert column.name in leading, f"{table.name}.{column.name} has no index"
+        assert not column.nullable, f"{table.name}.{column.name} is nullable"
+
+def test_cursors_walk_equal_sort_values_once(client, hotel, admin_headers):
+    # Five rooms share each floor, so pages end in the middle of a run of equal values
+    with SessionLocal() as db:
+        ascending = [room.id for room in db.query(Room).order_by(Room.floor, Room.id)]
+        descending = [room.id for room in db.query(Room).order_by(Room.floor.desc(), Room.id.desc())]
+    assert walk(client, admin_headers, "/api/rooms/", sort="floor", limit=3) == ascending
+    assert walk(client, admin_headers, "/api/rooms/", sort="-floor", limit=3) == descending
+
+def test_cursors_walk_equal_timestamps_once(client, hotel, admin_headers):
+    with SessionLocal() as db:
+        db.execute(update(Task).values(created_at=datetime(2026, 1, 1, 8, 0)))
+        db.commit()
+    ascending = walk(client, admin_headers, "/api/tasks/", sort="created_at", limit=4)
+    assert ascending == sorted(ascending) and len(ascending) == len(hotel["rooms"])
+    assert walk(client, admin_headers, "/api/tasks/", sort="-created_at", limit=4) == ascending[::-1]
+
+def test_descending_by_id(client, hotel, admin_headers):
+    assert walk(client, admin_headers, "/api/guests/", sort="-id", limit=3) == sorted(hotel["guests"], reverse=True)
+
+def test_tampered_cursors_are_rejected(client, hotel, admin_headers):
+    cursor = client.get("/api/rooms/", headers=admin_headers, params={"sort": "floor", "limit": 3}).json()["next_cursor"]
+    for bad in ["not-a-cursor", cursor[:-4], tamper(cursor, id="x"), tamper(cursor, s="id"), _encode_cursor("floor", None, 1)[:5]]:
+        response = client.get("/api/rooms/", headers=admin_headers, params={"sort": "floor", "limit": 3, "cursor": bad})
+        assert response.status_code == 400, bad
+        assert response.json()["detail"].startswith("Invalid cursor")
+
+def test_limit_bounds(client, hotel, admin_headers):
+    for limit in (0, -1, MAX_PAGE_SIZE + 1):
+        assert client.get("/api/rooms/", headers=admin_headers, params={"limit": limit}).status_code == 422
+    body = client.get("/api/rooms/", headers=admin_headers, params={"limit": MAX_PAGE_SIZE}).json()
+    assert (len(body["items"]), body["next_cursor"], body["limit"]) == (10, None, MAX_PAGE_SIZE)
+    body = client.get("/api/rooms/", headers=admin_headers, params={"limit": 10}).json()
+    assert len(body["items"]) == 10 and body["next_cursor"] is None
+
+def test_unknown_sort_key(client, hotel, admin_headers):
+    response = client.get("/api/rooms/", headers=admin_headers, params={"sort": "price_per_night"})
+    assert response.status_code == 400
+    assert "Allowed: floor, id, room_number" in response.json()["detail"]
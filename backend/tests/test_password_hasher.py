@@ -0,0 +1,46 @@
+# Password hashing off the event loop: successes, errors and rejections are counted apart.
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.auth import PasswordHasher
+from app.metrics import render
+
+def run(hasher: PasswordHasher, coroutine):
+    try:
+        return asyncio.run(coroutine)
+    finally:
+        hasher.shutdown()
+
+def test_successes_are_counted():
+    hasher = PasswordHasher(workers=1)
+    hashed = run(hasher, hasher.hash("secret"))
+    assert run(hasher, hasher.verify_and_update("secret", hashed))[0]
+    assert not run(hasher, hasher.verify_and_update("wrong", hashed))[0]
+    assert (hasher.completed, hasher.failed, hasher.rejected, hasher.pending) == (3, 0, 0, 0)
+
+@pytest.mark.parametrize("workers", [0, 1])
+def test_errors_are_counted_as_failed(workers):
+    hasher = PasswordHasher(workers=workers)
+    # Not a hash the password context recognizes
+    with pytest.raises(ValueError):
+        run(hasher, hasher.verify_and_update("secret", "not-a-hash"))
+    assert (hasher.completed, hasher.failed, hasher.rejected, hasher.pending) == (0, 1, 0, 0)
+
+def test_a_full_queue_is_rejected():
+    hasher = PasswordHasher(workers=1, max_pending=1)
+
+    async def two_at_once():
+        return await asyncio.gather(hasher.hash("one"), hasher.hash("two"), return_exceptions=True)
+
+    first, second = run(hasher, two_at_once())
+    assert isinstance(first, str)
+    assert isinstance(second, HTTPException) and second.status_code == 503
+    assert (hasher.completed, hasher.failed, hasher.rejected, hasher.pending) == (1, 0, 1, 0)
+    assert hasher.stats()["rejected"] == 1
+
+def test_counters_are_exported():
+    metrics = render()
+    for name in ("completed", "failed", "rejected"):
+        assert f"\npassword_hash_{name} " in metrics
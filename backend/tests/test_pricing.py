@@ -0,0 +1,138 @@
+# Stay prices from the rate calendar, checked against a night-by-night reference computation.
+from datetime import date, datetime, time, timedelta
+
+import pytest
+
+from app import pricing
+from app.models import RoomType
+from app.pricing import PricingSettings, Season, StayDiscount, quote, quote_stay
+
+THIS_YEAR = date.today().year
+
+def at_noon(day: date) -> datetime:
+    return datetime.combine(day, time(12))
+
+def weekday_on_or_after(day: date, weekday: int) -> date:
+    return day + timedelta(days=(weekday - day.weekday()) % 7)
+
+def reference_multiplier(settings: PricingSettings, room_type: RoomType, night: date) -> float:
+    multiplier = settings.weekend_multiplier.get(room_type, 1.0) if night.weekday() in settings.weekend_days else 1.0
+    month_day = night.month * 100 + night.day
+    for season in settings.seasons:
+        if season.room_types and room_type not in season.room_types:
+            continue
+        start, end = (int(bound.replace("-", "")) for bound in (season.start, season.end))
+        if (start <= month_day <= end) if start <= end else (month_day >= start or month_day <= end):
+            multiplier *= season.multiplier
+    return multiplier
+
+def reference_total(settings: PricingSettings, room_type: RoomType, price: float, check_in: date, nights: int, guests: int = 1):
+    units = sum(reference_multiplier(settings, room_type, check_in + timedelta(days=night)) for night in range(nights))
+    extra = max(0, guests - settings.included_guests[room_type])
+    discount = max([tier.discount for tier in settings.stay_discounts if nights >= tier.min_nights], default=0.0)
+    # Summed in a different order from the calendar, so it may differ from the quote in the last cent
+    return pytest.approx(price * units * (1 + extra * settings.extra_guest_rate) * (1 - discount), abs=0.01)
+
+@pytest.fixture
+def use_settings(monkeypatch):
+    # Swaps the pricing rules and drops the precomputed calendar built from the old ones
+    def use_settings(**overrides) -> PricingSettings:
+        settings = PricingSettings(**overrides)
+        monkeypatch.setattr(pricing, "pricing_settings", settings)
+        monkeypatch.setattr(pricing, "_calendar", None)
+        return settings
+    yield use_settings
+    pricing._calendar = None
+
+def test_weekday_and_weekend_nights(use_settings):
+    use_settings(seasons=[])
+    monday = weekday_on_or_after(date(THIS_YEAR, 4, 1), 0)
+    assert quote_stay(RoomType.STANDARD, 100, at_noon(monday), at_noon(monday + timedelta(days=2)), 1) == 200.0
+    # Thursday, Friday and Saturday nights: the last two are weekend nights
+    thursday = monday + timedelta(days=3)
+    assert quote_stay(RoomType.STANDARD, 100, at_noon(thursday), at_noon(thursday + timedelta(days=3)), 1) == 330.0
+    assert quote_stay(RoomType.SUITE, 100, at_noon(thursday), at_noon(thursday + timedelta(days=3)), 1) == 320.0
+    assert quote_stay(RoomType.PRESIDENTIAL, 100, at_noon(thursday), at_noon(thursday + timedelta(days=3)), 1) == 300.0
+    # Sunday night is a weeknight again
+    sunday = monday + timedelta(days=6)
+    assert quote_stay(RoomType.STANDARD, 100, at_noon(sunday), at_noon(sunday + timedelta(days=1)), 1) == 100.0
+
+@pytest.mark.parametrize("first_night, nights, multipliers", [
+    # Summer starts on the night of 06-15 and ends after the night of 08-31, both inclusive
+    ((6, 14), 2, [1.0, 1.25]),
+    ((8, 31), 2, [1.25, 1.0]),
+    # The holidays run over new year, straight into the low season
+    ((12, 19), 2, [1.0, 1.3]),
+    ((1, 5), 2, [1.3, 0.85]),
+    ((3, 15), 2, [0.85, 1.0]),
+])
+def test_season_boundaries(use_settings, first_night, nights, multipliers):
+    use_settings(weekend_days=[])
+    check_in = date(THIS_YEAR, *first_night)
+    assert quote_stay(RoomType.STANDARD, 100, at_noon(check_in), at_noon(check_in + timedelta(days=nights)), 1) == round(100 * sum(multipliers), 2)
+
+def test_overlapping_seasons_compound_for_their_room_types(use_settings):
+    use_settings(weekend_days=[])
+    eve = at_noon(date(THIS_YEAR, 12, 31))
+    assert quote_stay(RoomType.STANDARD, 100, eve, eve + timedelta(days=1), 1) == 130.0
+    assert quote_stay(RoomType.SUITE, 100, eve, eve + timedelta(days=1), 1) == 195.0
+
+@pytest.mark.parametrize("nights, discount", [(6, 0.0), (7, 0.1), (27, 0.1), (28, 0.2), (60, 0.2)])
+def test_stay_length_discounts(use_settings, nights, discount):
+    use_settings(seasons=[], weekend_days=[])
+    check_in = at_noon(date(THIS_YEAR, 4, 1))
+    quotes = quote([RoomType.DELUXE], [100], check_in, check_in + timedelta(days=nights), 1)
+    assert quotes.discount == discount
+    assert quotes.totals[0] == round(100 * nights * (1 - discount), 2)
+
+def test_same_day_stay_is_charged_one_night(use_settings):
+    use_settings(seasons=[], weekend_days=[])
+    morning = datetime(THIS_YEAR, 4, 1, 9, 0)
+    quotes = quote([RoomType.STANDARD], [100], morning, morning + timedelta(hours=8), 1)
+    assert (quotes.nights, float(quotes.totals[0])) == (1, 100.0)
+    # A late arrival and an early departure the next day is still one night
+    assert quote([RoomType.STANDARD], [100], morning + timedelta(hours=14), morning + timedelta(days=1), 1).nights == 1
+
+def test_extra_guests_and_capacity(use_settings):
+    settings = use_settings(seasons=[], weekend_days=[])
+    check_in = at_noon(date(THIS_YEAR, 4, 1))
+    check_out = check_in + timedelta(days=1)
+    assert quote_stay(RoomType.STANDARD, 100, check_in, check_out, 2) == 100.0
+    assert quote_stay(RoomType.STANDARD, 100, check_in, check_out, 3) == 120.0
+    with pytest.raises(ValueError, match="sleeps at most 3 guests"):
+        quote_stay(RoomType.STANDARD, 100, check_in, check_out, 4)
+
+    quotes = quote(list(RoomType), [100] * len(RoomType), check_in, check_out, 5)
+    assert quotes.fits.tolist() == [settings.max_guests[room_type] >= 5 for room_type in RoomType]
+    assert quotes.extra_guests.tolist() == [max(0, 5 - settings.included_guests[room_type]) for room_type in RoomType]
+
+def test_stays_outside_the_precomputed_calendar(use_settings):
+    settings = use_settings()
+    pricing.rate_calendar(date(THIS_YEAR, 1, 1), date(THIS_YEAR, 1, 2))
+    calendar = pricing._calendar
+    assert calendar.origin == date(THIS_YEAR - settings.calendar_years, 1, 1)
+
+    # Beyond its last night, and straddling its end: priced from a calendar of their own, left uncached
+    for check_in in (date(THIS_YEAR + settings.calendar_years + 5, 12, 27), date(THIS_YEAR + settings.calendar_years, 12, 28)):
+        total = quote_stay(RoomType.SUITE, 250, at_noon(check_in), at_noon(check_in + timedelta(days=8)), 5)
+        assert total == reference_total(settings, RoomType.SUITE, 250, check_in, 8, guests=5)
+        assert not calendar.covers(check_in, check_in + timedelta(days=8))
+    assert pricing._calendar is calendar
+
+def test_every_night_of_the_year_matches_the_reference():
+    # One-night and week-long stays starting on every date with the default rules: an off-by-one in the
+    # running sums shifts every season and weekend by a night and fails here
+    settings = pricing.pricing_settings
+    start = date(THIS_YEAR, 1, 1)
+    for offset in range(0, 366):
+        check_in = start + timedelta(days=offset)
+        for room_type in (RoomType.STANDARD, RoomType.SUITE):
+            for nights in (1, 7):
+                expected = reference_total(settings, room_type, 100, check_in, nights)
+                assert quote_stay(room_type, 100, at_noon(check_in), at_noon(check_in + timedelta(days=nights)), 1) == expected, (room_type, check_in, nights)
+
+def test_settings_are_validated():
+    with pytest.raises(ValueError):
+        Season(name="bad", start="6-15", end="08-31", multiplier=1.2)
+    with pytest.raises(ValueError):
+        StayDiscount(min_nights=7, discount=1.0)
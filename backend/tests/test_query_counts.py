@@ -0,0 +1,51 @@
+# Pins the number of statements the hot endpoints run. Each list runs its version probe (count and newest
+# updated_at, for the ETag) and one page query, however many rows the page holds; a loop that loads
+# related rows one by one pushes the count past the limit and fails here.
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.query_diagnostics import assert_max_queries
+
+@pytest.fixture
+def warm_client(client, hotel, admin_headers):
+    # The first request also loads the caller's principal; later ones find it cached
+    assert client.get("/api/users/", headers=admin_headers).status_code == 200
+    return client
+
+@pytest.mark.parametrize("path", ["/api/rooms/", "/api/bookings/", "/api/guests/", "/api/tasks/"])
+def test_list_endpoints(warm_client, admin_headers, path):
+    with assert_max_queries(2):
+        response = warm_client.get(path, headers=admin_headers)
+    assert response.status_code == 200
+    assert len(response.json()["items"]) == 10
+
+def test_not_modified_list_skips_the_page_query(warm_client, admin_headers):
+    etag = warm_client.get("/api/rooms/", headers=admin_headers).headers["ETag"]
+    with assert_max_queries(1):
+        response = warm_client.get("/api/rooms/", headers={**admin_headers, "If-None-Match": etag})
+    assert response.status_code == 304
+
+def test_dashboard_stats(warm_client, admin_headers):
+    # Room counts by status, then the period and tonight from the daily rollups
+    with assert_max_queries(3):
+        response = warm_client.get("/api/dashboard/stats", headers=admin_headers)
+    assert response.status_code == 200
+    assert response.json()["total_rooms"] == 10
+
+    with assert_max_queries(0):
+        assert warm_client.get("/api/dashboard/stats", headers=admin_headers).status_code == 200
+
+def test_create_booking(warm_client, admin_headers, hotel):
+    # Room lock, room, guest, conflict check, insert, rollup upsert, refresh
+    check_in = datetime.utcnow() + timedelta(days=10)
+    body = {
+        "guest_id": hotel["guests"][0],
+        "room_id": hotel["rooms"][0],
+        "check_in_date": check_in.isoformat(),
+        "check_out_date": (check_in + timedelta(days=2)).isoformat(),
+    }
+    with assert_max_queries(7):
+        response = warm_client.post("/api/bookings/", headers=admin_headers, json=body)
+    assert response.status_code == 200
+    assert response.json()["total_amount"] > 0
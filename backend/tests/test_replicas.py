@@ -0,0 +1,115 @@
+# Read-replica routing with two SQLite files standing in for the replicas. Each starts as a copy of the
+# primary with room 1's amenities changed, so every response shows which database served it.
+import asyncio
+import os
+import shutil
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, make_url, select, update
+
+from app import database
+from app.database import ReplicaSet, SessionLocal, dispose_engines, get_sync_engine, read_session
+from app.main import app
+from app.models import Room, RoomType
+
+ROOM_ONE = "/api/rooms/?limit=1&sort=id"
+
+@pytest.fixture
+def replica_dirs(tmp_path):
+    return [tmp_path / f"replica{index}" for index in range(2)]
+
+@pytest.fixture
+def replicas(replica_dirs, monkeypatch, hotel):
+    with get_sync_engine().begin() as conn:
+        conn.execute(update(Room).where(Room.id == hotel["rooms"][0]).values(amenities="primary"))
+    for index, directory in enumerate(replica_dirs):
+        directory.mkdir()
+        shutil.copy(make_url(database.DATABASE_URL).database, directory / "hotel.db")
+        engine = create_engine(f"sqlite:///{directory}/hotel.db")
+        with engine.begin() as conn:
+            conn.execute(update(Room).where(Room.id == hotel["rooms"][0]).values(amenities=f"replica{index}"))
+        engine.dispose()
+    replica_set = ReplicaSet([f"sqlite:///{directory}/hotel.db" for directory in replica_dirs], "round_robin")
+    monkeypatch.setattr(database, "_replicas", replica_set)
+    return replica_set
+
+@pytest.fixture
+def replica_client(replicas):
+    # Startup checks the replicas; shutdown disposes their pools along with the primary's
+    with TestClient(app) as client:
+        yield client
+
+def served_by(client, headers, requests: int = 4):
+    return [client.get(ROOM_ONE, headers=headers).json()["items"][0]["amenities"] for _ in range(requests)]
+
+def test_reads_alternate_between_replicas(replica_client, replicas, admin_headers):
+    assert served_by(replica_client, admin_headers) == ["replica0", "replica1", "replica0", "replica1"]
+    assert [replica.reads for replica in replicas.replicas] == [2, 2]
+
+def test_writes_go_to_the_primary(replica_client, admin_headers):
+    room = {"room_number": "777", "room_type": "suite", "price_per_night": 400, "floor": 7}
+    assert replica_client.post("/api/rooms/", headers=admin_headers, json=room).status_code == 200
+
+    with SessionLocal() as db:
+        assert db.execute(select(Room.id).where(Room.room_number == "777")).scalar_one_or_none() is not None
+    # The copies do not replicate, so reads served by them do not see the new room
+    listed = replica_client.get("/api/rooms/?limit=100", headers=admin_headers).json()["items"]
+    assert "777" not in {item["room_number"] for item in listed}
+
+def test_session_reads_its_own_writes_from_the_primary(replicas, hotel):
+    async def run():
+        try:
+            async with read_session() as db:
+                first = (await db.execute(select(Room.amenities).where(Room.id == hotel["rooms"][0]))).scalar_one()
+                db.add(Room(room_number="999", room_type=RoomType.SUITE, price_per_night=500, floor=9))
+                await db.flush()
+                after = (await db.execute(select(Room.amenities).where(Room.id == hotel["rooms"][0]))).scalar_one()
+                own = (await db.execute(select(Room.id).where(Room.room_number == "999"))).scalar_one_or_none()
+                await db.rollback()
+            async with read_session() as db:
+                locked = (await db.execute(select(Room.amenities).where(Room.id == hotel["rooms"][0]).with_for_update())).scalar_one()
+        finally:
+            await dispose_engines()
+        return first, after, own, locked
+
+    first, after, own, locked = asyncio.run(run())
+    assert first == "replica0"
+    assert after == "primary"
+    assert own is not None
+    # SELECT ... FOR UPDATE always goes to the primary
+    assert locked == "primary"
+
+def take_down(client, replicas, replica_dirs, index: int):
+    # The directory disappears, so new connections fail; pooled ones are dropped to force reconnects
+    os.rename(replica_dirs[index], f"{replica_dirs[index]}.down")
+    client.portal.call(replicas.replicas[index].engine.dispose)
+    client.portal.call(replicas.check)
+
+def test_unreachable_replica_falls_back(replica_client, replicas, replica_dirs, admin_headers):
+    take_down(replica_client, replicas, replica_dirs, 0)
+    assert not replicas.replicas[0].healthy and replicas.replicas[0].error
+    assert served_by(replica_client, admin_headers) == ["replica1"] * 4
+
+    take_down(replica_client, replicas, replica_dirs, 1)
+    assert served_by(replica_client, admin_headers) == ["primary"] * 4
+    assert replicas.fallbacks == 4
+
+    os.rename(f"{replica_dirs[0]}.down", replica_dirs[0])
+    replica_client.portal.call(replicas.check)
+    assert replicas.replicas[0].healthy
+    assert served_by(replica_client, admin_headers, 2) == ["replica0", "replica0"]
+
+def test_lagging_replica_gets_no_reads(replica_client, replicas, admin_headers, monkeypatch):
+    lagging = replicas.replicas[1]
+    monkeypatch.setattr(database, "replica_lag", lambda connection: 60.0 if connection.engine is lagging.engine.sync_engine else 0.0)
+    replica_client.portal.call(replicas.check)
+    assert not lagging.healthy
+    assert lagging.error == "lagging 60s behind the primary"
+
+    assert served_by(replica_client, admin_headers) == ["replica0"] * 4
+
+def test_replica_status_is_reported(replica_client, admin_headers):
+    replicas = replica_client.get("/api/diagnostics/replicas", headers=admin_headers).json()
+    assert replicas["selection"] == "round_robin"
+    assert [(replica["engine"], replica["healthy"]) for replica in replicas["replicas"]] == [("replica0", True), ("replica1", True)]
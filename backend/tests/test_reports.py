@@ -0,0 +1,53 @@
+# Reports generated on request: results per room type and per task type and priority.
+from datetime import datetime, timedelta
+import json
+
+from sqlalchemy import update
+
+from app.database import SessionLocal
+from app.models import Priority, Room, RoomType, Task, TaskStatus, TaskType
+
+def generate(client, headers, report_type: str, period_start: datetime, period_end: datetime):
+    body = {"title": report_type, "report_type": report_type, "period_start": period_start.isoformat(), "period_end": period_end.isoformat()}
+    return client.post("/api/reports/generate", headers=headers, json=body)
+
+def test_occupancy_by_room_type(client, hotel, admin_headers):
+    with SessionLocal() as db:
+        db.execute(update(Room).where(Room.id.in_(hotel["rooms"][:2])).values(room_type=RoomType.SUITE))
+        db.commit()
+    check_in, check_out = hotel["stay"]
+    start = check_in.replace(hour=0)
+    response = generate(client, admin_headers, "occupancy_by_room_type", start, start + timedelta(days=4))
+    assert response.status_code == 200, response.text
+    results = {row["room_type"]: row for row in json.loads(response.json()["data"])["results"]["by_room_type"]}
+
+    # Every room is booked for two of the four nights at 100 a night
+    assert (results["standard"]["rooms"], results["standard"]["room_nights_sold"], results["standard"]["revenue"]) == (8, 16, 1600.0)
+    assert (results["suite"]["rooms"], results["suite"]["room_nights_sold"], results["suite"]["revenue"]) == (2, 4, 400.0)
+    assert results["suite"]["occupancy_rate"] == 50.0
+    assert results["deluxe"] == {"room_type": "deluxe", "rooms": 0, "room_nights_available": 0, "room_nights_sold": 0, "occupancy_rate": 0.0, "revenue": 0.0}
+
+def test_task_completion_groups_by_type_and_priority(client, hotel, admin_headers):
+    created = datetime.utcnow().replace(microsecond=0) - timedelta(hours=6)
+    with SessionLocal() as db:
+        task_ids = [task_id for task_id, in db.query(Task.id).order_by(Task.id)]
+        db.execute(update(Task).values(status=TaskStatus.COMPLETED, created_at=created, completed_at=created + timedelta(hours=2)))
+        db.execute(update(Task).where(Task.id.in_(task_ids[:3])).values(task_type=TaskType.INSPECTION, priority=Priority.HIGH))
+        # No priority counts as medium
+        db.execute(update(Task).where(Task.id == task_ids[3]).values(priority=None, completed_at=created + timedelta(hours=4)))
+        db.commit()
+
+    response = generate(client, admin_headers, "task_completion", created, created + timedelta(days=1))
+    assert response.status_code == 200, response.text
+    results = json.loads(response.json()["data"])["results"]
+    assert results["total_completed"] == 10
+    groups = {(row["task_type"], row["priority"]): row for row in results["by_type_and_priority"]}
+    assert set(groups) == {("inspection", "high"), ("cleaning", "medium")}
+    assert (groups["inspection", "high"]["completed"], groups["inspection", "high"]["avg_hours"]) == (3, 2.0)
+    assert (groups["cleaning", "medium"]["completed"], groups["cleaning", "medium"]["max_hours"]) == (7, 4.0)
+
+def test_unknown_report_type(client, admin_headers):
+    now = datetime.utcnow()
+    response = generate(client, admin_headers, "nonsense", now, now + timedelta(days=1))
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("Unknown report type 'nonsense'")
@@ -0,0 +1,55 @@
+# The response cache of a single worker without Redis: versions are counted in the process, and a write
+# retires the cached pages of its resource.
+import pytest
+
+from app import response_cache as response_cache_module
+from app.models import UserRole
+from app.response_cache import response_cache
+
+@pytest.fixture
+def cache(monkeypatch):
+    monkeypatch.setattr(response_cache_module, "RESPONSE_CACHE_ENABLED", True)
+    assert response_cache.enabled
+    return response_cache
+
+def outcome(response) -> str:
+    assert response.status_code == 200
+    return response.headers["X-Cache"]
+
+def test_staff_list_is_served_from_cache_until_a_write(client, cache, admin_headers):
+    assert outcome(client.get("/api/users/", headers=admin_headers)) == "MISS"
+    assert outcome(client.get("/api/users/", headers=admin_headers)) == "HIT"
+    # Another query string is another page
+    assert outcome(client.get("/api/users/?limit=1", headers=admin_headers)) == "MISS"
+
+    new_user = {"email": "frontdesk@hotel.com", "password": "password", "first_name": "Front", "last_name": "Desk", "role": "receptionist"}
+    assert client.post("/api/users/", headers=admin_headers, json=new_user).status_code == 200
+    response = client.get("/api/users/", headers=admin_headers)
+    assert outcome(response) == "MISS"
+    assert "frontdesk@hotel.com" in {user["email"] for user in response.json()["items"]}
+    assert cache.stats()["resources"]["users"]["invalidations"] == 1
+
+def test_room_list_is_rebuilt_after_an_update(client, cache, hotel, admin_headers):
+    assert outcome(client.get("/api/rooms/", headers=admin_headers)) == "MISS"
+    assert outcome(client.get("/api/rooms/", headers=admin_headers)) == "HIT"
+
+    room_id = hotel["rooms"][0]
+    assert client.put(f"/api/rooms/{room_id}", headers=admin_headers, json={"status": "maintenance"}).status_code == 200
+    response = client.get("/api/rooms/", headers=admin_headers)
+    assert outcome(response) == "MISS"
+    assert {room["id"]: room["status"] for room in response.json()["items"]}[room_id] == "maintenance"
+
+def test_entries_are_kept_per_role(client, cache, make_user, admin_headers):
+    assert outcome(client.get("/api/users/", headers=admin_headers)) == "MISS"
+    assert outcome(client.get("/api/users/", headers=make_user(UserRole.ADMIN))) == "HIT"
+    assert outcome(client.get("/api/users/", headers=make_user(UserRole.MANAGER))) == "MISS"
+
+def test_bypassed_without_versions_that_see_every_write(client, cache, monkeypatch, admin_headers):
+    # e.g. several workers and no Redis
+    monkeypatch.setattr(cache, "local_versions", False)
+    assert not cache.enabled
+    assert outcome(client.get("/api/users/", headers=admin_headers)) == "BYPASS"
+    assert outcome(client.get("/api/users/", headers=admin_headers)) == "BYPASS"
+
+def test_bypassed_when_disabled(client, admin_headers):
+    assert outcome(client.get("/api/users/", headers=admin_headers)) == "BYPASS"
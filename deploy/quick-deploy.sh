@@ -28,14 +28,9 @@ npm run build
 echo "Initializing database..."
 mysql -h 192.168.1.2 -u hotel_user -p25846936 hotel_db < database/init.sql || echo "Database already initialized"
 
-# Create database tables
+# Apply database migrations
 cd backend
-../venv/bin/python -c "
-from app.database import engine
-from app.models import Base
-Base.metadata.create_all(bind=engine)
-print('Database tables created/updated successfully')
-"
+../venv/bin/alembic upgrade head
 cd ..
 
 # Enable and start services
@@ -126,7 +126,8 @@ Group=$DEPLOY_USER
 WorkingDirectory=$PROJECT_DIR/backend
 Environment=PATH=$PROJECT_DIR/venv/bin
 EnvironmentFile=$PROJECT_DIR/backend/.env
-ExecStart=$PROJECT_DIR/venv/bin/uvicorn app.main:app --host 0.0.0.0 --port 8000 --workers 4
+ExecStart=$PROJECT_DIR/venv/bin/gunicorn -c gunicorn.conf.py app.main:app
+ExecReload=/bin/kill -HUP \$MAINPID
 Restart=always
 RestartSec=10
 StandardOutput=journal
@@ -191,12 +192,7 @@ npm run build
 
 echo "Running database migrations..."
 cd backend
-../venv/bin/python -c "
-from app.database import engine
-from app.models import Base
-Base.metadata.create_all(bind=engine)
-print('Database tables created successfully')
-"
+../venv/bin/alembic upgrade head
 cd ..
 
 echo "Restarting services..."
@@ -343,6 +339,11 @@ server {
         proxy_set_header Connection "upgrade";
     }
     
+    # Prometheus metrics are scraped from the backend directly, with METRICS_TOKEN
+    location = /api/metrics {
+        return 404;
+    }
+
     # API routes
     location /api/ {
         proxy_pass http://127.0.0.1:8000;
@@ -352,6 +353,19 @@ server {
         proxy_set_header X-Forwarded-Proto $scheme;
     }
     
+    # Event push (WebSocket)
+    location /api/events/ {
+        proxy_pass http://127.0.0.1:8000;
+        proxy_set_header Host $host;
+        proxy_set_header X-Real-IP $remote_addr;
+        proxy_set_header X-Forwarded-For $proxy_add_x_forwarded_for;
+        proxy_set_header X-Forwarded-Proto $scheme;
+        proxy_http_version 1.1;
+        proxy_set_header Upgrade $http_upgrade;
+        proxy_set_header Connection "upgrade";
+        proxy_read_timeout 120s;
+    }
+    
     # Static files
     location /static/ {
         alias /opt/hotel-management/uploads/;